@@ -26,20 +26,28 @@ import logging
 from google import genai
 from google.genai import types
 
+from image_classifier import parse_dimension, screenshot_priority
+
 logger = logging.getLogger(__name__)
 
 # Import knowledge_base function (lazy import to avoid circular dependencies)
 try:
-    from knowledge_base import query_knowledge_base
+    from knowledge_base import query_knowledge_base, get_images
 except (ImportError, KeyError, AttributeError) as e:
     logger.warning(f"Could not import query_knowledge_base: {e}")
     # Define a fallback function
-    def query_knowledge_base(query, n_results=10):
-        return {"documents": [[]], "metadatas": [[]], "distances": [[]]}
+    def query_knowledge_base(query, n_results=10, version=None, language=None):
+        queries = [query] if isinstance(query, str) else query
+        return {"documents": [[] for _ in queries], "metadatas": [[] for _ in queries], "distances": [[] for _ in queries]}
+
+    def get_images(image_ids):
+        return {}
 
 class PrimAgent:
-    def __init__(self, api_key, model="gemini-2.5-flash"):
+    def __init__(self, api_key, model="gemini-2.5-flash", help_version=None):
         self.model_name = model
+        # Restrict documentation searches to one product version (e.g. "5-8"); None searches all versions
+        self.help_version = help_version or os.getenv('PRIM_HELP_VERSION') or None
         # Suppress warnings when initializing DDGS
         import warnings
         with warnings.catch_warnings():
@@ -182,16 +190,22 @@ class PrimAgent:
             # Search with more results initially to filter later
             all_results = []
             
-            # Collect results from multiple queries (increased to 4 for better coverage)
+            # Collect results from multiple queries (increased to 4 for better coverage),
+            # embedded in one batch and searched in one backend round-trip
             seen_ids = set()
+            search_queries = search_queries[:4]  # Increased to 4 queries for better coverage
+            try:
+                batch_results = query_knowledge_base(search_queries, n_results=8, version=self.help_version)  # Reduced for speed
+            except Exception as e:
+                logger.warning(f"Error with queries {search_queries}: {e}")
+                batch_results = {}
             # Prioritize original query, then try variations
-            for search_query in search_queries[:4]:  # Increased to 4 queries for better coverage
+            for q_idx, search_query in enumerate(search_queries):
                 try:
-                    query_results = query_knowledge_base(search_query, n_results=8)  # Reduced for speed
-                    if query_results and query_results.get('documents') and query_results['documents'][0]:
-                        docs = query_results['documents'][0]
-                        metadatas = query_results['metadatas'][0]
-                        distances = query_results.get('distances', [None])[0] if query_results.get('distances') else [None] * len(docs)
+                    if batch_results and batch_results.get('documents') and q_idx < len(batch_results['documents']) and batch_results['documents'][q_idx]:
+                        docs = batch_results['documents'][q_idx]
+                        metadatas = batch_results['metadatas'][q_idx]
+                        distances = batch_results['distances'][q_idx] if batch_results.get('distances') else [None] * len(docs)
                         
                         for i, doc in enumerate(docs):
                             if not doc or not doc.strip():
@@ -211,14 +225,16 @@ class PrimAgent:
                                 continue
                             seen_ids.add(doc_id)
                             
-                            # Extract images from metadata
+                            # Images of the chunk: IDs into the image table, resolved once the results are filtered
                             images = []
+                            image_ids = []
                             metadata_obj = metadatas[i] if i < len(metadatas) else {}
                             if metadata_obj:
+                                image_ids = [image_id for image_id in (metadata_obj.get('image_ids') or '').split(',') if image_id]
+                                # Chunks ingested before image IDs carry the page's whole image list
                                 images_json = metadata_obj.get('images', '')
                                 if images_json:
                                     try:
-                                        import json
                                         images = json.loads(images_json) if isinstance(images_json, str) else images_json
                                     except (json.JSONDecodeError, TypeError):
                                         images = []
@@ -228,7 +244,8 @@ class PrimAgent:
                                 'metadata': metadata_obj,
                                 'score': score,
                                 'distance': distance,
-                                'images': images  # Store images with result
+                                'images': images,  # Store images with result
+                                'image_ids': image_ids
                             })
                 except Exception as e:
                     logger.warning(f"Error with query '{search_query}': {e}")
@@ -256,6 +273,17 @@ class PrimAgent:
                 # This ensures we always have some context
                 filtered_results = all_results[:8]
             
+            # One image table lookup for the images of the kept results
+            wanted_ids = [image_id for result in filtered_results for image_id in result['image_ids']]
+            if wanted_ids:
+                try:
+                    image_table = get_images(wanted_ids)
+                except Exception as e:
+                    logger.warning(f"Could not load images {wanted_ids}: {e}")
+                    image_table = {}
+                for result in filtered_results:
+                    result['images'] = result['images'] + [image_table[i] for i in result['image_ids'] if i in image_table]
+            
             # Build context with filtered and sorted results
             context = f"📚 Résultats de recherche dans la documentation PrimLogix pour: '{query}'\n"
             context += f"Trouvé {len(filtered_results)} document(s) pertinent(s) (filtrés par pertinence ≥25%)\n\n"
@@ -312,91 +340,22 @@ class PrimAgent:
                         img_width = img.get('width') if isinstance(img, dict) else None
                         img_height = img.get('height') if isinstance(img, dict) else None
                         
-                        # Only include images from aide.primlogix.com (the official help site)
-                        if img_url and 'aide.primlogix.com' in img_url:
-                            img_lower = (img_url + ' ' + img_alt + ' ' + img_context).lower()
-                            
-                            # STRICT: Exclude emojis, icons, and small graphics
-                            emoji_icon_patterns = [
-                                'emoji', 'emoticon', 'smiley', 'smile', '😀', '😊', '👍', '👎',
-                                'icon', 'icone', 'icône', 'logo', 'button', 'bouton',
-                                'arrow', 'fleche', 'flèche', 'chevron', 'nav', 'menu',
-                                'stop', 'stop-sign', 'warning', 'avertissement', 'alert',
-                                'checkmark', 'check', 'tick', 'coche', 'verification',
-                                'person', 'user', 'utilisateur', 'silhouette', 'avatar',
-                                'document', 'folder', 'file', 'dossier', 'cv',
-                                'favicon', '.ico', 'svg', 'sprite', 'glyph'
-                            ]
-                            if any(pattern in img_lower for pattern in emoji_icon_patterns):
-                                # Only allow if explicitly marked as screenshot/interface
-                                if not any(x in img_lower for x in ['screenshot', 'capture', 'interface', 'fenetre', 'ecran', 'affichage', 'window', 'dialog', 'images/']):
-                                    continue  # Skip emojis/icons
-                            
-                            # Exclude small square icons
-                            is_small_icon = False
-                            small_icon_sizes = ['16x16', '20x20', '24x24', '32x32', '40x40', '48x48', '50x50', '56x56', '60x60', '63x63', '64x64', '72x72', '80x80', '96x96', '100x100', '128x128']
-                            if any(size in img_url.lower() for size in small_icon_sizes):
-                                if '/images/' not in img_url.lower() and '/img/' not in img_url.lower():
-                                    continue  # Skip small icons
-                            
-                            # Calculate priority score (higher = better, prioritize full interface screenshots)
-                            priority_score = 0
-                            
-                            # HIGH PRIORITY: Large rectangular images (full interface screenshots)
-                            width_val = None
-                            height_val = None
-                            try:
-                                if img_width and isinstance(img_width, (int, str)):
-                                    width_val = int(img_width) if str(img_width).isdigit() else None
-                                if img_height and isinstance(img_height, (int, str)):
-                                    height_val = int(img_height) if str(img_height).isdigit() else None
-                            except (ValueError, TypeError):
-                                pass
-                            
-                            if width_val and height_val and width_val > 0 and height_val > 0:
-                                # Large images (likely full screenshots)
-                                if width_val >= 600 or height_val >= 400:
-                                    priority_score += 50
-                                elif width_val >= 400 or height_val >= 300:
-                                    priority_score += 30
-                                
-                                # Rectangular images (screenshots are usually rectangular, not square)
-                                ratio = max(width_val, height_val) / min(width_val, height_val)
-                                if ratio > 1.5:  # Significantly rectangular
-                                    priority_score += 20
-                                elif ratio > 1.2:  # Moderately rectangular
-                                    priority_score += 10
-                                elif ratio < 1.1:  # Square or near-square (likely icon)
-                                    priority_score -= 30  # Penalize square images
-                            
-                            # HIGH PRIORITY: Images in /images/ directory (where screenshots are stored)
-                            if '/images/' in img_url.lower():
-                                priority_score += 40
-                            
-                            # HIGH PRIORITY: Explicit screenshot keywords
-                            screenshot_keywords = ['screenshot', 'capture', 'interface', 'fenetre', 'ecran', 'affichage', 'window', 'dialog', 'application', 'logiciel']
-                            if any(keyword in img_lower for keyword in screenshot_keywords):
-                                priority_score += 30
-                            
-                            # MEDIUM PRIORITY: PNG/JPG/JPEG (not SVG/GIF which are often icons)
-                            if any(img_url.lower().endswith(ext) for ext in ['.png', '.jpg', '.jpeg', '.webp']):
-                                priority_score += 10
-                            
-                            # LOW PRIORITY: Small images or square images
-                            if width_val and height_val:
-                                if width_val < 200 or height_val < 200:
-                                    priority_score -= 20
-                            
-                            # Only include images with positive priority score (prioritize screenshots)
-                            if priority_score > 0:
-                                scored_images.append({
-                                    'url': img_url,
-                                    'alt': img_alt or 'Capture d\'écran PrimLogix',
-                                    'context': img_context,
-                                    'score': priority_score,
-                                    'width': width_val,
-                                    'height': height_val
-                                })
+                        # Only images from aide.primlogix.com, excluding emojis/icons (score 0);
+                        # large rectangular screenshots in /images/ score highest
+                        width_val = parse_dimension(img_width)
+                        height_val = parse_dimension(img_height)
+                        priority_score = screenshot_priority(img_url, img_alt, img_context, width_val, height_val)
+                        
+                        # Only include images with positive priority score (prioritize screenshots)
+                        if priority_score > 0:
+                            scored_images.append({
+                                'url': img_url,
+                                'alt': img_alt or 'Capture d\'écran PrimLogix',
+                                'context': img_context,
+                                'score': priority_score,
+                                'width': width_val,
+                                'height': height_val
+                            })
                     
                     # Sort by priority score (highest first) to prioritize full interface screenshots
                     scored_images.sort(key=lambda x: x['score'], reverse=True)
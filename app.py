@@ -354,7 +354,8 @@ if kb_count == 0:
                         
                         status_text.text("📥 Étape 1/2 : Scraping de la documentation PrimLogix...")
                         progress_bar.progress(30)
-                        data = run_scraper()
+                        # Resume from the crawl checkpoint if a previous attempt was interrupted
+                        data = run_scraper(resume=True)
                         
                         status_text.text(f"💾 Étape 2/2 : Ajout de {len(data)} pages à la base de connaissances...")
                         progress_bar.progress(70)
@@ -374,6 +375,18 @@ else:
     st.sidebar.success(f"📚 Base de connaissances: {kb_count} documents")
     st.sidebar.info(f"🔧 Backend: {backend_type}")
     
+    # Statistiques du cache des recherches (compteurs du processus, partagés par les sessions)
+    try:
+        from knowledge_base import query_cache_stats
+        cache_stats = query_cache_stats()
+        if cache_stats['hits'] + cache_stats['misses'] > 0:
+            st.sidebar.caption(
+                f"⚡ Cache des recherches : {cache_stats['hits']} succès / {cache_stats['misses']} échecs "
+                f"({cache_stats['hit_rate']:.0%}), {cache_stats['entries']} en mémoire"
+            )
+    except Exception:
+        pass
+    
     # Afficher le nombre de conversations sauvegardées et statistiques de feedback
     try:
         storage = get_storage()
@@ -0,0 +1,102 @@
+"""
+Benchmark of the Qdrant chunk storage layouts on an in-memory collection.
+
+- ``text``: each chunk point carries a copy of its text (overlapping chunks repeat it)
+- ``offsets``: page texts are stored once, compressed, in a page table; chunk points only
+  keep ``page_id``/``start``/``end`` and the text of the top-k hits is sliced at query time
+
+The same pages are ingested with both layouts. For each layout the benchmark reports the
+payload size of the chunk points and of the page table, and the query latency with a cold and
+a warm page cache. Query vectors come from the embedding cache, so the latency is the
+backend's, and both layouts are checked to return the same texts.
+
+Usage:
+    python benchmarks/bench_chunk_layout.py --snapshot scraped_data.jsonl.gz [--queries 200] [--k 8]
+    python benchmarks/bench_chunk_layout.py --corpus path/to/pages
+"""
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from qdrant_client import QdrantClient  # noqa: E402
+
+import embeddings  # noqa: E402
+import knowledge_base_qdrant  # noqa: E402
+from bench_chunker import DEFAULT_CORPUS, load_pages, sample_queries  # noqa: E402
+from chunker import chunk_text  # noqa: E402
+from ingest_manifest import IngestManifest  # noqa: E402
+from ingest_pipeline import ingest  # noqa: E402
+from knowledge_base_qdrant import QdrantKnowledgeBase  # noqa: E402
+
+# The local (in-memory) client is not thread-safe: upload from a single thread
+knowledge_base_qdrant.UPLOAD_WORKERS = 1
+
+
+def payload_bytes(client, collection_name):
+    """Total JSON size of the payloads of a collection."""
+    total = 0
+    offset = None
+    while True:
+        points, offset = client.scroll(collection_name, limit=1000, offset=offset, with_payload=True)
+        total += sum(len(json.dumps(point.payload, ensure_ascii=False).encode('utf-8')) for point in points)
+        if offset is None:
+            return total
+
+
+def build(layout, pages, manifest_dir):
+    client = QdrantClient(":memory:")
+    kb = QdrantKnowledgeBase(client=client, collection_name=f"bench_{layout}", chunk_layout=layout)
+    ingest(pages, [(kb, IngestManifest(Path(manifest_dir) / f"{layout}.json"))], chunk_text)
+    return kb
+
+
+def query_latency(kb, queries, k):
+    """Per-query latency in milliseconds and the texts returned."""
+    latencies = []
+    texts = []
+    for query in queries:
+        started = time.perf_counter()
+        results = kb.query([query], n_results=k)
+        latencies.append((time.perf_counter() - started) * 1000)
+        texts.append(results['documents'][0])
+    return latencies, texts
+
+
+def describe(latencies):
+    ordered = sorted(latencies)
+    return f"mean {statistics.mean(ordered):6.2f} ms, p95 {ordered[int(len(ordered) * 0.95) - 1]:6.2f} ms"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the text and offsets chunk layouts of QdrantKnowledgeBase.")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--snapshot", help="Scrape snapshot (.jsonl.gz / .jsonl / legacy .json)")
+    source.add_argument("--corpus", default=DEFAULT_CORPUS, help="Directory of saved HTML pages")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries sampled from the pages")
+    parser.add_argument("--k", type=int, default=8, help="Results per query")
+    args = parser.parse_args()
+
+    pages = load_pages(args.snapshot, None if args.snapshot else args.corpus)
+    queries = [query for query, _ in sample_queries(pages, per_page=3)][:args.queries]
+    embeddings.embed(queries)  # Query vectors are then served by the embedding cache
+    print(f"{len(pages)} pages, {len(queries)} queries, k={args.k}")
+
+    returned = {}
+    with tempfile.TemporaryDirectory() as manifest_dir:
+        for layout in ("text", "offsets"):
+            kb = build(layout, pages, manifest_dir)
+            chunk_bytes = payload_bytes(kb.client, kb.collection_name)
+            page_bytes = payload_bytes(kb.client, kb.pages_collection) if layout == "offsets" else 0
+            cold, returned[layout] = query_latency(kb, queries, args.k)
+            warm, _ = query_latency(kb, queries, args.k)
+            print(f"{layout:<8} {kb.count()} chunks, payload {chunk_bytes / 1024:8.1f} KiB chunks "
+                  f"+ {page_bytes / 1024:7.1f} KiB page table = {(chunk_bytes + page_bytes) / 1024:8.1f} KiB")
+            print(f"{'':<8} query cold page cache {describe(cold)}, warm {describe(warm)}")
+
+    print("Same texts returned by both layouts:", returned["text"] == returned["offsets"])
@@ -0,0 +1,132 @@
+"""
+Benchmark of the heading/paragraph token-aware chunker against the former character chunkers.
+
+For each chunker it reports the number of chunks, how many of them exceed the embedding model's
+input limit (and the share of tokens the model therefore never sees), the chunking and embedding
+time, and a retrieval hit rate: sentences sampled from every page are used as queries and a hit
+is counted when one of the top-k chunks comes from the page the sentence was taken from.
+
+Pages come from a scrape snapshot (``python scraper.py`` / ``ingest.py --save-snapshot``), from
+an offline mirror of the help site (``python site_mirror.py record path/to/mirror``) or from a
+directory of saved HTML pages.
+
+Usage:
+    python benchmarks/bench_chunker.py --snapshot scraped_data.jsonl.gz [--queries-per-page 3] [--k 5]
+    python benchmarks/bench_chunker.py --corpus path/to/mirror
+"""
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np  # noqa: E402
+from sentence_transformers import SentenceTransformer  # noqa: E402
+
+import chunker  # noqa: E402
+
+_SENTENCE_RE = re.compile(r"[^.!?\n]{40,}[.!?]")
+
+
+def char_chunker(chunk_size, overlap):
+    """The fixed-size character chunker previously used by knowledge_base (800/150) and knowledge_base_qdrant (1000/200)."""
+    def chunk_text(text):
+        chunks = []
+        start = 0
+        while start < len(text):
+            chunk = text[start:start + chunk_size]
+            if chunk.strip():
+                chunks.append(chunk)
+            start += chunk_size - overlap
+        return chunks
+    return chunk_text
+
+
+def load_pages(snapshot=None, corpus=None):
+    if snapshot:
+        from snapshot import iter_snapshot
+        return [page for page in iter_snapshot(snapshot) if page.get('content')]
+    import scraper
+    from site_mirror import saved_pages
+    pages = []
+    for url, html in saved_pages(corpus):
+        page, _ = scraper.extract_page(url, html)
+        if page and page['content']:
+            pages.append(page)
+    return pages
+
+
+def sample_queries(pages, per_page, seed=0):
+    """``(query, page index)`` pairs: sentences picked at random from each page."""
+    rng = random.Random(seed)
+    queries = []
+    for index, page in enumerate(pages):
+        sentences = [" ".join(s.split()) for s in _SENTENCE_RE.findall(page['content'])]
+        for sentence in rng.sample(sentences, min(per_page, len(sentences))):
+            queries.append((sentence, index))
+    return queries
+
+
+def bench(name, chunk_text, pages, queries, model, k, batch_size):
+    started = time.perf_counter()
+    chunks, owners = [], []
+    for index, page in enumerate(pages):
+        for chunk in chunk_text(page['content']):
+            chunks.append(chunk)
+            owners.append(index)
+    chunk_seconds = time.perf_counter() - started
+
+    limit = model.max_seq_length - 2  # [CLS] and [SEP]
+    tokens = np.array(chunker.count_tokens(chunks))
+    truncated = tokens > limit
+    lost = np.clip(tokens - limit, 0, None).sum()
+
+    started = time.perf_counter()
+    embeddings = model.encode(chunks, batch_size=batch_size, normalize_embeddings=True, convert_to_numpy=True)
+    embed_seconds = time.perf_counter() - started
+
+    query_embeddings = model.encode([q for q, _ in queries], batch_size=batch_size,
+                                    normalize_embeddings=True, convert_to_numpy=True)
+    owners = np.array(owners)
+    top = np.argsort(-(query_embeddings @ embeddings.T), axis=1)[:, :k]
+    hits = sum(1 for (_, page_index), row in zip(queries, top) if page_index in owners[row])
+
+    print(
+        f"{name:<12} {len(chunks):>7} chunks, {tokens.mean():6.1f} tokens/chunk, "
+        f"{truncated.mean() * 100:5.1f}% truncated ({lost / max(tokens.sum(), 1) * 100:4.1f}% of tokens not embedded), "
+        f"chunking {chunk_seconds * 1000:7.1f} ms, embedding {embed_seconds:6.2f}s, "
+        f"hit@{k} {hits / max(len(queries), 1) * 100:5.1f}%"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the token-aware chunker with the former character chunkers.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--snapshot", help="Scrape snapshot (.jsonl.gz / .jsonl / legacy .json)")
+    source.add_argument("--corpus", help="Mirror recorded by 'site_mirror.py record', or a directory of saved HTML pages")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2", help="Sentence-transformers embedding model")
+    parser.add_argument("--queries-per-page", type=int, default=3)
+    parser.add_argument("--k", type=int, default=5, help="Top-k chunks checked for the source page")
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    source_path = Path(args.snapshot or args.corpus)
+    if not (source_path.is_file() if args.snapshot else source_path.is_dir()):
+        sys.exit(f"{source_path} not found")
+
+    model = SentenceTransformer(args.model)
+    # Count tokens (and size the new chunks) with the model's own tokenizer
+    chunker.set_tokenizer(model.tokenizer)
+
+    pages = load_pages(args.snapshot, args.corpus)
+    if not pages:
+        sys.exit(f"No pages with content found in {source_path}")
+    queries = sample_queries(pages, args.queries_per_page)
+    print(f"{len(pages)} pages, {len(queries)} queries, model {args.model} (max {model.max_seq_length} tokens)")
+
+    bench("chars-800", char_chunker(800, 150), pages, queries, model, args.k, args.batch_size)
+    bench("chars-1000", char_chunker(1000, 200), pages, queries, model, args.k, args.batch_size)
+    bench("tokens", chunker.chunk_text, pages, queries, model, args.k, args.batch_size)
@@ -0,0 +1,85 @@
+"""
+Crawl benchmark against an offline mirror of the help site.
+
+Starts ``site_mirror.py serve`` on the recorded mirror in a separate process, runs
+``scraper.run_scraper()`` against it and reports pages/sec, bytes fetched and the
+peak RSS of the crawling process. Record a mirror first with:
+
+    python site_mirror.py record path/to/mirror
+
+Usage:
+    python benchmarks/bench_crawl.py path/to/mirror [--workers 8] [--cache] [--rounds 2]
+
+With ``--cache`` the conditional-GET cache is used (in a temporary directory), so rounds
+after the first show the cost of a re-crawl where nothing changed.
+"""
+import argparse
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import scraper  # noqa: E402
+from http_cache import HttpCache  # noqa: E402
+
+
+def start_server(mirror_dir):
+    """Serve the mirror from a child process (so its CPU and memory are not measured). Returns (process, base_url)."""
+    process = subprocess.Popen(
+        [sys.executable, str(ROOT / "site_mirror.py"), "serve", str(mirror_dir), "--port", "0"],
+        stdout=subprocess.PIPE, text=True
+    )
+    line = process.stdout.readline().strip()
+    if not line.startswith("BASE_URL="):
+        process.kill()
+        sys.exit(f"Mirror server did not start: {line!r}")
+    return process, line.split("=", 1)[1]
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process (ru_maxrss is in KB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the crawler against an offline mirror.")
+    parser.add_argument("mirror_dir", help="Directory written by 'site_mirror.py record'")
+    parser.add_argument("--workers", type=int, default=scraper.DEFAULT_MAX_WORKERS, help="Concurrent fetches")
+    parser.add_argument("--cache", action="store_true", help="Use the conditional-GET cache (fresh temporary directory)")
+    parser.add_argument("--rounds", type=int, default=1, help="Number of consecutive crawls")
+    parser.add_argument("--rate-limit", type=float, default=0, help="Requests/s per host (0 = unlimited, the mirror is local)")
+    args = parser.parse_args()
+
+    scraper.logger.setLevel('WARNING')
+    process, base_url = start_server(args.mirror_dir)
+    print(f"Mirror served at {base_url}, {args.workers} workers, cache {'on' if args.cache else 'off'}")
+    print(f"RSS before crawling: {peak_rss_mb():.1f} MB")
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            for round_number in range(1, args.rounds + 1):
+                crawler = scraper.create_crawler(
+                    max_workers=args.workers, use_cache=False, checkpoint_path=None, base_url=base_url,
+                    rate_limit=args.rate_limit
+                )
+                if args.cache:
+                    crawler.cache = HttpCache(cache_dir)
+                started = time.perf_counter()
+                pages = scraper.run_scraper(crawler=crawler)
+                wall = time.perf_counter() - started
+                stats = crawler.stats
+                print(
+                    f"Round {round_number}: {len(pages)} pages in {wall:.2f}s "
+                    f"({crawler.pages_per_second:.1f} pages/s), "
+                    f"{stats['downloaded']} downloaded ({stats['bytes_downloaded'] / 1024 / 1024:.2f} MB), "
+                    f"{stats['not_modified']} not modified, {stats['retries']} retries, "
+                    f"concurrency {crawler.concurrency.limit}/{crawler.max_workers}, peak RSS {peak_rss_mb():.1f} MB"
+                )
+    finally:
+        process.terminate()
+        process.wait()
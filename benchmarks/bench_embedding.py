@@ -0,0 +1,107 @@
+"""
+Embedding throughput benchmark for ``QdrantKnowledgeBase.add`` on a synthetic corpus.
+
+Generates help-page-like chunks (random French help vocabulary, fixed seed) and writes
+them to an in-memory Qdrant collection with ``add(..., embeddings=None)``, so ``add``
+embeds every call itself:
+
+- ``per-document``: one ``encode`` call per chunk (the former behaviour of ``add``, vectors
+  computed before the call)
+- ``batch=N``: ``QdrantKnowledgeBase(embed_batch_size=N)``, for each ``--batch-sizes`` value
+- ``processes=P``: ``QdrantKnowledgeBase(embed_processes=P)`` with the largest batch size,
+  for each ``--processes`` value
+
+and reports chunks/sec for each, embedding alone and including the upserts. The embedding
+cache is disabled so every run encodes the whole corpus.
+
+Usage:
+    python benchmarks/bench_embedding.py [--chunks 2000] [--batch-sizes 16,32,64,128] [--processes 2,4] [--add-batch 512]
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from qdrant_client import QdrantClient  # noqa: E402
+
+import embeddings  # noqa: E402
+from knowledge_base_qdrant import QdrantKnowledgeBase  # noqa: E402
+
+WORDS = (
+    "employé utilisateur dossier paie feuille de temps projet client facture rapport configuration "
+    "serveur courriel SMTP accès droits groupe calendrier vacances banque heures poste département "
+    "cliquez sur le bouton Enregistrer sélectionnez l'onglet puis entrez la valeur dans le champ "
+    "la fenêtre affiche les options disponibles pour modifier supprimer ajouter une ligne au tableau"
+).split()
+
+
+def synthetic_chunks(count, seed=0, min_words=60, max_words=180):
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(WORDS, k=rng.randint(min_words, max_words))) for _ in range(count)]
+
+
+def run(name, chunks, add_batch, encode=None, **kb_options):
+    """
+    Write ``chunks`` to a fresh in-memory collection in ``add`` calls of ``add_batch`` chunks.
+
+    Args:
+        encode: Function computing the vectors of a batch before ``add`` (None: ``add`` embeds them)
+        kb_options: ``QdrantKnowledgeBase`` options (``embed_batch_size``, ``embed_processes``)
+    """
+    kb = QdrantKnowledgeBase(client=QdrantClient(":memory:"), collection_name="bench_embedding", **kb_options)
+    embed_seconds = 0.0
+    encoded_before = embeddings.throughput()['seconds']
+    started = time.perf_counter()
+    for start in range(0, len(chunks), add_batch):
+        batch = chunks[start:start + add_batch]
+        vectors = None
+        if encode:
+            embed_started = time.perf_counter()
+            vectors = encode(batch)
+            embed_seconds += time.perf_counter() - embed_started
+        kb.add(
+            ids=[f"chunk-{start + i}" for i in range(len(batch))],
+            documents=batch,
+            metadatas=[{"url": f"https://example.com/{start + i}"} for i in range(len(batch))],
+            embeddings=vectors
+        )
+    elapsed = time.perf_counter() - started
+    if not encode:
+        # Time spent in the model by add() itself
+        embed_seconds = embeddings.throughput()['seconds'] - encoded_before
+    assert kb.count() == len(chunks)
+    print(f"{name:<14} embedding {len(chunks) / embed_seconds:8.1f} chunks/s, "
+          f"with upserts {len(chunks) / elapsed:8.1f} chunks/s ({elapsed:.2f}s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark batched and multi-process embedding in QdrantKnowledgeBase.add.")
+    parser.add_argument("--chunks", type=int, default=2000, help="Number of synthetic chunks")
+    parser.add_argument("--batch-sizes", default="16,32,64,128", help="Comma-separated encode batch sizes")
+    parser.add_argument("--processes", default="", help="Comma-separated worker process counts (e.g. 2,4)")
+    parser.add_argument("--add-batch", type=int, default=512,
+                        help="Chunks per add() call (512 = a streamed plan of the ingestion pipeline with 4 upload workers)")
+    args = parser.parse_args()
+
+    # Measure encoding, not cache hits
+    embeddings.EMBEDDING_CACHE = False
+    chunks = synthetic_chunks(args.chunks)
+    model = embeddings.get_model()
+    model.encode(chunks[:8])  # Warm-up
+    print(f"{len(chunks)} synthetic chunks, model {embeddings.EMBEDDING_MODEL_NAME}, {args.add_batch} chunks per add()")
+
+    run("per-document", chunks, args.add_batch, encode=lambda batch: [model.encode(text).tolist() for text in batch])
+    batch_sizes = [int(size) for size in args.batch_sizes.split(",")]
+    for batch_size in batch_sizes:
+        run(f"batch={batch_size}", chunks, args.add_batch, embed_batch_size=batch_size, embed_processes=0)
+    for processes in [int(count) for count in args.processes.split(",") if count]:
+        if args.add_batch < embeddings.MULTI_PROCESS_MIN_TEXTS:
+            print(f"processes={processes}: add() calls of {args.add_batch} chunks are encoded in-process "
+                  f"(the pool is used from {embeddings.MULTI_PROCESS_MIN_TEXTS} texts)")
+            break
+        run(f"processes={processes}", chunks, args.add_batch,
+            embed_batch_size=max(batch_sizes), embed_processes=processes)
+    embeddings.stop_pool()
@@ -0,0 +1,87 @@
+"""
+Benchmark for scraper.extract_page over a saved HTML corpus.
+
+Reports the per-page CPU cost of the extraction for each BeautifulSoup parser, split
+into parsing, markdown conversion and the rest (images, links, title), and how many
+pages come out different from the built-in 'html.parser' result.
+
+The corpus is an offline mirror of the help site (``python site_mirror.py record path/to/mirror``)
+or any directory of saved pages (``*.html`` / ``*.htm``, searched recursively).
+
+Usage:
+    python benchmarks/bench_extract.py --corpus path/to/mirror [--parsers html.parser lxml] [--rounds 3]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import html2text  # noqa: E402
+from bs4 import BeautifulSoup  # noqa: E402
+
+import scraper  # noqa: E402
+from site_mirror import saved_pages  # noqa: E402
+
+
+def bench_parser(pages, parser, rounds):
+    """CPU milliseconds per page for the full extraction and its parse/markdown stages."""
+    total = parse = markdown = 0.0
+    for _ in range(rounds):
+        for url, html in pages:
+            started = time.process_time()
+            scraper.extract_page(url, html, parser=parser)
+            total += time.process_time() - started
+
+            # Stage breakdown (same steps as extract_page)
+            started = time.process_time()
+            soup = BeautifulSoup(html, parser)
+            first, _, _ = scraper._scan(soup)
+            parsed = time.process_time()
+            content = first['main'] or first['article'] or first['body']
+            if content is not None:
+                h = html2text.HTML2Text()
+                h.ignore_links = False
+                h.unicode_snob = True
+                h.handle(str(content))
+            parse += parsed - started
+            markdown += time.process_time() - parsed
+    n = len(pages) * rounds / 1000
+    return total / n, parse / n, markdown / n
+
+
+def count_differences(pages, parser):
+    """Number of pages whose extraction differs from the 'html.parser' result."""
+    return sum(
+        scraper.extract_page(url, html, parser=parser) != scraper.extract_page(url, html, parser='html.parser')
+        for url, html in pages
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark HTML extraction over a saved corpus.")
+    parser.add_argument("--corpus", required=True,
+                        help="Mirror recorded by 'site_mirror.py record', or a directory of saved HTML pages")
+    parser.add_argument("--parsers", nargs='+', default=['html.parser', 'lxml'], help="BeautifulSoup parsers to compare")
+    parser.add_argument("--rounds", type=int, default=3, help="Passes over the corpus per parser")
+    args = parser.parse_args()
+
+    if not Path(args.corpus).is_dir():
+        sys.exit(f"Corpus directory {args.corpus} not found (record one with: python site_mirror.py record {args.corpus})")
+    pages = saved_pages(args.corpus)
+    if not pages:
+        sys.exit(f"No HTML pages found in {args.corpus}")
+    size_mb = sum(len(html) for _, html in pages) / 1024 / 1024
+    print(f"Corpus: {len(pages)} pages, {size_mb:.1f} MB")
+
+    scraper.logger.setLevel('WARNING')
+    for name in args.parsers:
+        if scraper._html_parser(name) != name:
+            continue
+        total, parse, markdown = bench_parser(pages, name, args.rounds)
+        line = (f"{name:12s} {total:7.2f} ms/page CPU "
+                f"(parse+scan {parse:.2f}, markdown {markdown:.2f}, images/links {max(total - parse - markdown, 0):.2f})")
+        if name != 'html.parser':
+            line += f", {count_differences(pages, name)} pages differ from html.parser"
+        print(line)
@@ -0,0 +1,63 @@
+"""
+Micro-benchmark for image_classifier.
+
+Classifies the image tags of fixtures/image_tags.json (expected results recorded from the
+previous inline filters of scraper.py and agent.py), checks that every decision is unchanged
+and reports the classification throughput.
+
+Usage:
+    python benchmarks/bench_image_classifier.py [--rounds 200]
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from image_classifier import classify_image  # noqa: E402
+
+FIXTURE = Path(__file__).parent / "fixtures" / "image_tags.json"
+
+
+def check(cases):
+    """Return the cases whose classification differs from the recorded one."""
+    mismatches = []
+    for case in cases:
+        result = classify_image(case['url'], case['alt'], case['title'], case['context'],
+                                case['caption'], case['width'], case['height'])
+        expected = case['expected']
+        if result.is_screenshot != expected['is_screenshot'] or result.priority != expected['priority']:
+            mismatches.append((case, result))
+    return mismatches
+
+
+def bench(cases, rounds):
+    """Classify every case ``rounds`` times, return images per second."""
+    args = [(c['url'], c['alt'], c['title'], c['context'], c['caption'], c['width'], c['height']) for c in cases]
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for a in args:
+            classify_image(*a)
+    elapsed = time.perf_counter() - started
+    return len(args) * rounds / elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the image classifier on the fixture image tags.")
+    parser.add_argument("--rounds", type=int, default=200, help="Number of passes over the fixture")
+    args = parser.parse_args()
+
+    with FIXTURE.open('r', encoding='utf-8') as f:
+        cases = json.load(f)
+
+    mismatches = check(cases)
+    for case, result in mismatches[:10]:
+        print(f"MISMATCH {case['url']} alt={case['alt']!r}: expected {case['expected']}, got {result}")
+    screenshots = sum(c['expected']['is_screenshot'] for c in cases)
+    print(f"{len(cases)} image tags ({screenshots} screenshots), {len(mismatches)} mismatches")
+
+    rate = bench(cases, args.rounds)
+    print(f"classify_image: {rate:,.0f} images/s ({1e6 / rate:.1f} µs/image)")
+    sys.exit(1 if mismatches else 0)
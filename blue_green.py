@@ -0,0 +1,83 @@
+"""
+Blue/green reindexing helpers.
+A full reindex is written into a new versioned collection ("primlogix_docs_<timestamp>")
+while the app keeps querying the live one, then traffic is switched in one atomic step:
+a collection alias on Qdrant, a pointer file next to the Chroma data. The previous
+collection is kept so a rollback is a switch back.
+"""
+import os
+import re
+import time
+from pathlib import Path
+
+# Number of collections kept after a switch (the live one and the previous one, for rollback)
+BLUE_GREEN_KEEP = int(os.getenv('BLUE_GREEN_KEEP', '2'))
+# File next to the Chroma data holding the name of the live collection
+CHROMA_POINTER_FILE = "live_collection"
+
+
+def new_version():
+    """Version suffix of a collection built now (sortable timestamp)."""
+    return time.strftime("%Y%m%d%H%M%S", time.gmtime())
+
+
+def versioned_name(base, version):
+    return f"{base}_{version}"
+
+
+def list_versions(names, base):
+    """Collections of ``names`` that are versions of ``base`` (the unversioned legacy name first), oldest first."""
+    pattern = re.compile(rf"^{re.escape(base)}(_\d{{14}})?$")
+    return sorted(name for name in names if pattern.match(name))
+
+
+def previous_version(names, base, current):
+    """Version built before ``current`` (None if there is none)."""
+    older = [name for name in list_versions(names, base) if name < current]
+    return older[-1] if older else None
+
+
+def versions_to_prune(names, base, live, previous, keep=BLUE_GREEN_KEEP, in_use=()):
+    """
+    Old versions to delete: all but the ``keep`` most recent versioned collections.
+
+    Never the live or the previous one, a collection in ``in_use`` (e.g. the target of an alias)
+    or the unversioned ``base`` collection, which processes started before the first reindex
+    may still be querying.
+    """
+    versions = [name for name in list_versions(names, base) if name != base]
+    kept = set(versions[-keep:]) if keep > 0 else set()
+    kept |= {live, previous, *in_use}
+    return [name for name in versions if name not in kept]
+
+
+def read_chroma_pointer(persist_directory, default):
+    """Name of the live Chroma collection (``default`` before the first blue/green reindex)."""
+    path = Path(persist_directory) / CHROMA_POINTER_FILE
+    try:
+        return path.read_text(encoding='utf-8').strip() or default
+    except FileNotFoundError:
+        return default
+
+
+def write_chroma_pointer(persist_directory, name):
+    """Atomically point the live Chroma collection to ``name``."""
+    path = Path(persist_directory) / CHROMA_POINTER_FILE
+    tmp_path = path.with_suffix('.tmp')
+    tmp_path.write_text(name, encoding='utf-8')
+    os.replace(tmp_path, path)
+
+
+def chroma_pointer_state(persist_directory):
+    """Modification stamp of the pointer file, to notice a switch made by another process."""
+    try:
+        return (Path(persist_directory) / CHROMA_POINTER_FILE).stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def chroma_manifest_path(persist_directory, name, base):
+    """Ingestion manifest of a Chroma collection (the legacy collection keeps its original file)."""
+    if name == base:
+        return os.path.join(persist_directory, "ingest_manifest.json")
+    return os.path.join(persist_directory, f"ingest_manifest_{name}.json")
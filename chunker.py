@@ -0,0 +1,154 @@
+"""
+Structure-aware chunking of the scraped markdown.
+Pages are split on headings and paragraphs (blank-line separated blocks: paragraphs, lists of
+steps, tables) and blocks are packed into chunks sized with the embedding model's own tokenizer,
+so no chunk is silently truncated by the model and words, headings or numbered steps are not
+cut in half. Blocks that are too long on their own are split on lines, then sentences, then words.
+"""
+import os
+import re
+import math
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Tokenizer of the embedding model (all-MiniLM-L6-v2 truncates input at 256 tokens)
+TOKENIZER_NAME = os.getenv('CHUNK_TOKENIZER', "sentence-transformers/all-MiniLM-L6-v2")
+# Leaves room for the [CLS]/[SEP] tokens and small differences when blocks are joined
+CHUNK_MAX_TOKENS = int(os.getenv('CHUNK_MAX_TOKENS', '240'))
+# A short trailing block of the previous chunk is repeated at the start of the next one
+CHUNK_OVERLAP_TOKENS = int(os.getenv('CHUNK_OVERLAP_TOKENS', '32'))
+# A heading starts a new chunk unless the current chunk is shorter than this
+MIN_SECTION_TOKENS = 48
+
+_BLOCK_SEPARATOR_RE = re.compile(r"\n[ \t]*\n")
+_HEADING_RE = re.compile(r"^#{1,6}\s", re.MULTILINE)
+_LINE_RE = re.compile(r"[^\n]+")
+_SENTENCE_RE = re.compile(r"[^.!?;:]+(?:[.!?;:]+|$)")
+_WORD_RE = re.compile(r"\S+")
+# Fallback estimate when the tokenizer cannot be loaded: WordPiece splits French words a lot
+_ESTIMATE_RE = re.compile(r"\w+|[^\w\s]")
+
+_tokenizer = None
+_tokenizer_loaded = False
+
+
+def set_tokenizer(tokenizer):
+    """Use an already loaded (Hugging Face) tokenizer, e.g. the one of the embedding model."""
+    global _tokenizer, _tokenizer_loaded
+    _tokenizer = tokenizer
+    _tokenizer_loaded = True
+
+
+def get_tokenizer():
+    """Tokenizer of the embedding model, loaded once (None if unavailable: token counts are estimated)."""
+    global _tokenizer, _tokenizer_loaded
+    if not _tokenizer_loaded:
+        _tokenizer_loaded = True
+        try:
+            from transformers import AutoTokenizer
+            _tokenizer = AutoTokenizer.from_pretrained(TOKENIZER_NAME)
+        except Exception as e:
+            logger.warning(f"Could not load tokenizer {TOKENIZER_NAME}, estimating token counts: {e}")
+            _tokenizer = None
+    return _tokenizer
+
+
+def count_tokens(texts):
+    """Number of model tokens (without special tokens) of each text."""
+    if not texts:
+        return []
+    tokenizer = get_tokenizer()
+    if tokenizer is None:
+        return [math.ceil(len(_ESTIMATE_RE.findall(text)) * 1.3) for text in texts]
+    return [len(ids) for ids in tokenizer(list(texts), add_special_tokens=False)['input_ids']]
+
+
+def _blocks(text):
+    """``(start, end, is_heading)`` of the blank-line separated blocks, also split before heading lines."""
+    starts = [0] + [m.end() for m in _BLOCK_SEPARATOR_RE.finditer(text)]
+    blocks = []
+    for i, start in enumerate(starts):
+        end = starts[i + 1] if i + 1 < len(starts) else len(text)
+        cuts = [start] + [m.start() for m in _HEADING_RE.finditer(text, start, end) if m.start() > start] + [end]
+        for cut_start, cut_end in zip(cuts, cuts[1:]):
+            segment = text[cut_start:cut_end]
+            stripped = segment.strip()
+            if not stripped:
+                continue
+            block_start = cut_start + (len(segment) - len(segment.lstrip()))
+            blocks.append((block_start, block_start + len(stripped), _HEADING_RE.match(stripped) is not None))
+    return blocks
+
+
+def _split(text, start, end, max_tokens, patterns=(_LINE_RE, _SENTENCE_RE, _WORD_RE)):
+    """Split an oversized span into ``(start, end, tokens)`` pieces of at most ``max_tokens`` (lines, then sentences, then words)."""
+    pattern, finer = patterns[0], patterns[1:]
+    parts = [(start + m.start(), start + m.end()) for m in pattern.finditer(text[start:end]) if m.group().strip()]
+    counts = count_tokens([text[s:e] for s, e in parts])
+    pieces = []
+    for (s, e), tokens in zip(parts, counts):
+        if tokens > max_tokens and finer:
+            pieces.extend(_split(text, s, e, max_tokens, finer))
+        else:
+            # A single word longer than the limit is kept whole (the model truncates it)
+            pieces.append((s, e, tokens))
+
+    # Re-pack the pieces greedily up to the limit
+    packed = []
+    for s, e, tokens in pieces:
+        if packed and packed[-1][2] + tokens <= max_tokens:
+            packed[-1] = (packed[-1][0], e, count_tokens([text[packed[-1][0]:e]])[0])
+        else:
+            packed.append((s, e, tokens))
+    return packed
+
+
+def chunk_spans(text, max_tokens=CHUNK_MAX_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS):
+    """
+    Split markdown into chunks along headings and paragraphs.
+
+    Args:
+        text: Page markdown (html2text output)
+        max_tokens: Maximum number of model tokens per chunk
+        overlap_tokens: A trailing block up to this size is repeated at the start of the next chunk
+            (never across a heading)
+
+    Returns:
+        List of ``(start, end)`` character offsets of the chunks in ``text``
+    """
+    if not text or not text.strip():
+        return []
+    blocks = _blocks(text)
+    counts = count_tokens([text[s:e] for s, e, _ in blocks])
+
+    units = []  # (start, end, tokens, is_heading)
+    for (start, end, is_heading), tokens in zip(blocks, counts):
+        if tokens > max_tokens:
+            units.extend((s, e, t, False) for s, e, t in _split(text, start, end, max_tokens))
+        else:
+            units.append((start, end, tokens, is_heading))
+
+    spans = []
+    current = []  # units of the chunk being built
+    current_tokens = 0
+    for unit in units:
+        _, _, tokens, is_heading = unit
+        if current and (current_tokens + tokens > max_tokens or (is_heading and current_tokens >= MIN_SECTION_TOKENS)):
+            spans.append((current[0][0], current[-1][1]))
+            last = current[-1]
+            if (not is_heading and len(current) > 1 and last[2] <= overlap_tokens
+                    and last[2] + tokens <= max_tokens and not last[3]):
+                current, current_tokens = [last], last[2]
+            else:
+                current, current_tokens = [], 0
+        current.append(unit)
+        current_tokens += tokens
+    if current:
+        spans.append((current[0][0], current[-1][1]))
+    return spans
+
+
+def chunk_text(text, max_tokens=CHUNK_MAX_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS):
+    """Split markdown into chunk strings (see ``chunk_spans``)."""
+    return [text[start:end] for start, end in chunk_spans(text, max_tokens, overlap_tokens)]
@@ -0,0 +1,332 @@
+"""
+Boilerplate and near-duplicate removal between scraping and chunking.
+Pages are converted from their whole ``<body>`` when no content container is found, so
+navigation menus, headers and footers repeated on every help page end up in the chunks.
+This stage strips blocks that recur across many pages and drops pages whose remaining
+text is a near-duplicate (MinHash) of a page already ingested, before anything is embedded.
+"""
+import os
+import re
+import json
+import hashlib
+import logging
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# A block found on at least this many pages is boilerplate
+BOILERPLATE_MIN_PAGES = int(os.getenv('INGEST_BOILERPLATE_MIN_PAGES', '8'))
+# Shorter blocks (e.g. a repeated "Remarque :" heading) are kept, they carry context
+BOILERPLATE_MIN_CHARS = 20
+# Pages buffered before the first one is released, so site-wide blocks are known from the start
+WARMUP_PAGES = 32
+# Estimated Jaccard similarity of the word shingles above which two pages are near-duplicates
+NEAR_DUPLICATE_SIMILARITY = 0.9
+SHINGLE_SIZE = 3
+# Pages with fewer words only match exact duplicates (MinHash is too coarse on tiny texts)
+MIN_MINHASH_WORDS = 40
+MINHASH_PERMUTATIONS = 128
+# LSH banding: 32 bands of 4 rows make pages with a similarity above ~0.5 candidates
+MINHASH_BANDS = 32
+
+_BLOCK_SEPARATOR_RE = re.compile(r"(\n[ \t]*\n\s*)")
+# Link/image targets differ from page to page ("Previous"/"Next" bars), the text does not
+_LINK_TARGET_RE = re.compile(r"\]\([^)]*\)")
+_WORD_RE = re.compile(r"\w+")
+_MERSENNE_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(20240229)  # Fixed seed: signatures must be comparable across runs
+_PERM_A = _rng.integers(1, _MERSENNE_PRIME, MINHASH_PERMUTATIONS, dtype=np.uint64)
+_PERM_B = _rng.integers(0, _MERSENNE_PRIME, MINHASH_PERMUTATIONS, dtype=np.uint64)
+
+
+def block_key(block):
+    """Normalized hash of a markdown block (link targets, case and spacing ignored)."""
+    text = _LINK_TARGET_RE.sub("]", block)
+    text = " ".join(text.lower().split())
+    if len(text) < BOILERPLATE_MIN_CHARS:
+        return None
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def split_blocks(text):
+    """Split markdown into ``(block, separator)`` pairs (blank lines separate blocks)."""
+    parts = _BLOCK_SEPARATOR_RE.split(text)
+    parts.append("")
+    return list(zip(parts[0::2], parts[1::2]))
+
+
+def minhash(text):
+    """MinHash signature of the word shingles of ``text`` (None if the text is too short)."""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < MIN_MINHASH_WORDS:
+        return None
+    shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=4).digest(), 'little') for s in shingles],
+        dtype=np.uint64
+    )
+    # (a * h + b) mod p stays below 2**63 with 31-bit a, b and 32-bit h
+    return ((np.outer(hashes, _PERM_A) + _PERM_B) % _MERSENNE_PRIME).min(axis=0).astype(np.uint32)
+
+
+def similarity(signature, other):
+    """Jaccard similarity estimated from two MinHash signatures."""
+    return float(np.mean(signature == other))
+
+
+def _map_offset(layout, position, length):
+    """Offset in the stripped text of ``position`` (see ``Deduplicator.strip_boilerplate``)."""
+    for offset, new_offset, size in layout:
+        if position < offset:
+            return new_offset  # In a removed block: start of the next kept block
+        if position < offset + size:
+            return new_offset + position - offset
+    return length
+
+
+class Deduplicator:
+    """
+    Streaming boilerplate / near-duplicate filter for page dicts.
+
+    Block frequencies of the previous run are loaded from ``state_path`` (if given) so that
+    boilerplate is recognized on the very first page; the current run's frequencies replace
+    them once the stream has been fully consumed (a smaller run, e.g. a few pages added from
+    the app, is merged into them instead).
+
+    Of two near-duplicate pages, the first one seen is kept. The state also records which
+    page was kept for every duplicate, and a page that was a duplicate in the previous run
+    is held back until the page kept then has been seen, so the same page stays kept whatever
+    order the crawler returns them in (switching would re-embed one page and delete the other).
+    """
+
+    def __init__(self, state_path=None, min_pages=BOILERPLATE_MIN_PAGES,
+                 similarity=NEAR_DUPLICATE_SIMILARITY, warmup=WARMUP_PAGES):
+        """
+        Args:
+            state_path: Optional JSON file keeping the block frequencies between runs
+            min_pages: Number of pages a block must appear on to be treated as boilerplate
+            similarity: Estimated shingle similarity from which two pages are near-duplicates
+            warmup: Pages buffered before the first page is released
+        """
+        self.state_path = Path(state_path) if state_path else None
+        self.min_pages = min_pages
+        self.similarity = similarity
+        self.warmup = warmup
+        self.block_pages = Counter()  # block key -> pages of this run containing it
+        self.previous_pages, self.previous_block_pages, self.previous_duplicates = self._load_state()
+        self._content_hashes = {}  # (scope, exact content hash) -> url
+        self._signatures = {}  # url -> MinHash signature
+        self._bands = {}  # (scope, band index, band bytes) -> [url]
+        self.duplicates = {}  # duplicate url -> url of the page kept
+        self.urls = []  # Pages cleaned, to count their chunks once they are ingested
+        self._cleaned = set()
+        self._held = {}  # url kept in the previous run -> its duplicates waiting for it
+        self.stats = {
+            'pages': 0, 'duplicate_pages': 0, 'boilerplate_blocks': 0, 'chars_before': 0, 'chars_removed': 0,
+        }
+
+    def _load_state(self):
+        """Return ``(pages, block_pages, duplicates)`` of the previous run."""
+        if not self.state_path or not self.state_path.exists():
+            return 0, {}, {}
+        try:
+            with self.state_path.open('r', encoding='utf-8') as f:
+                state = json.load(f)
+            return state.get('pages', 0), state.get('block_pages', {}), state.get('duplicates', {})
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read boilerplate state {self.state_path}: {e}")
+            return 0, {}, {}
+
+    def save_state(self):
+        """Persist the block frequencies (blocks seen on a single page are left out) and duplicates of this run."""
+        if not self.state_path:
+            return
+        pages = self.stats['pages']
+        block_pages = Counter({key: n for key, n in self.block_pages.items() if n > 1})
+        duplicates = self.duplicates
+        if pages < self.previous_pages:
+            block_pages = Counter(self.previous_block_pages) | block_pages
+            pages = self.previous_pages
+            duplicates = {url: kept for url, kept in self.previous_duplicates.items() if url not in self._cleaned}
+            duplicates.update(self.duplicates)
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_suffix('.tmp')
+        with tmp_path.open('w', encoding='utf-8') as f:
+            json.dump({'pages': pages, 'block_pages': block_pages, 'duplicates': duplicates}, f)
+        os.replace(tmp_path, self.state_path)
+
+    def is_boilerplate(self, key):
+        return key is not None and max(self.block_pages[key], self.previous_block_pages.get(key, 0)) >= self.min_pages
+
+    def _count_blocks(self, page):
+        keys = {block_key(block) for block, _ in split_blocks(page.get('content') or "")}
+        keys.discard(None)
+        self.block_pages.update(keys)
+
+    def strip_boilerplate(self, text, positions=()):
+        """
+        Remove the boilerplate blocks of a page's markdown.
+
+        Args:
+            text: Page markdown
+            positions: Offsets in ``text`` (e.g. image positions) to carry over to the stripped text
+
+        Returns:
+            The stripped text, and the list of ``positions`` mapped to it when some were given
+            (an offset inside a removed block moves to the start of the next kept text)
+        """
+        kept = []
+        layout = []  # (offset in text, offset in the stripped text) of each kept block
+        offset = length = 0
+        for block, separator in split_blocks(text):
+            if self.is_boilerplate(block_key(block)):
+                self.stats['boilerplate_blocks'] += 1
+            else:
+                layout.append((offset, length, len(block + separator)))
+                kept.append(block + separator)
+                length += len(block + separator)
+            offset += len(block + separator)
+        joined = "".join(kept)
+        stripped = joined.strip()
+        if not positions:
+            return stripped
+        leading = len(joined) - len(joined.lstrip())
+        return stripped, [
+            None if position is None else min(max(_map_offset(layout, position, length) - leading, 0), len(stripped))
+            for position in positions
+        ]
+
+    def find_duplicate(self, url, text, scope=None):
+        """
+        URL of an earlier page with the same or nearly the same text (None if the page is new).
+
+        Only pages of the same ``scope`` (help version and language) are compared: identical pages
+        of different versions are kept, their chunks are shared by the content-addressed index instead.
+        """
+        digest = (scope, hashlib.blake2b(" ".join(text.split()).encode('utf-8'), digest_size=16).digest())
+        if digest in self._content_hashes:
+            return self._content_hashes[digest]
+        self._content_hashes[digest] = url
+
+        signature = minhash(text)
+        if signature is None:
+            return None
+        bands = [(scope, i, band.tobytes()) for i, band in enumerate(np.split(signature, MINHASH_BANDS))]
+        candidates = dict.fromkeys(other for band in bands for other in self._bands.get(band, ()))
+        for other_url in candidates:
+            if similarity(signature, self._signatures[other_url]) >= self.similarity:
+                return other_url
+        self._signatures[url] = signature
+        for band in bands:
+            self._bands.setdefault(band, []).append(url)
+        return None
+
+    def clean(self, page):
+        """
+        Return the page with its boilerplate stripped.
+
+        A near-duplicate page is returned with empty content (and ``duplicate_of`` set) rather
+        than left out, so that the manifest still deletes chunks it had from earlier runs.
+        """
+        original = page.get('content') or ""
+        images = page.get('images') or []
+        positions = [image.get('position') for image in images]
+        if any(position is not None for position in positions):
+            # Keep image positions pointing at the same place in the stripped text
+            content, positions = self.strip_boilerplate(original, positions)
+            images = [{**image, 'position': position} for image, position in zip(images, positions)]
+        else:
+            content = self.strip_boilerplate(original)
+        self.stats['pages'] += 1
+        self.urls.append(page['url'])
+        self._cleaned.add(page['url'])
+
+        scope = (page.get('language'), page.get('version'))
+        duplicate_of = self.find_duplicate(page['url'], content, scope) if content else None
+        if duplicate_of:
+            self.stats['duplicate_pages'] += 1
+            self.duplicates[page['url']] = duplicate_of
+            logger.debug(f"{page['url']} is a near-duplicate of {duplicate_of}")
+            content = ""
+        self.stats['chars_before'] += len(original)
+        self.stats['chars_removed'] += len(original) - len(content)
+
+        cleaned = {**page, 'content': content}
+        if images:
+            cleaned['images'] = images
+        if duplicate_of:
+            cleaned['duplicate_of'] = duplicate_of
+        return cleaned
+
+    def _release(self, page):
+        """Clean a page, unless it was a duplicate in the previous run of a page not seen yet (then hold it)."""
+        kept = self.previous_duplicates.get(page['url'])
+        if kept and kept != page['url'] and kept not in self._cleaned:
+            self._held.setdefault(kept, []).append(page)
+            return
+        yield from self._clean_and_unhold(page)
+
+    def _clean_and_unhold(self, page):
+        yield self.clean(page)
+        for held in self._held.pop(page['url'], []):
+            yield from self._clean_and_unhold(held)
+
+    def process(self, pages):
+        """
+        Yield the cleaned pages of an iterable (see ``clean``).
+
+        The first ``warmup`` pages are buffered so blocks repeated on every page are already
+        counted when they are released. Duplicates of the previous run wait for the page kept
+        then; those whose kept page never comes are released at the end.
+        """
+        buffer = []
+        for page in pages:
+            self._count_blocks(page)
+            if len(buffer) < self.warmup:
+                buffer.append(page)
+                continue
+            while buffer:
+                yield from self._release(buffer.pop(0))
+            yield from self._release(page)
+        while buffer:
+            yield from self._release(buffer.pop(0))
+        while self._held:
+            # The page kept in the previous run is gone or not crawled: compare them normally
+            for page in self._held.pop(next(iter(self._held))):
+                yield from self._clean_and_unhold(page)
+        self.save_state()
+
+    def report(self, chunks_after=None):
+        """
+        Deduplication statistics.
+
+        Pages are not chunked here: the chunks of the cleaned pages are counted by the caller
+        (e.g. from the ingestion manifest) and the chunks the original pages would have given
+        are estimated from the share of characters removed.
+
+        Args:
+            chunks_after: Chunks the cleaned pages were split into (None leaves the chunk counts out)
+        """
+        stats = dict(self.stats)
+        if chunks_after is not None:
+            chars_after = stats['chars_before'] - stats['chars_removed']
+            stats['chunks_after'] = chunks_after
+            stats['chunks_before'] = round(chunks_after * stats['chars_before'] / chars_after) if chars_after else chunks_after
+            stats['chunks_saved'] = stats['chunks_before'] - chunks_after
+        return stats
+
+    def log_report(self, chunks_after=None):
+        """Log the statistics of ``report``. Returns them."""
+        stats = self.report(chunks_after)
+        message = (
+            f"Dedup: {stats['duplicate_pages']}/{stats['pages']} near-duplicate pages dropped, "
+            f"{stats['boilerplate_blocks']} boilerplate blocks stripped ({stats['chars_removed']} chars)"
+        )
+        if chunks_after is not None:
+            message += (f", {stats['chunks_after']} chunks instead of about {stats['chunks_before']} "
+                        f"({stats['chunks_saved']} chunks and embeddings saved)")
+        logger.info(message)
+        return stats
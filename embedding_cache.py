@@ -0,0 +1,213 @@
+"""
+Persistent embedding cache.
+Vectors are kept in a memory-mapped float32 array (one fixed-size slot per text) with a
+SQLite index mapping the hash of the normalized text to its slot, one directory per model.
+Re-ingesting, migrating between backends or repeating a query reuses the stored vectors
+instead of running the model again.
+"""
+import os
+import re
+import sqlite3
+import hashlib
+import threading
+import time
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_CACHE_DIR = Path(os.getenv('PRIMBOT_EMBEDDING_CACHE_DIR', Path.home() / ".primbot" / "embedding_cache"))
+DEFAULT_MAX_BYTES = int(os.getenv('PRIMBOT_EMBEDDING_CACHE_MAX_MB', '256')) * 1024 * 1024
+# Share of the slots freed at once when the cache is full (evicting one entry per insert would thrash)
+EVICT_FRACTION = 0.1
+# SQLite limits the number of host parameters per statement
+_SQL_BATCH = 500
+
+
+def text_key(text: str) -> str:
+    """Hash of a text with its whitespace normalized (the tokenizer ignores it)."""
+    return hashlib.sha1(" ".join(text.split()).encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    """Fixed-capacity vector store (memmap) with an LRU index (SQLite), for one model."""
+
+    def __init__(self, model_name, dim, cache_dir=EMBEDDING_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Args:
+            model_name: Embedding model the vectors come from (each model has its own directory)
+            dim: Vector dimension
+            cache_dir: Root directory of the cache
+            max_bytes: Size of the vector file; least recently used vectors are evicted beyond it
+        """
+        self.model_name = model_name
+        self.dim = dim
+        self.cache_dir = Path(cache_dir) / re.sub(r"[^\w.-]+", "_", model_name)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.db_file = self.cache_dir / "index.db"
+        self.vectors_file = self.cache_dir / "vectors.f32"
+        self.capacity = max(1, max_bytes // (dim * 4))
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._init_database()
+        self._vectors = self._open_vectors()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_file, timeout=30)
+
+    def _init_database(self):
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                slot INTEGER NOT NULL UNIQUE,
+                last_used REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_last_used ON entries(last_used)")
+        conn.execute("CREATE TABLE IF NOT EXISTS info (name TEXT PRIMARY KEY, value TEXT)")
+        row = conn.execute("SELECT value FROM info WHERE name = 'dim'").fetchone()
+        if row and int(row[0]) != self.dim:
+            logger.warning(f"Embedding cache {self.cache_dir} holds {row[0]}-d vectors, clearing it")
+            conn.execute("DELETE FROM entries")
+        conn.execute("INSERT OR REPLACE INTO info (name, value) VALUES ('dim', ?)", (str(self.dim),))
+        # The size limit may have been lowered since the vectors were written
+        conn.execute("DELETE FROM entries WHERE slot >= ?", (self.capacity,))
+        conn.commit()
+        conn.close()
+
+    def _open_vectors(self):
+        size = self.capacity * self.dim * 4
+        with open(self.vectors_file, 'ab') as f:
+            if f.tell() != size:
+                f.truncate(size)  # Sparse on most filesystems: unused slots take no disk space
+        return np.memmap(self.vectors_file, dtype=np.float32, mode='r+', shape=(self.capacity, self.dim))
+
+    def _lookup(self, conn, keys):
+        """Slot of each of ``keys`` that is in the index."""
+        slots = {}
+        for start in range(0, len(keys), _SQL_BATCH):
+            batch = keys[start:start + _SQL_BATCH]
+            slots.update(conn.execute(
+                f"SELECT key, slot FROM entries WHERE key IN ({','.join('?' * len(batch))})", batch
+            ).fetchall())
+        return slots
+
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Cached vector of each text (None for misses); hits are marked as recently used."""
+        keys = [text_key(text) for text in texts]
+        conn = self._connect()
+        conn.isolation_level = None  # Transactions are explicit
+        # Vectors are copied inside the read transaction: its shared lock holds back the commit
+        # that evicts an entry, and ``store_many`` only reuses a slot after that commit
+        conn.execute("BEGIN")
+        try:
+            slots = self._lookup(conn, list(dict.fromkeys(keys)))
+            vectors = {key: np.array(self._vectors[slot]) for key, slot in slots.items()}
+        finally:
+            conn.execute("COMMIT")
+        if vectors:
+            with self._lock:
+                now = time.time()
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany("UPDATE entries SET last_used = ? WHERE key = ?", [(now, key) for key in vectors])
+                conn.execute("COMMIT")
+        conn.close()
+
+        results = [vectors.get(key) for key in keys]
+        hits = sum(1 for vector in results if vector is not None)
+        with self._lock:
+            self.hits += hits
+            self.misses += len(results) - hits
+        return results
+
+    def store_many(self, texts: List[str], vectors):
+        """
+        Cache the vectors of ``texts`` (evicting the least recently used ones if the cache is full).
+
+        The cache is shared between processes (the app embeds queries while ``ingest.py`` runs):
+        slots are allocated, written and indexed inside one ``BEGIN IMMEDIATE`` transaction, and
+        evicted slots are only reused once their removal is committed, which waits for the reads
+        of ``get_many`` in progress.
+        """
+        entries = dict(zip((text_key(text) for text in texts), vectors))
+        if not entries:
+            return
+        with self._lock:
+            conn = self._connect()
+            conn.isolation_level = None  # Transactions are explicit
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                keys = self._new_keys(conn, entries)
+                shortfall = len(keys) - len(self._free_slots(conn, len(keys)))
+                if shortfall > 0:
+                    self._evict(conn, shortfall)
+                    conn.execute("COMMIT")
+                    conn.execute("BEGIN IMMEDIATE")
+                    # Another process may have stored some of the keys or taken freed slots meanwhile
+                    keys = self._new_keys(conn, entries)
+                slots = self._free_slots(conn, len(keys))
+                keys = keys[:len(slots)]
+                if keys:
+                    # A crash before the commit only leaves vectors in slots no entry points to
+                    for key, slot in zip(keys, slots):
+                        self._vectors[slot] = entries[key]
+                    self._vectors.flush()
+                    now = time.time()
+                    conn.executemany("INSERT INTO entries (key, slot, last_used) VALUES (?, ?, ?)",
+                                     [(key, slot, now) for key, slot in zip(keys, slots)])
+                conn.execute("COMMIT")
+            except BaseException:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+            finally:
+                conn.close()
+
+    def _new_keys(self, conn, entries):
+        """Keys of ``entries`` not in the index yet (at most ``capacity``)."""
+        existing = self._lookup(conn, list(entries))
+        return [key for key in entries if key not in existing][:self.capacity]
+
+    def _free_slots(self, conn, count):
+        """Up to ``count`` slots no entry uses."""
+        used_count, high = conn.execute("SELECT COUNT(*), COALESCE(MAX(slot) + 1, 0) FROM entries").fetchone()
+        if used_count == high:
+            return list(range(high, min(self.capacity, high + count)))
+        # Slots freed by an earlier eviction
+        used = {slot for slot, in conn.execute("SELECT slot FROM entries")}
+        return [slot for slot in range(self.capacity) if slot not in used][:count]
+
+    def _evict(self, conn, count):
+        """Delete at least ``count`` least recently used entries (the caller commits)."""
+        evict = max(count, int(self.capacity * EVICT_FRACTION))
+        rows = conn.execute("SELECT key FROM entries ORDER BY last_used ASC LIMIT ?", (evict,)).fetchall()
+        conn.executemany("DELETE FROM entries WHERE key = ?", rows)
+        logger.info(f"Embedding cache: evicted {len(rows)} vectors")
+
+    def clear(self):
+        """Forget every cached vector."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM entries")
+            conn.commit()
+            conn.close()
+
+    def stats(self) -> Dict:
+        """Hit/miss counters of this process and the number of cached vectors."""
+        conn = self._connect()
+        entries = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        conn.close()
+        lookups = self.hits + self.misses
+        return {
+            'entries': entries,
+            'capacity': self.capacity,
+            'bytes': entries * self.dim * 4,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,164 @@
+"""
+Shared embedding model for every vector store.
+Chunks are embedded once by the ingestion pipeline and the vectors are handed to Chroma
+and/or Qdrant, so writing to both stores (e.g. during a migration) costs a single encode.
+Computed vectors (chunks and queries) are kept in a persistent cache (see ``embedding_cache``).
+"""
+import os
+import time
+import atexit
+import threading
+import logging
+
+import chunker
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL_NAME = os.getenv('EMBEDDING_MODEL', "all-MiniLM-L6-v2")
+EMBEDDING_DIM = 384  # Dimension for all-MiniLM-L6-v2
+# Texts encoded per forward pass
+EMBED_BATCH_SIZE = int(os.getenv('EMBED_BATCH_SIZE', '64'))
+# Worker processes for large encodes (0 or 1: encode in the calling process)
+EMBED_PROCESSES = int(os.getenv('EMBED_PROCESSES', '0'))
+# Below this many texts, feeding the worker pool costs more than it saves
+MULTI_PROCESS_MIN_TEXTS = 256
+# Reuse vectors computed by earlier runs and queries
+EMBEDDING_CACHE = os.getenv('EMBEDDING_CACHE', 'true').lower() == 'true'
+
+_model = None
+_model_lock = threading.Lock()
+_pool = None
+_pool_size = 0
+_cache = None
+_cache_loaded = False
+_stats = {'texts': 0, 'seconds': 0.0}
+_stats_lock = threading.Lock()
+
+
+def get_model():
+    """The sentence-transformers model, loaded once per process."""
+    global _model
+    with _model_lock:
+        if _model is None:
+            from sentence_transformers import SentenceTransformer
+            logger.info(f"Loading embedding model {EMBEDDING_MODEL_NAME}")
+            _model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+            # Chunks are sized with the tokenizer of the model that embeds them
+            chunker.set_tokenizer(_model.tokenizer)
+    return _model
+
+
+def get_cache():
+    """Persistent cache of the shared model's vectors (None if disabled or unavailable)."""
+    global _cache, _cache_loaded
+    with _model_lock:
+        if not _cache_loaded:
+            _cache_loaded = True
+            if EMBEDDING_CACHE:
+                try:
+                    from embedding_cache import EmbeddingCache
+                    _cache = EmbeddingCache(EMBEDDING_MODEL_NAME, EMBEDDING_DIM)
+                except Exception as e:
+                    logger.warning(f"Embedding cache unavailable, every text will be encoded: {e}")
+    return _cache
+
+
+def cache_stats():
+    """Hit/miss statistics of the embedding cache (None if it is disabled)."""
+    cache = get_cache()
+    return cache.stats() if cache else None
+
+
+def _get_pool(processes):
+    """Multi-process encode pool of the shared model (CPU workers), started on first use."""
+    global _pool, _pool_size
+    model = get_model()
+    with _model_lock:
+        if _pool is not None and _pool_size != processes:
+            model.stop_multi_process_pool(_pool)
+            _pool = None
+        if _pool is None:
+            logger.info(f"Starting {processes} embedding worker processes")
+            _pool = model.start_multi_process_pool(target_devices=["cpu"] * processes)
+            _pool_size = processes
+    return _pool
+
+
+def stop_pool():
+    """Stop the worker processes (also done at interpreter exit)."""
+    global _pool
+    with _model_lock:
+        if _pool is not None:
+            _model.stop_multi_process_pool(_pool)
+            _pool = None
+
+
+atexit.register(stop_pool)
+
+
+def embed(texts, batch_size=None, processes=None, use_cache=True):
+    """
+    Embed a list of texts in batches; only texts missing from the cache are encoded.
+
+    Args:
+        texts: List of strings
+        batch_size: Texts per forward pass (default: ``EMBED_BATCH_SIZE``)
+        processes: Worker processes for large inputs (default: ``EMBED_PROCESSES``)
+        use_cache: Look up and store the vectors in the persistent cache
+
+    Returns:
+        List of vectors (lists of floats), in the order of ``texts``
+    """
+    if not texts:
+        return []
+    texts = list(texts)
+    cache = get_cache() if use_cache else None
+    if cache is None:
+        return _encode(texts, batch_size, processes).tolist()
+
+    vectors = cache.get_many(texts)
+    missing = [i for i, vector in enumerate(vectors) if vector is None]
+    if missing:
+        encoded = _encode([texts[i] for i in missing], batch_size, processes)
+        cache.store_many([texts[i] for i in missing], encoded)
+        for i, vector in zip(missing, encoded):
+            vectors[i] = vector
+    return [vector.tolist() for vector in vectors]
+
+
+def _encode(texts, batch_size=None, processes=None):
+    """Run the model over ``texts`` (numpy array of vectors)."""
+    batch_size = batch_size or EMBED_BATCH_SIZE
+    processes = EMBED_PROCESSES if processes is None else processes
+    model = get_model()
+    started = time.perf_counter()
+    if processes > 1 and len(texts) >= MULTI_PROCESS_MIN_TEXTS:
+        vectors = model.encode_multi_process(texts, _get_pool(processes), batch_size=batch_size)
+    else:
+        vectors = model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+    elapsed = time.perf_counter() - started
+    with _stats_lock:
+        _stats['texts'] += len(texts)
+        _stats['seconds'] += elapsed
+    return vectors
+
+
+def throughput():
+    """Texts encoded by this process so far (cache hits excluded), time spent and texts per second."""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats['texts_per_sec'] = stats['texts'] / stats['seconds'] if stats['seconds'] else 0.0
+    return stats
+
+
+def embed_query(text):
+    """Embedding of a single query string."""
+    return embed([text])[0]
+
+
+def chroma_embedding_function():
+    """Chroma embedding function (used for query texts) reusing the shared model instead of loading a second copy."""
+    from chromadb.utils import embedding_functions
+    # The Chroma class keeps its loaded models in a class-level dict keyed by model name
+    embedding_functions.SentenceTransformerEmbeddingFunction.models.setdefault(EMBEDDING_MODEL_NAME, get_model())
+    return embedding_functions.SentenceTransformerEmbeddingFunction(model_name=EMBEDDING_MODEL_NAME)
@@ -0,0 +1,158 @@
+"""
+On-disk HTTP response cache for the scraper.
+Stores the body with its ETag/Last-Modified validators so re-crawls can use
+conditional requests and only download pages that actually changed.
+"""
+import os
+import sqlite3
+import threading
+import time
+import zlib
+import logging
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Cache directory (next to the local conversation storage)
+HTTP_CACHE_DIR = Path(os.getenv('PRIMBOT_HTTP_CACHE_DIR', Path.home() / ".primbot" / "http_cache"))
+DEFAULT_MAX_BYTES = int(os.getenv('PRIMBOT_HTTP_CACHE_MAX_MB', '200')) * 1024 * 1024
+DEFAULT_MAX_ENTRIES = int(os.getenv('PRIMBOT_HTTP_CACHE_MAX_ENTRIES', '20000'))
+
+
+class HttpCache:
+    """SQLite-backed response cache with LRU eviction bounded by size and entry count."""
+
+    def __init__(self, cache_dir=HTTP_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, max_entries=DEFAULT_MAX_ENTRIES):
+        """
+        Args:
+            cache_dir: Directory holding the cache database
+            max_bytes: Maximum total size of the stored (compressed) bodies
+            max_entries: Maximum number of cached URLs
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.db_file = self.cache_dir / "responses.db"
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        # Crawler worker threads share the cache; serialize writes to avoid "database is locked"
+        self._write_lock = threading.Lock()
+        self._init_database()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_file, timeout=30)
+
+    def _init_database(self):
+        """Create the responses table if it does not exist."""
+        conn = self._connect()
+        cur = conn.cursor()
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                encoding TEXT,
+                body BLOB NOT NULL,  -- zlib-compressed response body
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_responses_last_access
+            ON responses(last_access)
+        """)
+        conn.commit()
+        conn.close()
+
+    def get(self, url: str) -> Optional[Dict]:
+        """Return the cached entry for a URL (validators, encoding and raw body), or None."""
+        conn = self._connect()
+        cur = conn.cursor()
+        cur.execute("SELECT etag, last_modified, encoding, body FROM responses WHERE url = ?", (url,))
+        row = cur.fetchone()
+        conn.close()
+        if not row:
+            return None
+
+        etag, last_modified, encoding, body = row
+        return {
+            'etag': etag,
+            'last_modified': last_modified,
+            'encoding': encoding,
+            'content': zlib.decompress(body)
+        }
+
+    @staticmethod
+    def conditional_headers(entry: Optional[Dict]) -> Dict:
+        """Build If-None-Match / If-Modified-Since headers from a cached entry."""
+        headers = {}
+        if not entry:
+            return headers
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store(self, url: str, content: bytes, encoding: Optional[str] = None,
+              etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """Cache a response body. Responses without validators are not cached."""
+        if not etag and not last_modified:
+            return
+
+        body = zlib.compress(content)
+        with self._write_lock:
+            conn = self._connect()
+            cur = conn.cursor()
+            cur.execute("""
+                INSERT OR REPLACE INTO responses (url, etag, last_modified, encoding, body, size, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (url, etag, last_modified, encoding, body, len(body), time.time()))
+            conn.commit()
+            self._evict(conn)
+            conn.close()
+
+    def touch(self, url: str):
+        """Mark an entry as recently used (e.g. after a 304 Not Modified)."""
+        with self._write_lock:
+            conn = self._connect()
+            conn.execute("UPDATE responses SET last_access = ? WHERE url = ?", (time.time(), url))
+            conn.commit()
+            conn.close()
+
+    def _evict(self, conn):
+        """Drop least recently used entries until the cache fits its limits."""
+        cur = conn.cursor()
+        cur.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses")
+        count, total_size = cur.fetchone()
+        if count <= self.max_entries and total_size <= self.max_bytes:
+            return
+
+        cur.execute("SELECT url, size FROM responses ORDER BY last_access ASC")
+        to_delete = []
+        for url, size in cur.fetchall():
+            if count <= self.max_entries and total_size <= self.max_bytes:
+                break
+            to_delete.append((url,))
+            count -= 1
+            total_size -= size
+        cur.executemany("DELETE FROM responses WHERE url = ?", to_delete)
+        conn.commit()
+        logger.info(f"HTTP cache: evicted {len(to_delete)} entries")
+
+    def clear(self):
+        """Remove every cached response."""
+        with self._write_lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM responses")
+            conn.commit()
+            conn.close()
+
+    def stats(self) -> Dict:
+        """Return the number of cached entries and their total size in bytes."""
+        conn = self._connect()
+        cur = conn.cursor()
+        cur.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses")
+        count, total_size = cur.fetchone()
+        conn.close()
+        return {'entries': count, 'bytes': total_size}
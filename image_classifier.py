@@ -0,0 +1,328 @@
+"""
+Image classification shared by the scraper and the agent.
+Decides whether an image from the PrimLogix help is a real interface screenshot
+(as opposed to an icon, logo, arrow or emoji) and scores screenshots by priority.
+
+The keyword lists are compiled once at import into trie-shaped regular expressions,
+so each field of an image is scanned in one pass instead of one ``in`` test per keyword.
+"""
+import re
+from typing import NamedTuple, Optional
+
+# Filename/URL keywords that suggest an icon, logo, arrow or emoji
+ICON_FILENAME_PATTERNS = [
+    'icon', 'logo', 'button', 'arrow', 'chevron', 'fleche', 'flèche',
+    'nav', 'menu', 'bullet', 'dot', 'star', 'check', 'emoji',
+    'close', 'delete', 'edit', 'add', 'remove', 'plus', 'minus',
+    '40x40', '32x32', '24x24', '16x16', '20x20', '30x30', '48x48',
+    '50x50', '56x56', '60x60', '63x63', '64x64', '72x72', '80x80',
+    '96x96', '100x100', '128x128',
+    'favicon', 'sprite', 'glyph', 'svg', 'ico',
+    'up', 'down', 'left', 'right', 'next', 'prev', 'previous',
+    'haut', 'bas', 'gauche', 'droite', 'suivant', 'precedent',
+    # Specific icon types
+    'lightbulb', 'ampoule', 'bulb', 'lamp', 'lampe',
+    'placeholder', 'place-holder', 'generic', 'generique',
+    # Person/people icons
+    'person', 'people', 'user', 'utilisateur', 'profil', 'profile',
+    'head', 'shoulder', 'silhouette', 'avatar', 'tête', 'épaules',
+    # Checkmark/verification icons
+    'checkmark', 'check', 'verification', 'vérification', 'tick', 'coche',
+    'check-icon', 'icone-check', 'icone-verification',
+    # Remuneration/payment icons
+    'remuneration', 'rémunération', 'payment', 'paiement', 'money', 'argent',
+    'cash', 'hand-money', 'main-argent', 'salary', 'salaire',
+    # Feedback icons (thumbs up/down)
+    'thumbs', 'thumbs-up', 'thumbs-down', 'thumbsup', 'thumbsdown',
+    'thumb-up', 'thumb-down', 'like', 'dislike', 'feedback',
+    'pouce', 'pouce-haut', 'pouce-bas',
+    # Document/folder icons (NOT screenshots)
+    'document', 'doc', 'file', 'folder', 'dossier', 'cv', 'resume',
+    'pdf-icon', 'word-icon', 'excel-icon', 'file-icon', 'folder-icon',
+    'document-icon', 'icone-document', 'icone-dossier', 'icone-fichier',
+    # Warning/stop sign icons
+    'stop', 'stop-sign', 'stop-signal', 'arret', 'arrêt', 'warning',
+    'avertissement', 'alert', 'alerte', 'danger', 'attention',
+    'octagon', 'octogone', 'stop-icon', 'icone-arret', 'icone-stop'
+]
+
+# Alt/title keywords that suggest an icon, logo, arrow or emoji
+ICON_TEXT_PATTERNS = [
+    'icon', 'logo', 'button', 'arrow', 'chevron', 'fleche', 'flèche',
+    'nav', 'menu', 'emoji', 'icone', 'icône', 'bouton',
+    'haut', 'bas', 'gauche', 'droite', 'suivant', 'precedent',
+    'cercle', 'circle', 'round', 'rond', 'symbole', 'symbol',
+    # Specific icon types
+    'lightbulb', 'ampoule', 'bulb', 'lamp', 'lampe', 'ampoule',
+    'placeholder', 'place-holder', 'generic', 'generique',
+    'plus sign', 'signe plus', 'add icon', 'icone ajout',
+    'magnifying glass', 'loupe', 'search icon', 'icone recherche',
+    'thumbs up', 'thumbs down', 'pouce', 'camera icon', 'icone camera',
+    'speech bubble', 'bulle de dialogue', 'double arrow', 'resize',
+    # Person/people icons
+    'person icon', 'icone personne', 'icone utilisateur', 'icone profil',
+    'silhouette', 'avatar', 'tête', 'épaules', 'head icon', 'shoulder icon',
+    # Checkmark/verification icons
+    'checkmark', 'check icon', 'icone check', 'icone vérification',
+    'tick', 'coche', 'verification icon', 'icone verification',
+    # Remuneration/payment icons
+    'remuneration', 'rémunération', 'payment icon', 'icone paiement',
+    'money icon', 'icone argent', 'hand money', 'main argent',
+    'salary icon', 'icone salaire',
+    # Feedback icons (thumbs up/down) - STRICT FILTERING
+    'thumbs up', 'thumbs down', 'thumbs-up', 'thumbs-down',
+    'thumbsup', 'thumbsdown', 'thumb up', 'thumb down',
+    'like button', 'dislike button', 'feedback button',
+    'pouce', 'pouce-haut', 'pouce-bas', 'pouce vers le haut', 'pouce vers le bas',
+    'like icon', 'dislike icon', 'feedback icon', 'icone feedback',
+    'icone pouce', 'icone like', 'icone dislike',
+    # Document/folder icons (NOT screenshots) - STRICT FILTERING
+    'document icon', 'folder icon', 'file icon', 'dossier icon',
+    'cv icon', 'resume icon', 'document with', 'folder with',
+    'document cv', 'icone document', 'icone dossier', 'icone fichier',
+    'icone cv', 'document avec loupe', 'dossier avec loupe',
+    'document with magnifying', 'folder with magnifying',
+    # Warning/stop sign icons - STRICT FILTERING
+    'stop sign', 'stop signal', 'panneau arret', 'panneau arrêt',
+    'panneau stop', 'stop icon', 'icone stop', 'icone arret', 'icone arrêt',
+    'warning sign', 'panneau avertissement', 'warning icon', 'icone warning',
+    'icone avertissement', 'alert sign', 'panneau alerte', 'alert icon',
+    'icone alerte', 'danger sign', 'panneau danger', 'danger icon',
+    'icone danger', 'attention sign', 'panneau attention', 'attention icon',
+    'icone attention', 'octagon', 'octogone', 'red stop', 'arret rouge',
+    'arrêt rouge', 'hand stop', 'main stop', 'stop hand'
+]
+
+# Short descriptions of simple icons ("cercle vert", "green circle", "ampoule", ...)
+SIMPLE_ICON_PATTERNS = [
+    'cercle', 'circle', 'rond', 'round',
+    'symbole', 'symbol', 'signe', 'sign',
+    'icone', 'icon', 'bouton', 'button',
+    'lightbulb', 'ampoule', 'bulb', 'lamp', 'lampe',
+    'plus sign', 'signe plus', 'add icon', 'icone ajout',
+    'placeholder', 'place-holder', 'generic', 'generique',
+    # Person/people icons
+    'person', 'people', 'user', 'utilisateur', 'profil', 'profile',
+    'head', 'shoulder', 'silhouette', 'avatar', 'tête', 'épaules',
+    # Checkmark/verification icons
+    'checkmark', 'check', 'verification', 'vérification', 'tick', 'coche',
+    # Remuneration/payment icons
+    'remuneration', 'rémunération', 'payment', 'paiement', 'money', 'argent',
+    'cash', 'hand', 'main', 'salary', 'salaire'
+]
+
+# Keywords used by the agent to exclude emojis, icons and small graphics from answers
+EMOJI_ICON_PATTERNS = [
+    'emoji', 'emoticon', 'smiley', 'smile', '😀', '😊', '👍', '👎',
+    'icon', 'icone', 'icône', 'logo', 'button', 'bouton',
+    'arrow', 'fleche', 'flèche', 'chevron', 'nav', 'menu',
+    'stop', 'stop-sign', 'warning', 'avertissement', 'alert',
+    'checkmark', 'check', 'tick', 'coche', 'verification',
+    'person', 'user', 'utilisateur', 'silhouette', 'avatar',
+    'document', 'folder', 'file', 'dossier', 'cv',
+    'favicon', '.ico', 'svg', 'sprite', 'glyph'
+]
+
+# Keywords marking an image as an interface screenshot
+SCREENSHOT_KEYWORDS = ['screenshot', 'capture', 'interface', 'fenetre', 'ecran', 'affichage', 'window', 'dialog']
+# Broader screenshot keywords (descriptions mentioning the application itself)
+SCREENSHOT_APP_KEYWORDS = SCREENSHOT_KEYWORDS + ['application', 'logiciel']
+# Screenshot keywords for file paths (screenshots are stored under images/)
+SCREENSHOT_PATH_KEYWORDS = SCREENSHOT_KEYWORDS + ['images/']
+
+# Common icon square sizes to exclude
+COMMON_ICON_SIZES = frozenset([16, 20, 24, 32, 40, 48, 50, 56, 60, 63, 64, 72, 80, 96, 100, 128])
+# Icon sizes often found in icon file names
+SMALL_ICON_SIZES = ['16x16', '20x20', '24x24', '32x32', '40x40', '48x48', '50x50', '56x56', '60x60', '63x63', '64x64', '72x72', '80x80', '96x96', '100x100', '128x128']
+
+SCREENSHOT_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+
+
+def _trie_regex(node):
+    """Regex source for a keyword trie node (shared prefixes are only tested once)."""
+    if '' in node and len(node) == 1:
+        return ''
+    alternatives = [re.escape(ch) + _trie_regex(child) for ch, child in sorted(node.items()) if ch]
+    body = alternatives[0] if len(alternatives) == 1 else '(?:' + '|'.join(alternatives) + ')'
+    # A keyword ends here: the longer keywords sharing this prefix are optional
+    return '(?:' + body + ')?' if '' in node else body
+
+
+def _compile(patterns):
+    """
+    Compile a keyword list into a single matcher.
+
+    ``_compile(patterns).search(text)`` is equivalent to ``any(p in text for p in patterns)``,
+    but the keywords are factored into a trie so each position of the text is tested once.
+    """
+    trie = {}
+    for pattern in patterns:
+        node = trie
+        for ch in pattern:
+            node = node.setdefault(ch, {})
+        node[''] = True
+    return re.compile(_trie_regex(trie))
+
+
+_ICON_FILENAME_RE = _compile(ICON_FILENAME_PATTERNS)
+_ICON_TEXT_RE = _compile(ICON_TEXT_PATTERNS)
+_SIMPLE_ICON_RE = _compile(SIMPLE_ICON_PATTERNS)
+_EMOJI_ICON_RE = _compile(EMOJI_ICON_PATTERNS)
+_SCREENSHOT_RE = _compile(SCREENSHOT_KEYWORDS)
+_SCREENSHOT_APP_RE = _compile(SCREENSHOT_APP_KEYWORDS)
+_SCREENSHOT_PATH_RE = _compile(SCREENSHOT_PATH_KEYWORDS)
+_SMALL_ICON_SIZE_RE = _compile(SMALL_ICON_SIZES)
+
+
+class ImageClassification(NamedTuple):
+    """Result of ``classify_image``."""
+    is_screenshot: bool  # Scraper decision: keep the image as an interface screenshot
+    priority: int  # Agent ranking score (<= 0 means the image should not be shown)
+
+
+def parse_dimension(value) -> Optional[int]:
+    """Parse a width/height HTML attribute (or stored value) into an int, None if not numeric."""
+    if value and isinstance(value, (int, str)) and str(value).isdigit():
+        return int(value)
+    return None
+
+
+def is_screenshot(url, alt='', title='', context='', caption='', width=None, height=None) -> bool:
+    """
+    Decide whether an ``<img>`` found on a help page is a real interface screenshot.
+
+    Args:
+        url: Absolute image URL
+        alt: Alt text (falls back to the title attribute in the scraper)
+        title: Title attribute
+        context: Text of the enclosing block
+        caption: Figure caption
+        width: Width in pixels (None if unknown)
+        height: Height in pixels (None if unknown)
+    """
+    img_filename = url.lower()
+    combined_text = (alt + ' ' + title).lower()
+    has_dimensions = bool(width and height and width > 0 and height > 0)
+    ratio = max(width, height) / min(width, height) if has_dimensions else None
+
+    # Icons are typically < 100px in either dimension
+    is_small_icon = bool((width and width < 100) or (height and height < 100))
+    # Square icon formats (63x63, 64x64, ...) and any square smaller than 150px
+    is_square_icon = bool(width and height and width == height
+                          and (width in COMMON_ICON_SIZES or width < 150))
+    # Very short description mentioning an icon-like shape, not explicitly a screenshot
+    is_simple_icon = (len(combined_text) < 80
+                      and _SIMPLE_ICON_RE.search(combined_text) is not None
+                      and _SCREENSHOT_APP_RE.search(combined_text) is None)
+    # Square or near-square (within 10%) and not very large
+    is_near_square = bool(has_dimensions and 0.9 <= ratio <= 1.1 and width < 300)
+
+    is_icon_filename = _ICON_FILENAME_RE.search(img_filename) is not None
+    is_icon_text = _ICON_TEXT_RE.search(combined_text) is not None
+
+    # STRICT FILTERING: small/square/simple icons need explicit screenshot keywords
+    if is_small_icon or is_square_icon or is_simple_icon or is_near_square:
+        if not (_SCREENSHOT_APP_RE.search(img_filename) or _SCREENSHOT_APP_RE.search(combined_text)):
+            return False
+
+    if is_icon_filename and not _SCREENSHOT_PATH_RE.search(img_filename):
+        return False
+
+    if is_icon_text and not _SCREENSHOT_RE.search(combined_text):
+        return False
+
+    is_likely_screenshot = False
+    # Priority 1: Images in /images/ directory, unless square/near-square
+    if '/images/' in img_filename and not is_icon_filename:
+        if has_dimensions:
+            # Rectangular OR very large (likely a real screenshot)
+            if ratio > 1.2 or width >= 400:
+                is_likely_screenshot = True
+        else:
+            # No dimensions available, trust /images/ directory
+            is_likely_screenshot = True
+
+    # Priorities 2-5: Explicit screenshot keywords in filename, alt/title, context or caption
+    if (_SCREENSHOT_RE.search(img_filename)
+            or _SCREENSHOT_RE.search(combined_text)
+            or (context and _SCREENSHOT_RE.search(context.lower()))
+            or (caption and _SCREENSHOT_RE.search(caption.lower()))):
+        is_likely_screenshot = True
+
+    if not is_likely_screenshot:
+        return False
+
+    # Only real image files: SVG are almost always icons, GIF often animated icons/emojis
+    return img_filename.endswith(SCREENSHOT_EXTENSIONS)
+
+
+def screenshot_priority(url, alt='', context='', width=None, height=None) -> int:
+    """
+    Priority score used by the agent to pick which screenshots to show (higher = better).
+
+    Returns 0 for images that must not be shown (other sites, emojis/icons, small icon files).
+    """
+    # Only include images from aide.primlogix.com (the official help site)
+    if not url or 'aide.primlogix.com' not in url:
+        return 0
+
+    url_lower = url.lower()
+    img_lower = (url + ' ' + alt + ' ' + context).lower()
+
+    # STRICT: Exclude emojis, icons and small graphics unless explicitly a screenshot
+    if _EMOJI_ICON_RE.search(img_lower) and not _SCREENSHOT_PATH_RE.search(img_lower):
+        return 0
+
+    # Exclude small square icons outside of the image directories
+    if _SMALL_ICON_SIZE_RE.search(url_lower):
+        if '/images/' not in url_lower and '/img/' not in url_lower:
+            return 0
+
+    width = parse_dimension(width)
+    height = parse_dimension(height)
+    priority_score = 0
+
+    if width and height and width > 0 and height > 0:
+        # Large images (likely full screenshots)
+        if width >= 600 or height >= 400:
+            priority_score += 50
+        elif width >= 400 or height >= 300:
+            priority_score += 30
+
+        # Rectangular images (screenshots are usually rectangular, not square)
+        ratio = max(width, height) / min(width, height)
+        if ratio > 1.5:
+            priority_score += 20
+        elif ratio > 1.2:
+            priority_score += 10
+        elif ratio < 1.1:
+            priority_score -= 30  # Penalize square images
+
+    # Images in /images/ directory (where screenshots are stored)
+    if '/images/' in url_lower:
+        priority_score += 40
+
+    # Explicit screenshot keywords
+    if _SCREENSHOT_APP_RE.search(img_lower):
+        priority_score += 30
+
+    # PNG/JPG/JPEG (not SVG/GIF which are often icons)
+    if url_lower.endswith(SCREENSHOT_EXTENSIONS):
+        priority_score += 10
+
+    # Small images
+    if width and height:
+        if width < 200 or height < 200:
+            priority_score -= 20
+
+    return max(priority_score, 0)
+
+
+def classify_image(url, alt='', title='', context='', caption='', width=None, height=None) -> ImageClassification:
+    """Return both the screenshot decision and the priority score for an image."""
+    width = parse_dimension(width)
+    height = parse_dimension(height)
+    return ImageClassification(
+        is_screenshot=is_screenshot(url, alt, title, context, caption, width, height),
+        priority=screenshot_priority(url, alt, context, width, height)
+    )
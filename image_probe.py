@@ -0,0 +1,229 @@
+"""
+Header-only image probing for the scraper.
+Reads only the first bytes of an image (HTTP range request) and lets Pillow parse its header
+to get the real dimensions and format, so screenshots can be told from icons even when the
+``<img>`` tag has no width/height attributes. Results are cached on disk by URL and ETag.
+"""
+import os
+import sqlite3
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional
+
+try:
+    from PIL import ImageFile
+except ImportError:  # Pillow missing: probing is disabled
+    ImageFile = None
+
+logger = logging.getLogger(__name__)
+
+IMAGE_CACHE_DIR = Path(os.getenv('PRIMBOT_IMAGE_CACHE_DIR', Path.home() / ".primbot" / "image_cache"))
+REQUEST_TIMEOUT = 30  # seconds
+PROBE_CHUNK_BYTES = 4096
+# JPEG size markers can come after a large EXIF block; give up past this many bytes
+PROBE_MAX_BYTES = 65536
+DEFAULT_MAX_WORKERS = 8
+
+
+class ImageInfo(NamedTuple):
+    width: Optional[int]
+    height: Optional[int]
+    format: Optional[str]
+
+
+def parse_image_header(data: bytes) -> Optional[ImageInfo]:
+    """Dimensions and format from the first bytes of an image (None if the header is incomplete or unknown)."""
+    if ImageFile is None:
+        return None
+    parser = ImageFile.Parser()
+    try:
+        parser.feed(data)
+    except Exception:
+        return None
+    if parser.image is None:
+        return None
+    width, height = parser.image.size
+    return ImageInfo(width, height, parser.image.format)
+
+
+class ImageMetadataCache:
+    """SQLite cache of probed image dimensions, keyed by URL (with the ETag the probe saw)."""
+
+    def __init__(self, cache_dir=IMAGE_CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.db_file = self.cache_dir / "images.db"
+        self._write_lock = threading.Lock()
+        self._init_database()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_file, timeout=30)
+
+    def _init_database(self):
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS images (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                width INTEGER,  -- NULL when the URL is not a readable image
+                height INTEGER,
+                format TEXT,
+                probed_at REAL NOT NULL
+            )
+        """)
+        conn.commit()
+        conn.close()
+
+    def get(self, url: str) -> Optional[Dict]:
+        """Return ``{'etag', 'info'}`` for a probed URL, or None."""
+        conn = self._connect()
+        row = conn.execute("SELECT etag, width, height, format FROM images WHERE url = ?", (url,)).fetchone()
+        conn.close()
+        if not row:
+            return None
+        etag, width, height, image_format = row
+        return {'etag': etag, 'info': ImageInfo(width, height, image_format)}
+
+    def store(self, url: str, info: ImageInfo, etag: Optional[str] = None):
+        with self._write_lock:
+            conn = self._connect()
+            conn.execute("""
+                INSERT OR REPLACE INTO images (url, etag, width, height, format, probed_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (url, etag, info.width, info.height, info.format, time.time()))
+            conn.commit()
+            conn.close()
+
+    def stats(self) -> Dict:
+        conn = self._connect()
+        count = conn.execute("SELECT COUNT(*) FROM images").fetchone()[0]
+        conn.close()
+        return {'entries': count}
+
+
+class ImageProber:
+    """
+    Concurrent image dimension probe.
+
+    Each image is requested with ``Range: bytes=0-...`` and read only until Pillow has parsed
+    its header (servers ignoring the range are cut off the same way). A URL is probed at most
+    once: results are memoized for the run and stored in the optional on-disk cache.
+    """
+
+    def __init__(self, session=None, request=None, cache=None, max_workers=DEFAULT_MAX_WORKERS, revalidate=False):
+        """
+        Args:
+            session: ``requests.Session`` used when no ``request`` callable is given
+            request: Optional callable ``(url, headers) -> response`` (e.g. the crawler's
+                rate-limited ``request``); the response body must be streamed
+            cache: Optional ``ImageMetadataCache``
+            max_workers: Concurrent probes
+            revalidate: Re-check cached images with a conditional request (If-None-Match)
+                instead of trusting the cache
+        """
+        if request is None:
+            import requests
+            session = session or requests.Session()
+            request = lambda url, headers: session.get(url, headers=headers, timeout=REQUEST_TIMEOUT, stream=True)
+        self.request = request
+        self.cache = cache
+        self.max_workers = max_workers
+        self.revalidate = revalidate
+        self.stats = {'probed': 0, 'cache_hits': 0, 'not_modified': 0, 'failed': 0, 'bytes_read': 0}
+        self._memo = {}
+        self._lock = threading.Lock()
+        self._executor = None
+
+    @property
+    def enabled(self):
+        return ImageFile is not None
+
+    def _count(self, **increments):
+        with self._lock:
+            for key, value in increments.items():
+                self.stats[key] += value
+
+    def _read_header(self, response):
+        """Read the response body chunk by chunk until the image header could be parsed."""
+        data = b""
+        info = None
+        try:
+            for chunk in response.iter_content(PROBE_CHUNK_BYTES):
+                data += chunk
+                info = parse_image_header(data)
+                if info or len(data) >= PROBE_MAX_BYTES:
+                    break
+        finally:
+            response.close()
+        self._count(bytes_read=len(data))
+        return info
+
+    def probe(self, url: str) -> Optional[ImageInfo]:
+        """Dimensions and format of one image (None if it could not be read)."""
+        with self._lock:
+            if url in self._memo:
+                return self._memo[url]
+        cached = self.cache.get(url) if self.cache else None
+        if cached and not self.revalidate:
+            self._count(cache_hits=1)
+            return self._remember(url, cached['info'])
+
+        headers = {'Range': f"bytes=0-{PROBE_MAX_BYTES - 1}"}
+        if cached and cached['etag']:
+            headers['If-None-Match'] = cached['etag']
+        try:
+            response = self.request(url, headers)
+        except Exception as e:
+            # Network errors are not cached: the next crawl tries again
+            logger.debug(f"Could not probe image {url}: {e}")
+            self._count(failed=1)
+            return None
+
+        if response.status_code == 304 and cached:
+            response.close()
+            self._count(not_modified=1)
+            return self._remember(url, cached['info'])
+        info = None
+        if response.status_code in (200, 206):
+            info = self._read_header(response)
+        else:
+            response.close()
+        self._count(probed=1, failed=0 if info else 1)
+        if self.cache:
+            # Unreadable images are cached too so they are not probed again
+            self.cache.store(url, info or ImageInfo(None, None, None), etag=response.headers.get('ETag'))
+        return self._remember(url, info)
+
+    def _remember(self, url, info):
+        if info is not None and info.width is None:
+            info = None
+        with self._lock:
+            self._memo[url] = info
+        return info
+
+    def probe_many(self, urls):
+        """
+        Probe several images concurrently.
+
+        Returns:
+            Dict url -> ImageInfo for the images that could be read
+        """
+        urls = list(dict.fromkeys(urls))
+        if not urls or not self.enabled:
+            return {}
+        if len(urls) == 1:
+            results = [self.probe(urls[0])]
+        else:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="image-probe")
+            results = list(self._executor.map(self.probe, urls))
+        return {url: info for url, info in zip(urls, results) if info is not None}
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
@@ -1,15 +1,72 @@
-from scraper import run_scraper
-from knowledge_base import add_documents
+import argparse
+from functools import partial
+
+from scraper import create_crawler, iter_scraper
+from knowledge_base import add_documents_stream, reindex, remove_missing_pages, rollback, stored_urls
+from snapshot import iter_snapshot, tee_snapshot
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape the PrimLogix online help and ingest it into the knowledge base.")
+    parser.add_argument("--full", action="store_true", help="Re-embed every page instead of only new or changed ones")
+    parser.add_argument("--resume", action="store_true", help="Resume an interrupted crawl from its checkpoint instead of starting over")
+    parser.add_argument("--from-snapshot", metavar="PATH", help="Ingest a saved scrape snapshot instead of scraping the site")
+    parser.add_argument("--save-snapshot", metavar="PATH", help="Also save the scraped pages to a snapshot file")
+    parser.add_argument("--root", action="append", metavar="URL",
+                        help="Help section to crawl, repeat for several versions/languages (default: SCRAPER_BASE_URLS)")
+    parser.add_argument("--no-dedup", action="store_true", help="Keep repeated boilerplate blocks and near-duplicate pages")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Blue/green full reindex into a new collection, switched live once complete")
+    parser.add_argument("--rollback", action="store_true", help="Switch queries back to the collection live before the last rebuild")
+    parser.add_argument("--embed-batch-size", type=int, metavar="N", help="Texts per forward pass of the embedding model (default: EMBED_BATCH_SIZE)")
+    parser.add_argument("--embed-processes", type=int, metavar="N", help="Worker processes encoding large batches of chunks (default: EMBED_PROCESSES)")
+    args = parser.parse_args()
+    if args.rebuild and args.resume:
+        parser.error("--rebuild starts a new collection and cannot resume an interrupted crawl")
+
+    if args.rollback:
+        for store, name in rollback().items():
+            print(f"{store}: live collection is now '{name}'")
+        raise SystemExit(0)
+
+    # A rebuild writes a new collection and switches to it at the end; queries are served meanwhile
+    ingest = partial(reindex if args.rebuild else partial(add_documents_stream, full_refresh=args.full),
+                     embed_batch_size=args.embed_batch_size, embed_processes=args.embed_processes)
+
     print("Starting ingestion process...")
-    
-    # 1. Scrape
-    print("Scraping documentation...")
-    data = run_scraper()
-    
-    # 2. Add to Vector DB
-    print(f"Adding {len(data)} pages to knowledge base...")
-    add_documents(data)
-    
+
+    if args.from_snapshot:
+        # No network: pages are streamed from the snapshot file
+        print(f"Ingesting snapshot {args.from_snapshot}...")
+        stats = ingest(iter_snapshot(args.from_snapshot), dedup=not args.no_dedup)
+    else:
+        # Scrape and add to Vector DB as a stream: embedding starts with the first page
+        # and scraped pages are not kept in memory once ingested
+        print("Scraping and ingesting documentation...")
+        crawler = create_crawler(resume=args.resume, keep_pages=False, base_urls=args.root)
+        # Previously ingested pages the crawl does not reach are listed in the discovery report
+        pages = iter_scraper(crawler, expected_urls=stored_urls())
+        if args.save_snapshot:
+            pages = tee_snapshot(pages, args.save_snapshot)
+        stats = ingest(pages, on_committed=crawler.acknowledge, dedup=not args.no_dedup)
+        if not args.rebuild and crawler.complete:
+            # Stored pages of the crawled sections that the crawl did not find were removed from the site
+            stats['removed_pages'] = remove_missing_pages(stats['urls'], in_scope=crawler.root_of)
+        crawler.clear_checkpoint()
+
+    print(f"Ingested {stats['pages']} pages ({stats['changed_pages']} new or changed).")
+    if stats.get('removed_pages'):
+        print(f"Removed {stats['removed_pages']} pages no longer on the site.")
+    if stats['chunks_embedded']:
+        print(f"Embedded {stats['chunks_embedded']} chunks at {stats['embed_chunks_per_sec']:.0f} chunks/s "
+              f"({stats['chunks_per_sec']:.0f} chunks/s end to end).")
+    if stats.get('embedding_cache'):
+        cache = stats['embedding_cache']
+        print(f"Embedding cache: {cache['hits']} hits, {cache['misses']} misses ({cache['hit_rate']:.0%} hit rate), "
+              f"{cache['entries']} vectors stored.")
+    if 'dedup' in stats:
+        dedup = stats['dedup']
+        print(f"Dedup: {dedup['duplicate_pages']} near-duplicate pages dropped, {dedup['boilerplate_blocks']} boilerplate blocks "
+              f"stripped, about {dedup['chunks_saved']} chunks/embeddings saved ({dedup['chunks_after']} instead of ~{dedup['chunks_before']}).")
+    for store, name in stats.get('live', {}).items():
+        print(f"{store}: switched live collection to '{name}' (previous: '{stats['previous'][store]}', kept for --rollback)")
     print("Ingestion complete!")
@@ -0,0 +1,413 @@
+"""
+Ingestion manifest for incremental knowledge base updates.
+Keeps a content hash per page URL and per chunk so that only new or changed
+pages are re-embedded, and chunks that disappeared can be deleted.
+
+Chunks are stored under their content hash: a chunk found on several pages (typically the
+same help page in several product versions) is embedded once and its metadata lists every
+version / language it belongs to, so queries can filter by version on a single index.
+
+Images are stored once in a separate table of the store, under a content hash (see
+``image_id``): a chunk only lists the IDs of the images whose position falls inside it.
+Likewise every chunk records the ``page_id`` (content hash) and ``start``/``end`` offsets of
+its text in the page it comes from, for stores that keep page texts once instead of a copy
+of the text in every chunk.
+"""
+import os
+import json
+import hashlib
+import logging
+from pathlib import Path
+
+from page_discovery import parse_help_section
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_DIR = Path.home() / ".primbot" / "manifests"
+# Version 2: chunk IDs are content hashes shared between pages (version 1 used "<url>_<index>")
+MANIFEST_FORMAT = 2
+
+
+def text_hash(text):
+    """Stable content hash for a chunk or page text."""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def chunk_id(chunk_hash):
+    """Identifier of a chunk (shared by Chroma and Qdrant): its content hash, so identical chunks share one embedding."""
+    return chunk_hash
+
+
+def image_entry(image):
+    """Image as stored in the image table (its position only matters to the page it is on)."""
+    return {key: value for key, value in image.items() if key != 'position'}
+
+
+def image_id(image):
+    """Identifier of an image in the image table: hash of its stored entry."""
+    return text_hash(json.dumps(image_entry(image), sort_keys=True, ensure_ascii=False))[:16]
+
+
+def chunk_offsets(content, chunks):
+    """Offset of each chunk in ``content`` (chunks are consecutive slices of it, possibly overlapping)."""
+    offsets = []
+    cursor = 0
+    for chunk in chunks:
+        start = content.find(chunk, cursor)
+        if start == -1:
+            start = cursor
+        offsets.append(start)
+        cursor = start + 1
+    return offsets
+
+
+def page_id(content):
+    """Identifier of a page text in the page table: its content hash (identical pages share it)."""
+    return text_hash(content)[:16]
+
+
+def chunk_image_ids(spans, images):
+    """
+    Comma-separated image IDs of each chunk: the images positioned inside it, plus the images
+    without a position (outside the page content, or scraped before positions were recorded).
+    """
+    refs = [(image_id(image), image.get('position')) for image in images]
+    result = []
+    for start, end in spans:
+        result.append(",".join(dict.fromkeys(
+            ref_id for ref_id, position in refs if position is None or start <= position < end
+        )))
+    return result
+
+
+def legacy_chunk_id(url, index):
+    """Identifier of the chunk at ``index`` of a page in manifests of format 1."""
+    return f"{url}_{index}"
+
+
+class IngestionPlan:
+    """Chunks to write, metadata to update and chunk IDs to delete for one ingestion run."""
+
+    def __init__(self):
+        self.ids = []
+        self.documents = []
+        self.metadatas = []
+        self.stale_ids = []
+        self.images = {}  # image id -> entry to add to the image table
+        self.stale_image_ids = []  # Images no page refers to any more
+        self.pages = {}  # page id -> text to add to the page table
+        self.stale_page_ids = []
+        # Chunks already embedded whose metadata changed (e.g. another version now shares them)
+        self.metadata_updates = {}  # chunk id -> metadata
+        self.updates = {}  # url -> manifest entry to record once the writes succeeded
+        self.urls = []  # Every page covered by the plan, changed or not
+        self.removed_urls = []  # Pages gone from the site, dropped from the manifest on commit
+        self.unchanged_pages = 0
+        self.changed_pages = 0
+        self.shared_chunks = 0  # Chunks of changed pages already embedded for another page
+        self._positions = {}  # chunk id -> index in ids/documents/metadatas
+
+    def add_chunk(self, chunk_id, document, metadata):
+        self._positions[chunk_id] = len(self.ids)
+        self.ids.append(chunk_id)
+        self.documents.append(document)
+        self.metadatas.append(metadata)
+
+    def set_metadata(self, chunk_id, metadata):
+        """Metadata of a chunk: patched into the pending write if the chunk is embedded by this plan."""
+        if chunk_id in self._positions:
+            self.metadatas[self._positions[chunk_id]] = metadata
+        else:
+            self.metadata_updates[chunk_id] = metadata
+
+    def summary(self):
+        summary = (f"{self.changed_pages} new/changed pages, {self.unchanged_pages} unchanged pages skipped, "
+                   f"{len(self.documents)} chunks to embed, {self.shared_chunks} shared with other pages, "
+                   f"{len(self.stale_ids)} stale chunks to delete, {len(self.images)} images to store")
+        if self.removed_urls:
+            summary += f", {len(self.removed_urls)} removed pages"
+        return summary
+
+
+class IngestManifest:
+    """JSON manifest mapping page URL -> page hash, metadata hash, chunk hashes, version and language."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.pages = {}
+        self.chunk_refs = {}  # chunk hash -> {(url, index): None} (insertion-ordered set)
+        self.image_refs = {}  # image id -> {url: None}
+        self.page_refs = {}  # page id -> {url: None}
+        self._pending = {}  # url -> entry planned but not committed yet
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            with self.path.open('r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read ingestion manifest {self.path}, starting from scratch: {e}")
+            return
+
+        if data.get('format', 1) < MANIFEST_FORMAT:
+            # Chunks stored under "<url>_<index>" are deleted as the pages are re-embedded
+            self.pages = {
+                url: {'legacy_ids': [legacy_chunk_id(url, i) for i, h in enumerate(entry.get('chunks', [])) if h]}
+                for url, entry in data.get('pages', {}).items()
+            }
+            logger.info(f"Ingestion manifest {self.path} predates content-hash chunk IDs: pages will be re-embedded")
+            return
+        self.pages = data.get('pages', {})
+        for url, entry in self.pages.items():
+            self._add_refs(url, entry.get('chunks', []))
+            for ref_id in entry.get('image_ids', []):
+                self.image_refs.setdefault(ref_id, {})[url] = None
+            if entry.get('page_id'):
+                self.page_refs.setdefault(entry['page_id'], {})[url] = None
+
+    def save(self):
+        """Write the manifest atomically."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        with tmp_path.open('w', encoding='utf-8') as f:
+            json.dump({'format': MANIFEST_FORMAT, 'pages': self.pages}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def reset(self):
+        """Forget every page (used when the target collection is empty or a full refresh is requested)."""
+        self.pages = {}
+        self.chunk_refs = {}
+        self.image_refs = {}
+        self.page_refs = {}
+        self._pending = {}
+
+    def _entry(self, url):
+        return self._pending.get(url) or self.pages.get(url)
+
+    def _add_refs(self, url, chunk_hashes):
+        for i, h in enumerate(chunk_hashes):
+            if h:
+                self.chunk_refs.setdefault(h, {})[(url, i)] = None
+
+    def _remove_refs(self, url, chunk_hashes):
+        for i, h in enumerate(chunk_hashes):
+            refs = self.chunk_refs.get(h)
+            if refs is not None:
+                refs.pop((url, i), None)
+                if not refs:
+                    del self.chunk_refs[h]
+
+    def chunk_metadata(self, chunk_hash):
+        """
+        Metadata of a stored chunk, built from every page referencing it.
+
+        ``url``/``title``/``chunk_index``/``image_ids``/``page_id``/``start``/``end`` come from the
+        first page that produced the chunk; ``versions``/``languages`` list all of them and
+        ``urls`` maps each version to its page (JSON string).
+        """
+        refs = list(self.chunk_refs[chunk_hash])
+        url, index = refs[0]
+        entry = self._entry(url)
+        urls = {}
+        languages = []
+        for ref_url, _ in refs:
+            ref_entry = self._entry(ref_url)
+            urls.setdefault(ref_entry['version'], ref_url)
+            if ref_entry['language'] not in languages:
+                languages.append(ref_entry['language'])
+        if 'chunk_images' in entry:
+            # None removes the page-wide image list of chunks stored before image IDs
+            table_refs = {"image_ids": entry['chunk_images'][index], "images": None}
+        else:
+            # Page recorded by an older manifest, re-tagged when it is planned again
+            table_refs = {"images": entry.get('images', "")}
+        if entry.get('spans'):
+            table_refs.update(page_id=entry['page_id'], start=entry['spans'][index][0], end=entry['spans'][index][1])
+        return {
+            "url": url,
+            "title": entry['title'],
+            "chunk_index": index,
+            **table_refs,
+            "version": entry['version'],
+            "language": entry['language'],
+            "versions": sorted(urls),
+            "languages": sorted(languages),
+            "urls": json.dumps(urls, ensure_ascii=False),
+        }
+
+    def plan(self, pages_data, chunk_text):
+        """
+        Compare scraped pages against the manifest.
+
+        Args:
+            pages_data: List of page dicts (url, title, content, images, language, version)
+            chunk_text: Chunking function of the target backend
+
+        Returns:
+            IngestionPlan with the chunks to (re-)embed and the stale chunk IDs
+        """
+        plan = IngestionPlan()
+        for page in pages_data:
+            self.plan_page(plan, page, chunk_text)
+        return plan
+
+    def plan_page(self, plan, page, chunk_text):
+        """Add the chunks to write / delete / re-tag for a single page to ``plan``."""
+        url = page['url']
+        title = page['title']
+        content = page['content']
+        images = page.get('images', [])
+        if 'version' in page:
+            language, version = page.get('language', ''), page['version']
+        else:
+            # Snapshots taken before pages were tagged
+            language, version = parse_help_section(url)
+        plan.urls.append(url)
+
+        # Images are referenced by ID and position (their entries go to the image table)
+        page_images = {image_id(image): image_entry(image) for image in images}
+        image_refs = [[image_id(image), image.get('position')] for image in images]
+        images_json = json.dumps(image_refs) if images else ""
+        page_hash = text_hash(f"{title}\n{images_json}\n{language}\n{version}\n{content}")
+        previous = self._entry(url)
+        if previous and previous.get('hash') == page_hash:
+            plan.unchanged_pages += 1
+            return
+        plan.changed_pages += 1
+
+        meta_hash = text_hash(f"{title}\n{images_json}\n{language}\n{version}")
+        # Title/image IDs are copied into the chunks, so a metadata change re-tags all of them
+        meta_changed = not previous or previous.get('meta') != meta_hash
+        old_chunks = previous.get('chunks', []) if previous else []
+        if previous:
+            plan.stale_ids.extend(previous.get('legacy_ids', []))
+
+        chunks = chunk_text(content)
+        chunk_hashes = [text_hash(chunk) if chunk.strip() else None for chunk in chunks]
+        spans = [[start, start + len(chunk)] for chunk, start in zip(chunks, chunk_offsets(content, chunks))]
+        text_id = page_id(content) if chunks else None
+        entry = {
+            'hash': page_hash, 'meta': meta_hash, 'chunks': chunk_hashes,
+            'title': title, 'image_ids': list(page_images), 'chunk_images': chunk_image_ids(spans, images),
+            'page_id': text_id, 'spans': spans, 'language': language, 'version': version,
+        }
+        self._plan_table(self.image_refs, plan.images, plan.stale_image_ids, url,
+                         previous.get('image_ids', []) if previous else [], page_images)
+        self._plan_table(self.page_refs, plan.pages, plan.stale_page_ids, url,
+                         [previous['page_id']] if previous and previous.get('page_id') else [],
+                         {text_id: content} if text_id else {})
+        self._remove_refs(url, old_chunks)
+        self._pending[url] = entry
+        plan.updates[url] = entry
+
+        old_refs = {(i, h) for i, h in enumerate(old_chunks) if h}
+        # Stored for this page before (its refs were just removed): still in the store
+        old_hashes = {h for _, h in old_refs}
+        new_refs = {(i, h) for i, h in enumerate(chunk_hashes) if h}
+        # Chunks whose metadata depends on what changed in this page
+        touched = {h for _, h in old_refs ^ new_refs}
+        # The offsets of the chunks point into the page text, which changed too
+        if meta_changed or not previous or previous.get('page_id') != text_id:
+            touched.update(h for _, h in new_refs)
+
+        for i, (chunk, h) in enumerate(zip(chunks, chunk_hashes)):
+            if h is None:
+                continue
+            if h not in self.chunk_refs:
+                if chunk_id(h) in plan.stale_ids:
+                    # Dropped by an earlier page of this plan, not deleted yet: keep it
+                    plan.stale_ids.remove(chunk_id(h))
+                    touched.add(h)
+                elif h not in old_hashes:
+                    # Not stored for any page yet: embed it
+                    plan.add_chunk(chunk_id(h), chunk, None)
+                    touched.add(h)
+            elif (i, h) not in old_refs and not any(ref_url == url for ref_url, _ in self.chunk_refs[h]):
+                plan.shared_chunks += 1
+            self.chunk_refs.setdefault(h, {})[(url, i)] = None
+
+        for h in touched:
+            if h in self.chunk_refs:
+                plan.set_metadata(chunk_id(h), self.chunk_metadata(h))
+            else:
+                # No page references the chunk any more
+                plan.stale_ids.append(chunk_id(h))
+
+    def plan_removal(self, urls):
+        """
+        Plan the deletion of pages that disappeared from the site.
+
+        Their chunks, image table and page table entries are deleted unless another page still
+        refers to them (shared chunks are only re-tagged), and their manifest entries are dropped
+        when the plan is committed.
+
+        Args:
+            urls: URLs of manifest pages to remove
+
+        Returns:
+            IngestionPlan with the IDs to delete and the metadata to update
+        """
+        plan = IngestionPlan()
+        touched = set()
+        for url in urls:
+            previous = self._entry(url)
+            if not previous:
+                continue
+            plan.removed_urls.append(url)
+            plan.stale_ids.extend(previous.get('legacy_ids', []))
+            self._plan_table(self.image_refs, plan.images, plan.stale_image_ids, url,
+                             previous.get('image_ids', []), {})
+            self._plan_table(self.page_refs, plan.pages, plan.stale_page_ids, url,
+                             [previous['page_id']] if previous.get('page_id') else [], {})
+            self._remove_refs(url, previous.get('chunks', []))
+            self._pending.pop(url, None)
+            touched.update(h for h in previous.get('chunks', []) if h)
+
+        for h in touched:
+            if h in self.chunk_refs:
+                # Still on another page (e.g. another version): only its metadata changes
+                plan.set_metadata(chunk_id(h), self.chunk_metadata(h))
+            else:
+                plan.stale_ids.append(chunk_id(h))
+        return plan
+
+    def _plan_table(self, table_refs, added, stale, url, old_ids, entries):
+        """
+        Plan the image or page table entries of a page.
+
+        Args:
+            table_refs: Entry id -> pages referring to it (``image_refs`` or ``page_refs``)
+            added: Entries to store (``plan.images``/``plan.pages``), completed with those not stored yet
+            stale: Entry ids to delete, completed with those no page refers to any more
+            url: Page URL
+            old_ids: Entry ids the page referred to before
+            entries: Entry id -> entry the page refers to now
+        """
+        for ref_id, entry in entries.items():
+            if ref_id in stale:
+                # Dropped by an earlier page of this plan, not deleted yet: keep it
+                stale.remove(ref_id)
+            elif ref_id not in table_refs:
+                added[ref_id] = entry
+            table_refs.setdefault(ref_id, {})[url] = None
+        for ref_id in old_ids:
+            if ref_id in entries:
+                continue
+            refs = table_refs.get(ref_id, {})
+            refs.pop(url, None)
+            if not refs:
+                table_refs.pop(ref_id, None)
+                added.pop(ref_id, None)
+                stale.append(ref_id)
+
+    def commit(self, plan):
+        """Record a successfully applied plan and persist the manifest."""
+        self.pages.update(plan.updates)
+        for url in plan.removed_urls:
+            self.pages.pop(url, None)
+        for url, entry in plan.updates.items():
+            if self._pending.get(url) is entry:
+                del self._pending[url]
+        self.save()
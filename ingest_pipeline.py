@@ -0,0 +1,387 @@
+"""
+Backend-agnostic ingestion pipeline (chunk -> batch embed -> write).
+Chunks are embedded once with the shared model (see ``embeddings``) and the vectors are
+written to every configured store, so Chroma and Qdrant can be fed in the same run.
+
+Streaming mode: pages flow through bounded queues (fetch -> chunk -> embed/upsert) so that
+network fetching overlaps with embedding and memory stays flat as the documentation grows.
+
+A store is any object with ``name``, ``manifest_path``, ``count()``,
+``add(ids, documents, metadatas, embeddings)``, ``update_metadata(ids, metadatas)`` and
+``delete(ids)`` (``knowledge_base.ChromaStore``, ``knowledge_base_qdrant.QdrantKnowledgeBase``),
+plus ``add_images(images)`` / ``delete_images(ids)`` for the image table referenced by chunks.
+Stores keeping page texts once (``add_pages(pages)`` / ``delete_pages(ids)``) get them too,
+and ``bump_index_version()`` is called on stores that have it once a plan changed them.
+Stores with a ``bulk_add`` method (Qdrant) upload the chunks of a plan through it instead;
+their ``bulk_flush_size`` sets how many chunks a streamed plan gathers so that every parallel
+upload worker gets a batch.
+
+After a complete crawl, ``remove_missing`` deletes the pages of the manifests that the crawl
+did not return any more (removed from the site), with their chunks, images and page texts.
+"""
+import queue
+import threading
+import time
+import logging
+from functools import lru_cache
+
+import embeddings
+from ingest_manifest import IngestManifest, IngestionPlan
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 100  # Chunks per write batch
+DEFAULT_QUEUE_SIZE = 16  # Pages buffered between the crawler and the chunker
+
+_DONE = object()
+
+
+class _Stages:
+    """Shared stop flag and error slot for the pipeline threads."""
+
+    def __init__(self):
+        self.stop = threading.Event()
+        self.errors = []
+
+    def fail(self, error):
+        self.errors.append(error)
+        self.stop.set()
+
+    def put(self, q, item):
+        """Blocking put that gives up once the pipeline is stopping. Returns False if it gave up."""
+        while not self.stop.is_set():
+            try:
+                q.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(self, q):
+        """Blocking get that returns _DONE once the pipeline is stopping."""
+        while True:
+            try:
+                return q.get(timeout=0.5)
+            except queue.Empty:
+                if self.stop.is_set():
+                    return _DONE
+
+
+def open_manifest(store, full_refresh=False):
+    """Load the ingestion manifest of a store (reset if the store is empty or a full refresh is requested)."""
+    manifest = IngestManifest(store.manifest_path)
+    if full_refresh or store.count() == 0:
+        manifest.reset()
+    return manifest
+
+
+def _chunk_once(chunk_text, targets, embed=None):
+    """Chunking function shared by the targets' manifests: each page is chunked once, not once per store."""
+    if embed is None:
+        # Load the shared model first so chunks are sized with its tokenizer
+        embeddings.get_model()
+    return lru_cache(maxsize=4)(chunk_text) if len(targets) > 1 else chunk_text
+
+
+def _flush_size(targets, batch_size):
+    """Chunks per streamed plan: ``batch_size``, or more to keep the parallel uploads of bulk stores busy."""
+    return max([batch_size] + [getattr(store, 'bulk_flush_size', 0) for store, _ in targets])
+
+
+def embed_plans(plans, embed=None, batch_size=None, processes=None):
+    """
+    Embed the chunks to write of one or several plans (one per store), each distinct chunk once.
+
+    Args:
+        plans: List of ``IngestionPlan``
+        embed: Function embedding a list of texts (default: ``embeddings.embed``)
+        batch_size: Texts per forward pass of ``embeddings.embed`` (default: ``EMBED_BATCH_SIZE``)
+        processes: Worker processes of ``embeddings.embed`` (default: ``EMBED_PROCESSES``)
+
+    Returns:
+        Dict chunk id -> vector
+    """
+    texts = {}
+    for plan in plans:
+        for chunk_id, document in zip(plan.ids, plan.documents):
+            texts.setdefault(chunk_id, document)
+    if not texts:
+        return {}
+    if embed:
+        vectors = embed(list(texts.values()))
+    else:
+        vectors = embeddings.embed(list(texts.values()), batch_size=batch_size, processes=processes)
+    return dict(zip(texts, vectors))
+
+
+def write_plan(plan, store, vectors, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Write an ingestion plan to a store with precomputed vectors.
+
+    Args:
+        plan: ``IngestionPlan``
+        store: Target store
+        vectors: Dict chunk id -> vector (see ``embed_plans``)
+        batch_size: Chunks per write request
+    """
+    if plan.images:
+        # Before the chunks, so a chunk never refers to an image that is not stored yet
+        store.add_images(plan.images)
+        print(f"Stored {len(plan.images)} images in {store.name}")
+
+    add_pages = getattr(store, 'add_pages', None)
+    if plan.pages and add_pages:
+        # Page texts the chunk offsets point into, before the chunks too
+        add_pages(plan.pages)
+
+    ids = plan.ids
+    bulk_add = getattr(store, 'bulk_add', None)
+    if ids and bulk_add:
+        # Parallel non-blocking upload with its own batching and resume ledger
+        upload = bulk_add(ids, plan.documents, plan.metadatas, [vectors[i] for i in ids])
+        print(f"Uploaded {upload['points']} chunks to {store.name} in {upload['batches']} batches "
+              f"({upload['points_per_sec']:.0f} chunks/s, {upload['skipped']} batches already uploaded)")
+    elif ids:
+        total_batches = (len(ids) + batch_size - 1) // batch_size
+        for b, start_idx in enumerate(range(0, len(ids), batch_size)):
+            batch_ids = ids[start_idx:start_idx + batch_size]
+            store.add(
+                ids=batch_ids,
+                documents=plan.documents[start_idx:start_idx + batch_size],
+                metadatas=plan.metadatas[start_idx:start_idx + batch_size],
+                embeddings=[vectors[i] for i in batch_ids]
+            )
+            print(f"Added batch {b+1}/{total_batches} to {store.name}")
+
+    if plan.metadata_updates:
+        # Chunks shared with other pages/versions: only their metadata changes, no re-embedding
+        update_ids = list(plan.metadata_updates)
+        for start_idx in range(0, len(update_ids), batch_size):
+            batch_ids = update_ids[start_idx:start_idx + batch_size]
+            store.update_metadata(batch_ids, [plan.metadata_updates[i] for i in batch_ids])
+        print(f"Updated metadata of {len(update_ids)} shared chunks in {store.name}")
+
+    if plan.stale_ids:
+        store.delete(plan.stale_ids)
+        print(f"Deleted {len(plan.stale_ids)} stale chunks from {store.name}")
+
+    if plan.stale_image_ids:
+        store.delete_images(plan.stale_image_ids)
+        print(f"Deleted {len(plan.stale_image_ids)} unused images from {store.name}")
+
+    if plan.stale_page_ids and hasattr(store, 'delete_pages'):
+        store.delete_pages(plan.stale_page_ids)
+
+    if (ids or plan.metadata_updates or plan.stale_ids) and hasattr(store, 'bump_index_version'):
+        # Running apps drop their cached query results (see ``query_cache``)
+        store.bump_index_version()
+
+
+def _apply(plans, targets, embed=None, embed_batch_size=None, embed_processes=None):
+    """
+    Embed the plans' chunks once, write them to every store and commit the manifests.
+
+    Returns:
+        ``(chunks embedded, seconds spent embedding)``
+    """
+    started = time.perf_counter()
+    vectors = embed_plans(plans, embed, embed_batch_size, embed_processes)
+    embed_seconds = time.perf_counter() - started
+    for (store, manifest), plan in zip(targets, plans):
+        write_plan(plan, store, vectors)
+        # Committed store by store: a store that failed is simply re-planned on the next run
+        manifest.commit(plan)
+    return len(vectors), embed_seconds
+
+
+def remove_missing(targets, urls, in_scope=None):
+    """
+    Remove from every store the manifest pages that a complete crawl did not return.
+
+    Only call this after a crawl that reached every page (not resumed, no failed page):
+    any page missing from ``urls`` is considered deleted from the site.
+
+    Args:
+        targets: List of ``(store, manifest)`` pairs
+        urls: URLs of every page of the crawl (``stats['urls']`` of ``stream_ingest``)
+        in_scope: Optional predicate selecting the manifest pages the crawl covered
+            (e.g. the pages below its help section roots)
+
+    Returns:
+        Number of pages removed from the first store
+    """
+    removed = []
+    for store, manifest in targets:
+        missing = [url for url in manifest.pages if url not in urls and (in_scope is None or in_scope(url))]
+        plan = manifest.plan_removal(missing)
+        if plan.removed_urls:
+            write_plan(plan, store, {})
+            manifest.commit(plan)
+            print(f"Removed {len(plan.removed_urls)} pages no longer on the site from {store.name} "
+                  f"({len(plan.stale_ids)} chunks deleted)")
+        removed.append(len(plan.removed_urls))
+    return removed[0] if removed else 0
+
+
+def _throughput(stats):
+    """Add chunks/s rates (embedding alone and end to end) to ingestion statistics."""
+    stats['embed_chunks_per_sec'] = stats['chunks_embedded'] / stats['embed_seconds'] if stats['embed_seconds'] else 0.0
+    stats['chunks_per_sec'] = stats['chunks_embedded'] / stats['elapsed'] if stats['elapsed'] else 0.0
+    return stats
+
+
+def _summary(plans, targets):
+    if len(plans) == 1:
+        return plans[0].summary()
+    return "; ".join(f"{store.name}: {plan.summary()}" for (store, _), plan in zip(targets, plans))
+
+
+def ingest(pages_data, targets, chunk_text, embed=None, embed_batch_size=None, embed_processes=None):
+    """
+    Ingest a list of pages into one or several stores.
+
+    Args:
+        pages_data: List of page dicts
+        targets: List of ``(store, manifest)`` pairs; chunks are embedded once for all of them
+        chunk_text: Chunking function
+        embed: Function embedding a list of texts (default: ``embeddings.embed``)
+        embed_batch_size: Texts per forward pass of the shared model (default: ``EMBED_BATCH_SIZE``)
+        embed_processes: Worker processes encoding large plans (default: ``EMBED_PROCESSES``)
+
+    Returns:
+        Dict with ingestion statistics
+    """
+    pages_data = list(pages_data)
+    chunk = _chunk_once(chunk_text, targets, embed)
+    plans = [manifest.plan(pages_data, chunk) for _, manifest in targets]
+    print(f"Ingestion plan: {_summary(plans, targets)}")
+    started = time.perf_counter()
+    embedded, embed_seconds = _apply(plans, targets, embed, embed_batch_size, embed_processes)
+    stats = _throughput({
+        'pages': len(plans[0].urls) if plans else 0,
+        'changed_pages': plans[0].changed_pages if plans else 0,
+        'chunks_embedded': embedded,
+        'chunks_written': sum(len(plan.documents) for plan in plans),
+        'chunks_deleted': sum(len(plan.stale_ids) for plan in plans),
+        'embed_seconds': embed_seconds,
+        'elapsed': time.perf_counter() - started,
+    })
+    stats['embedding_cache'] = embeddings.cache_stats() if embed is None else None
+    if embedded:
+        print(f"Embedded {embedded} chunks at {stats['embed_chunks_per_sec']:.0f} chunks/s "
+              f"({stats['chunks_per_sec']:.0f} chunks/s including writes)")
+    return stats
+
+
+def stream_ingest(pages, targets, chunk_text, on_committed=None, embed=None,
+                  batch_size=DEFAULT_BATCH_SIZE, queue_size=DEFAULT_QUEUE_SIZE,
+                  embed_batch_size=None, embed_processes=None):
+    """
+    Ingest an iterable of pages through bounded queues.
+
+    Args:
+        pages: Iterable (typically ``scraper.iter_scraper()``) of page dicts
+        targets: List of ``(store, manifest)`` pairs; chunks are embedded once for all of them
+        chunk_text: Chunking function
+        on_committed: Optional callback receiving the URLs of pages durably ingested
+        embed: Function embedding a list of texts (default: ``embeddings.embed``)
+        batch_size: Approximate number of chunks per write batch (batches never split a page;
+            raised to the ``bulk_flush_size`` of the stores that have one)
+        queue_size: Number of pages buffered between the crawler and the chunker
+        embed_batch_size: Texts per forward pass of the shared model (default: ``EMBED_BATCH_SIZE``)
+        embed_processes: Worker processes encoding large plans (default: ``EMBED_PROCESSES``)
+
+    Returns:
+        Dict with ingestion statistics; ``urls`` holds the URLs of every page ingested (see ``remove_missing``)
+    """
+    chunk = _chunk_once(chunk_text, targets, embed)
+    flush_size = _flush_size(targets, batch_size)
+    stages = _Stages()
+    page_queue = queue.Queue(maxsize=queue_size)
+    plan_queue = queue.Queue(maxsize=2)
+
+    def fetch_stage():
+        try:
+            for page in pages:
+                if not stages.put(page_queue, page):
+                    break
+            else:
+                stages.put(page_queue, _DONE)
+        except Exception as e:
+            stages.fail(e)
+        finally:
+            close = getattr(pages, 'close', None)
+            if close:
+                close()
+
+    def chunk_stage():
+        try:
+            plans = [IngestionPlan() for _ in targets]
+            while True:
+                page = stages.get(page_queue)
+                if page is _DONE:
+                    break
+                for (_, manifest), plan in zip(targets, plans):
+                    manifest.plan_page(plan, page, chunk)
+                # Flush at page boundaries so a page's manifest entry is committed with all its chunks
+                if any(len(plan.documents) + len(plan.stale_ids) >= flush_size or len(plan.urls) >= flush_size
+                       for plan in plans):
+                    if not stages.put(plan_queue, plans):
+                        return
+                    plans = [IngestionPlan() for _ in targets]
+            if not stages.stop.is_set():
+                stages.put(plan_queue, plans)
+                stages.put(plan_queue, _DONE)
+        except Exception as e:
+            stages.fail(e)
+
+    threads = [
+        threading.Thread(target=fetch_stage, name="ingest-fetch", daemon=True),
+        threading.Thread(target=chunk_stage, name="ingest-chunk", daemon=True),
+    ]
+    for thread in threads:
+        thread.start()
+
+    stats = {'pages': 0, 'changed_pages': 0, 'chunks_embedded': 0, 'chunks_written': 0, 'chunks_deleted': 0,
+             'batches': 0, 'embed_seconds': 0.0, 'urls': set()}
+    started = time.perf_counter()
+    try:
+        # Embed + write stage runs in the calling thread
+        while True:
+            plans = stages.get(plan_queue)
+            if plans is _DONE:
+                break
+            embedded, embed_seconds = _apply(plans, targets, embed, embed_batch_size, embed_processes)
+            stats['chunks_embedded'] += embedded
+            stats['embed_seconds'] += embed_seconds
+            if on_committed:
+                on_committed(plans[0].urls)
+
+            stats['batches'] += 1
+            stats['pages'] += len(plans[0].urls)
+            stats['urls'].update(plans[0].urls)
+            stats['changed_pages'] += plans[0].changed_pages
+            stats['chunks_written'] += sum(len(plan.documents) for plan in plans)
+            stats['chunks_deleted'] += sum(len(plan.stale_ids) for plan in plans)
+            print(f"Batch {stats['batches']}: {_summary(plans, targets)}")
+    except BaseException:
+        stages.stop.set()
+        raise
+    finally:
+        for thread in threads:
+            thread.join(timeout=5)
+
+    if stages.errors:
+        raise stages.errors[0]
+
+    elapsed = time.perf_counter() - started
+    stats['elapsed'] = elapsed
+    _throughput(stats)
+    stats['embedding_cache'] = embeddings.cache_stats() if embed is None else None
+    logger.info(
+        f"Streaming ingestion complete: {stats['pages']} pages ({stats['changed_pages']} new/changed), "
+        f"{stats['chunks_embedded']} chunks embedded, {stats['chunks_written']} written, "
+        f"{stats['chunks_deleted']} deleted in {elapsed:.1f}s "
+        f"(embedding {stats['embed_chunks_per_sec']:.0f} chunks/s)"
+    )
+    return stats
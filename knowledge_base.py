@@ -1,7 +1,14 @@
 import os
+import json
+import time
+import shutil
 import logging
 from pathlib import Path
 
+# Heading/paragraph chunks sized with the embedding model's tokenizer (shared by both backends)
+from chunker import chunk_text
+from query_cache import QueryCache
+
 logger = logging.getLogger(__name__)
 
 def _load_env_file():
@@ -30,13 +37,31 @@ _load_env_file()
 USE_QDRANT = os.getenv('USE_QDRANT', 'false').lower() == 'true'
 QDRANT_URL = os.getenv('QDRANT_URL')
 QDRANT_API_KEY = os.getenv('QDRANT_API_KEY')
+# Strip boilerplate blocks and near-duplicate pages before chunking (see dedup.py)
+DEDUP = os.getenv('INGEST_DEDUP', 'true').lower() == 'true'
+# Ingest into both Chroma and Qdrant (queries still use the backend above), e.g. while migrating.
+# Chunks are embedded once for both stores.
+DUAL_WRITE = os.getenv('KB_DUAL_WRITE', 'false').lower() == 'true'
+
+# Query result cache shared by every session of the app (see query_cache.py)
+_query_cache = QueryCache()
+_RESULT_FIELDS = ('ids', 'documents', 'metadatas', 'distances')
 
 # Global variables for backend
 collection = None
 qdrant_client = None
+chroma_collection = None
+client = None
+CHROMA_COLLECTION_NAME = "primlogix_docs"
+# Companion collection holding the images referenced by the chunks' image_ids
+IMAGES_SUFFIX = "_images"
+# Stamp bumped by every ingestion into Chroma (see query_cache)
+INDEX_VERSION_FILE = "index_version"
+PERSIST_DIRECTORY = os.path.join(os.getcwd(), "chroma_db")
+_chroma_pointer_state = None
 
 # Initialize backend
-if USE_QDRANT and QDRANT_URL and QDRANT_API_KEY:
+if (USE_QDRANT or DUAL_WRITE) and QDRANT_URL and QDRANT_API_KEY:
     # Use Qdrant Cloud
     try:
         logger.info(f"Using Qdrant Cloud for knowledge base: {QDRANT_URL[:50] if QDRANT_URL else 'N/A'}...")
@@ -50,7 +75,8 @@ if USE_QDRANT and QDRANT_URL and QDRANT_API_KEY:
         else:
             # Only initialize if import succeeded
             qdrant_client = QdrantKnowledgeBase(url=QDRANT_URL, api_key=QDRANT_API_KEY)
-            collection = qdrant_client  # Compatible interface
+            if USE_QDRANT:
+                collection = qdrant_client  # Compatible interface
             logger.info("✅ Qdrant Cloud initialized successfully")
     except (KeyError, ImportError, AttributeError, Exception) as e:
         logger.warning(f"Failed to initialize Qdrant: {e}")
@@ -60,129 +86,464 @@ if USE_QDRANT and QDRANT_URL and QDRANT_API_KEY:
         USE_QDRANT = False
         qdrant_client = None
 
-if not USE_QDRANT or not qdrant_client:
+if not USE_QDRANT or not qdrant_client or DUAL_WRITE:
     # Use ChromaDB local (default)
     logger.info("Using ChromaDB local for knowledge base")
     import chromadb
-    from chromadb.utils import embedding_functions
+    from embeddings import chroma_embedding_function
+    from blue_green import read_chroma_pointer, chroma_pointer_state
     
-    PERSIST_DIRECTORY = os.path.join(os.getcwd(), "chroma_db")
     client = chromadb.PersistentClient(path=PERSIST_DIRECTORY)
     
-    # Use a local embedding model (free and fast)
-    sentence_transformer_ef = embedding_functions.SentenceTransformerEmbeddingFunction(model_name="all-MiniLM-L6-v2")
+    # Use a local embedding model (free and fast), shared with the ingestion pipeline and Qdrant
+    sentence_transformer_ef = chroma_embedding_function()
     
-    # Get or create collection
-    collection = client.get_or_create_collection(
-        name="primlogix_docs",
+    # Get or create the live collection (switched by blue/green reindexing, see blue_green.py)
+    _chroma_pointer_state = chroma_pointer_state(PERSIST_DIRECTORY)
+    chroma_collection = client.get_or_create_collection(
+        name=read_chroma_pointer(PERSIST_DIRECTORY, CHROMA_COLLECTION_NAME),
         embedding_function=sentence_transformer_ef
     )
+    if collection is None:
+        collection = chroma_collection
 
 
-def chunk_text(text, chunk_size=800, overlap=150):
-    """
-    Optimized text chunking with overlap.
-    Reduced chunk size from 1000 to 800 for better relevance and faster processing.
-    Reduced overlap from 200 to 150 for less redundancy.
-    """
-    if not text:
-        return []
-    
-    chunks = []
-    start = 0
-    while start < len(text):
-        end = start + chunk_size
-        chunk = text[start:end]
-        # Only add non-empty chunks
-        if chunk.strip():
-            chunks.append(chunk)
-        start += (chunk_size - overlap)
-    return chunks
-
-
-def add_documents(pages_data):
-    """Add a list of page data dicts to the vector DB."""
-    if USE_QDRANT and qdrant_client:
-        # Use Qdrant
-        from knowledge_base_qdrant import add_documents as qdrant_add
-        qdrant_add(pages_data, qdrant_client)
-        return
-    
-    # Use ChromaDB
-    ids = []
-    documents = []
-    metadatas = []
+def _live_chroma_collection():
+    """The live Chroma collection, re-opened if a blue/green reindex switched it since it was opened."""
+    global chroma_collection, collection, _chroma_pointer_state
+    from blue_green import read_chroma_pointer, chroma_pointer_state
+    state = chroma_pointer_state(PERSIST_DIRECTORY)
+    if state != _chroma_pointer_state:
+        name = read_chroma_pointer(PERSIST_DIRECTORY, CHROMA_COLLECTION_NAME)
+        if name != chroma_collection.name:
+            logger.info(f"Live Chroma collection switched to '{name}'")
+            previous = chroma_collection
+            chroma_collection = client.get_collection(name=name, embedding_function=sentence_transformer_ef)
+            if collection is previous:
+                collection = chroma_collection
+        _chroma_pointer_state = state
+    return chroma_collection
 
-    for page in pages_data:
-        url = page['url']
-        title = page['title']
-        content = page['content']
-        images = page.get('images', [])  # Get images for this page
-        
-        chunks = chunk_text(content)
+
+class ChromaStore:
+    """Chroma collection behind the write interface of ``QdrantKnowledgeBase`` (see ``ingest_pipeline``)."""
+    
+    name = "Chroma"
+    
+    def __init__(self, chroma_collection, manifest_path=None):
+        from blue_green import chroma_manifest_path
+        self.collection = chroma_collection
+        # Manifest lives next to the Chroma data so that deleting chroma_db/ also resets it
+        self.manifest_path = manifest_path or chroma_manifest_path(PERSIST_DIRECTORY, chroma_collection.name,
+                                                                   CHROMA_COLLECTION_NAME)
+    
+    def count(self):
+        return self.collection.count()
+    
+    def add(self, ids, documents, metadatas, embeddings=None):
+        # Upsert so that changed chunks replace their previous version
+        self.collection.upsert(ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings)
+    
+    def update_metadata(self, ids, metadatas):
+        self.collection.update(ids=ids, metadatas=metadatas)
+    
+    def delete(self, ids):
+        self.collection.delete(ids=ids)
+    
+    @property
+    def images(self):
+        """Image table of the collection: image dicts as JSON documents, with a placeholder vector."""
+        return client.get_or_create_collection(name=f"{self.collection.name}{IMAGES_SUFFIX}", embedding_function=None)
+    
+    def add_images(self, images):
+        self.images.upsert(ids=list(images), documents=[json.dumps(image, ensure_ascii=False) for image in images.values()],
+                           embeddings=[[0.0]] * len(images))
+    
+    def delete_images(self, image_ids):
+        self.images.delete(ids=image_ids)
+    
+    def get_images(self, image_ids):
+        if not image_ids:
+            return {}
+        results = self.images.get(ids=list(dict.fromkeys(image_ids)), include=['documents'])
+        return {image_id: json.loads(document) for image_id, document in zip(results['ids'], results['documents'])}
+    
+    def bump_index_version(self):
+        """Record that the Chroma data changed (stamp file read by ``index_version``)."""
+        path = Path(PERSIST_DIRECTORY) / INDEX_VERSION_FILE
+        tmp_path = path.with_suffix('.tmp')
+        tmp_path.write_text(str(time.time_ns()), encoding='utf-8')
+        os.replace(tmp_path, path)
+    
+    def index_version(self):
+        """Stamp changing whenever ingestion writes to Chroma or the live collection is switched."""
+        try:
+            stamp = (Path(PERSIST_DIRECTORY) / INDEX_VERSION_FILE).read_text(encoding='utf-8')
+        except FileNotFoundError:
+            stamp = ""
+        return f"{self.collection.name}:{stamp}"
+    
+    def new_version(self, version):
+        """Store on a new, empty versioned collection (blue/green reindex target)."""
+        from blue_green import versioned_name
+        return ChromaStore(client.create_collection(
+            name=versioned_name(CHROMA_COLLECTION_NAME, version),
+            embedding_function=sentence_transformer_ef
+        ))
+    
+    def promote(self, keep=None):
+        """
+        Make this collection the live one and delete versions older than the ``keep`` most recent.
         
-        for i, chunk in enumerate(chunks):
-            if not chunk.strip():
-                continue
-            
-            chunk_id = f"{url}_{i}"
-            ids.append(chunk_id)
-            documents.append(chunk)
-            
-            # Store images as JSON string in metadata
-            images_json = ""
-            if images:
-                import json
-                images_json = json.dumps(images)
-            
-            metadatas.append({
-                "url": url,
-                "title": title,
-                "chunk_index": i,
-                "images": images_json  # Store images for this chunk
-            })
-
-    if documents:
-        # Add to collection in batches to avoid hitting limits if any
-        batch_size = 100
-        total_batches = len(documents) // batch_size + (1 if len(documents) % batch_size > 0 else 0)
+        Returns:
+            Name of the collection that was live before (kept for rollback)
+        """
+        from blue_green import (BLUE_GREEN_KEEP, chroma_manifest_path, read_chroma_pointer,
+                                versions_to_prune, write_chroma_pointer)
+        previous = read_chroma_pointer(PERSIST_DIRECTORY, CHROMA_COLLECTION_NAME)
+        write_chroma_pointer(PERSIST_DIRECTORY, self.collection.name)
+        logger.info(f"Live Chroma collection is now '{self.collection.name}' (was '{previous}')")
+        names = [col.name for col in client.list_collections()]
+        for name in versions_to_prune(names, CHROMA_COLLECTION_NAME, self.collection.name, previous,
+                                      BLUE_GREEN_KEEP if keep is None else keep):
+            logger.info(f"Deleting old Chroma collection '{name}'")
+            client.delete_collection(name=name)
+            if f"{name}{IMAGES_SUFFIX}" in names:
+                client.delete_collection(name=f"{name}{IMAGES_SUFFIX}")
+            manifest_path = Path(chroma_manifest_path(PERSIST_DIRECTORY, name, CHROMA_COLLECTION_NAME))
+            manifest_path.unlink(missing_ok=True)
+            manifest_path.with_name(manifest_path.stem + "_boilerplate.json").unlink(missing_ok=True)
+        return previous
+    
+    def rollback(self):
+        """
+        Point the live collection back to the one built before the current one.
         
-        for b in range(total_batches):
-            start_idx = b * batch_size
-            end_idx = start_idx + batch_size
-            
-            collection.add(
-                ids=ids[start_idx:end_idx],
-                documents=documents[start_idx:end_idx],
-                metadatas=metadatas[start_idx:end_idx]
-            )
-            print(f"Added batch {b+1}/{total_batches}")
-            
+        Returns:
+            Name of the collection now live
+        """
+        from blue_green import previous_version, read_chroma_pointer, write_chroma_pointer
+        names = [col.name for col in client.list_collections()]
+        previous = previous_version(names, CHROMA_COLLECTION_NAME,
+                                    read_chroma_pointer(PERSIST_DIRECTORY, CHROMA_COLLECTION_NAME))
+        if not previous:
+            raise ValueError("No previous Chroma collection to roll back to")
+        write_chroma_pointer(PERSIST_DIRECTORY, previous)
+        logger.info(f"Live Chroma collection rolled back to '{previous}'")
+        return previous
+
+
+def _stores():
+    """Stores written by ingestion: the query backend first, then the other one when dual-writing."""
+    chroma_store = None
+    if chroma_collection is not None:
+        chroma_store = ChromaStore(_live_chroma_collection())
+    if USE_QDRANT and qdrant_client:
+        stores = [qdrant_client, chroma_store]
+    else:
+        stores = [chroma_store, qdrant_client]
+    if not DUAL_WRITE:
+        return stores[:1]
+    if stores[1] is None:
+        logger.warning("KB_DUAL_WRITE is set but Qdrant is not configured: writing to Chroma only")
+    return [store for store in stores if store is not None]
+
+
+def _open_targets(full_refresh=False):
+    """``(store, manifest)`` pairs of the stores to write (manifests reset for empty stores)."""
+    from ingest_pipeline import open_manifest
+    return [(store, open_manifest(store, full_refresh)) for store in _stores()]
+
+
+def _boilerplate_path(manifest_path):
+    manifest_path = Path(manifest_path)
+    return manifest_path.with_name(manifest_path.stem + "_boilerplate.json")
+
+
+def _deduplicator(manifest_path):
+    """Boilerplate/near-duplicate filter whose block frequencies are kept next to the manifest."""
+    from dedup import Deduplicator
+    return Deduplicator(state_path=_boilerplate_path(manifest_path))
+
+
+def _dedup_report(deduplicator, manifest):
+    """Log and return the deduplication report, with the chunks of the cleaned pages counted from the manifest."""
+    chunks = sum(1 for url in deduplicator.urls for chunk_hash in manifest.pages.get(url, {}).get('chunks', []) if chunk_hash)
+    return deduplicator.log_report(chunks_after=chunks)
+
+
+def add_documents(pages_data, full_refresh=False, dedup=DEDUP, embed_batch_size=None, embed_processes=None):
+    """
+    Add a list of page data dicts to the vector DB.
+    
+    Only new or changed pages are chunked and embedded (see ``ingest_manifest``);
+    chunks that disappeared from a page are deleted. With ``KB_DUAL_WRITE`` the chunks
+    are embedded once and written to both Chroma and Qdrant.
+    
+    Args:
+        pages_data: List of page dicts (url, title, content, images)
+        full_refresh: Ignore the manifest and re-embed every page
+        dedup: Strip boilerplate blocks and near-duplicate pages first (see ``dedup``)
+        embed_batch_size: Texts per forward pass of the embedding model (default: ``EMBED_BATCH_SIZE``)
+        embed_processes: Worker processes for large encodes (default: ``EMBED_PROCESSES``)
+    """
+    from ingest_pipeline import ingest
+    targets = _open_targets(full_refresh)
+    deduplicator = _deduplicator(targets[0][1].path) if dedup else None
+    if deduplicator:
+        pages_data = deduplicator.process(pages_data)
+    ingest(pages_data, targets, chunk_text, embed_batch_size=embed_batch_size, embed_processes=embed_processes)
+    if deduplicator:
+        _dedup_report(deduplicator, targets[0][1])
+    _query_cache.clear()
     print(f"Total documents in DB: {collection.count()}")
 
 
-def query_knowledge_base(query, n_results=10):
-    """Query the database for relevant chunks.
+def add_documents_stream(pages, full_refresh=False, on_committed=None, dedup=DEDUP,
+                         embed_batch_size=None, embed_processes=None):
+    """
+    Ingest pages as they are produced (e.g. by ``scraper.iter_scraper()``).
+    
+    Chunking and embedding start with the first scraped page and run concurrently with
+    the crawl through bounded queues, so memory does not grow with the documentation size.
+    
+    Args:
+        pages: Iterable of page dicts
+        full_refresh: Ignore the manifest and re-embed every page
+        on_committed: Optional callback receiving the URLs of pages durably ingested
+        dedup: Strip boilerplate blocks and near-duplicate pages first (see ``dedup``)
+        embed_batch_size: Texts per forward pass of the embedding model (default: ``EMBED_BATCH_SIZE``)
+        embed_processes: Worker processes for large encodes (default: ``EMBED_PROCESSES``)
+    
+    Returns:
+        Dict with ingestion statistics (``dedup`` holds the deduplication report)
+    """
+    from ingest_pipeline import stream_ingest
+    targets = _open_targets(full_refresh)
+    deduplicator = _deduplicator(targets[0][1].path) if dedup else None
+    if deduplicator:
+        pages = deduplicator.process(pages)
+    stats = stream_ingest(pages, targets, chunk_text, on_committed=on_committed,
+                          embed_batch_size=embed_batch_size, embed_processes=embed_processes)
+    if deduplicator:
+        stats['dedup'] = _dedup_report(deduplicator, targets[0][1])
+    _query_cache.clear()
+    print(f"Total documents in DB: {collection.count()}")
+    return stats
+
+
+def stored_urls():
+    """URLs of the pages ingested into the query backend (from its ingestion manifest)."""
+    from ingest_manifest import IngestManifest
+    return set(IngestManifest(_stores()[0].manifest_path).pages)
+
+
+def remove_missing_pages(urls, in_scope=None):
+    """
+    Delete the pages that a complete crawl no longer returned (removed from the site).
+    
+    Their chunks, images and page texts are deleted from every store unless another page
+    still uses them, and their manifest entries are dropped.
+    
+    Args:
+        urls: URLs of every page of the crawl (``stats['urls']`` of ``add_documents_stream``)
+        in_scope: Optional predicate selecting the stored pages the crawl covered
+    
+    Returns:
+        Number of pages removed
+    """
+    from ingest_pipeline import remove_missing
+    removed = remove_missing(_open_targets(), urls, in_scope)
+    if removed:
+        _query_cache.clear()
+    return removed
+
+
+def reindex(pages, on_committed=None, dedup=DEDUP, embed_batch_size=None, embed_processes=None):
+    """
+    Blue/green full reindex: build new versioned collections, then switch queries to them.
+    
+    The pages are ingested into a new, empty collection of each store while the live
+    collection keeps serving queries; once every store is complete, the live alias (Qdrant)
+    or pointer file (Chroma) is switched in one atomic step. The previous collection is kept
+    for ``rollback()``; older versions are deleted (see ``BLUE_GREEN_KEEP``).
+    
+    Args:
+        pages: Iterable of page dicts
+        on_committed: Optional callback receiving the URLs of pages durably ingested
+        dedup: Strip boilerplate blocks and near-duplicate pages first (see ``dedup``)
+        embed_batch_size: Texts per forward pass of the embedding model (default: ``EMBED_BATCH_SIZE``)
+        embed_processes: Worker processes for large encodes (default: ``EMBED_PROCESSES``)
+    
+    Returns:
+        Dict with ingestion statistics; ``live`` maps each store to its new collection
+    """
+    from blue_green import new_version
+    from ingest_pipeline import open_manifest, stream_ingest
+    live_stores = _stores()
+    version = new_version()
+    stores = [store.new_version(version) for store in live_stores]
+    targets = [(store, open_manifest(store, full_refresh=True)) for store in stores]
+    deduplicator = None
+    if dedup:
+        # Boilerplate frequencies carry over from the live collection
+        live_state = _boilerplate_path(live_stores[0].manifest_path)
+        if live_state.exists():
+            new_state = _boilerplate_path(stores[0].manifest_path)
+            new_state.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(live_state, new_state)
+        deduplicator = _deduplicator(stores[0].manifest_path)
+    if deduplicator:
+        pages = deduplicator.process(pages)
+    stats = stream_ingest(pages, targets, chunk_text, on_committed=on_committed,
+                          embed_batch_size=embed_batch_size, embed_processes=embed_processes)
+    if deduplicator:
+        stats['dedup'] = _dedup_report(deduplicator, targets[0][1])
+    
+    # Only switch once every store holds the complete new version
+    stats['live'], stats['previous'] = {}, {}
+    for store in stores:
+        stats['previous'][store.name] = store.promote()
+        stats['live'][store.name] = store.collection.name if isinstance(store, ChromaStore) else store.collection_name
+    _follow_live()
+    print(f"Total documents in DB: {stores[0].count()}")
+    return stats
+
+
+def rollback():
+    """
+    Switch queries back to the collections live before the last reindex.
+    
+    Returns:
+        Dict mapping each store to the collection now live
+    """
+    live = {store.name: store.rollback() for store in _stores()}
+    _follow_live()
+    return live
+
+
+def _follow_live():
+    """Point the backends of this process to the collections switched by ``reindex``/``rollback``."""
+    if qdrant_client is not None and qdrant_client.follows_live:
+        from knowledge_base_qdrant import LIVE_ALIAS
+        qdrant_client.collection_name = LIVE_ALIAS
+        qdrant_client._ensure_collection()  # Layout of the new live collection
+    if chroma_collection is not None:
+        _live_chroma_collection()
+    _query_cache.clear()
+
+
+def _chroma_where(version=None, language=None):
+    """Chroma ``where`` filter on the ``versions``/``languages`` lists of the chunks."""
+    conditions = []
+    if version:
+        conditions.append({'versions': {'$contains': version}})
+    if language:
+        conditions.append({'languages': {'$contains': language}})
+    if len(conditions) > 1:
+        return {'$and': conditions}
+    return conditions[0] if conditions else None
+
+
+def _resolve_version_urls(results, version):
+    """Point ``url`` of chunks shared between versions to the page of the requested version."""
+    for metadatas in results.get('metadatas') or []:
+        for metadata in metadatas or []:
+            if metadata and metadata.get('urls'):
+                try:
+                    metadata['url'] = json.loads(metadata['urls']).get(version, metadata.get('url'))
+                except (ValueError, AttributeError):
+                    pass
+    return results
+
+
+def get_images(image_ids):
+    """
+    Resolve image IDs of chunk metadata (``image_ids``, comma-separated) from the image table.
     
     Args:
-        query: Search query string
-        n_results: Number of results to return (default: 10 for better context)
+        image_ids: List of image IDs
     
     Returns:
-        Dictionary with 'documents', 'metadatas', 'distances', and 'ids'
+        Dict image ID -> image dict (url, alt, description, ...)
     """
+    if USE_QDRANT and qdrant_client:
+        return qdrant_client.get_images(image_ids)
+    return ChromaStore(_live_chroma_collection()).get_images(image_ids)
+
+
+def _search(queries, n_results, version, language):
+    """Run the queries against the backend in one call (see ``query_knowledge_base``)."""
     if USE_QDRANT and qdrant_client:
         # Use Qdrant
         from knowledge_base_qdrant import query_knowledge_base as qdrant_query
-        return qdrant_query(query, n_results, qdrant_client)
+        results = qdrant_query(queries, n_results, qdrant_client, version=version, language=language)
     else:
-        # Use ChromaDB
-        results = collection.query(
-            query_texts=[query],
+        # Use ChromaDB (query vectors from the shared model, through the embedding cache)
+        from embeddings import embed
+        results = _live_chroma_collection().query(
+            query_embeddings=embed(queries),
             n_results=n_results,
+            where=_chroma_where(version, language),
             include=['documents', 'metadatas', 'distances']
         )
-        return results
+    if version:
+        results = _resolve_version_urls(results, version)
+    return results
+
+
+def _index_version():
+    if USE_QDRANT and qdrant_client:
+        return qdrant_client.index_version()
+    return ChromaStore(_live_chroma_collection()).index_version()
+
+
+def query_cache_stats():
+    """Hit/miss counters of the query result cache (see ``query_cache``)."""
+    return _query_cache.stats()
+
+
+def query_knowledge_base(query, n_results=10, version=None, language=None):
+    """Query the database for relevant chunks.
+    
+    A list of queries is embedded in one batch and searched in a single backend call
+    (Qdrant batch query / one Chroma query with several query embeddings). Results of
+    queries seen recently come from the query cache, which is dropped when ingestion
+    bumps the index version.
+    
+    Args:
+        query: Search query string, or list of query strings
+        n_results: Number of results to return per query (default: 10 for better context)
+        version: Only return chunks of this help version (e.g. "5-8"); None searches every version
+        language: Only return chunks of this help language (e.g. "fr")
+    
+    Returns:
+        Dictionary with 'documents', 'metadatas', 'distances', and 'ids', each holding one
+        list of results per query (a single list for a single query string)
+    """
+    queries = [query] if isinstance(query, str) else list(query)
+    if not queries:
+        return {field: [] for field in _RESULT_FIELDS}
+    if not _query_cache.enabled:
+        return _search(queries, n_results, version, language)
+    
+    from embeddings import get_model
+    from query_cache import normalize_query
+    # Load the shared model first so normalize_query uses its tokenizer instead of loading another one
+    get_model()
+    _query_cache.check_version(_index_version)
+    backend = "qdrant" if USE_QDRANT and qdrant_client else "chroma"
+    keys = [(normalize_query(text), n_results, backend, version, language) for text in queries]
+    cached = [_query_cache.get(key) for key in keys]
+    missing = [i for i, result in enumerate(cached) if result is None]
+    if missing:
+        results = _search([queries[i] for i in missing], n_results, version, language)
+        for position, i in enumerate(missing):
+            cached[i] = {field: [results[field][position]] for field in _RESULT_FIELDS if results.get(field)}
+            # Empty results may come from a backend error: they are not kept
+            if cached[i].get('ids') and cached[i]['ids'][0]:
+                _query_cache.put(keys[i], cached[i])
+    return {field: [result[field][0] for result in cached] for field in _RESULT_FIELDS if field in cached[0]}
 
 
 if __name__ == "__main__":
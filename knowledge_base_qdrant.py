@@ -4,77 +4,301 @@ Provides the same interface as ChromaDB for seamless migration.
 """
 import os
 from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct
-from sentence_transformers import SentenceTransformer
+from qdrant_client.models import (
+    Distance, VectorParams, PointStruct, PointIdsList, PayloadSchemaType,
+    Filter, FieldCondition, MatchValue, SetPayload, SetPayloadOperation,
+    CreateAlias, CreateAliasOperation, DeleteAlias, DeleteAliasOperation,
+    DeletePayload, DeletePayloadOperation, QueryRequest
+)
+from chunker import chunk_text
+# Same model as ChromaDB for consistency, loaded once for both backends
+from embeddings import EMBEDDING_DIM, embed, embed_query
 import json
+import time
+import zlib
+import base64
+import hashlib
 import logging
+import threading
 import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
-# Initialize embedding model (same as ChromaDB for consistency)
-EMBEDDING_MODEL = SentenceTransformer('all-MiniLM-L6-v2')
-EMBEDDING_DIM = 384  # Dimension for all-MiniLM-L6-v2
+COLLECTION_NAME = "primlogix_docs"
+# Alias queried by the app (see blue_green.py): created on the unversioned collection on first
+# connection, then switched to each collection built by a blue/green reindex
+LIVE_ALIAS = os.getenv('QDRANT_LIVE_ALIAS', f"{COLLECTION_NAME}_live")
+# Companion collection (no vectors) holding the images referenced by the chunks' image_ids
+IMAGES_SUFFIX = "_images"
+# Chunk storage of new collections: "text" copies each chunk's text into its point, "offsets"
+# stores every page text once (compressed, in a companion collection) and chunk points only
+# keep page_id/start/end. Existing collections keep the layout they were created with.
+CHUNK_LAYOUT = os.getenv('QDRANT_CHUNK_LAYOUT', 'text')
+PAGES_SUFFIX = "_pages"
+# Decompressed page texts kept in memory (they are immutable: page IDs are content hashes)
+PAGE_CACHE_SIZE = 256
+# Bulk uploads: points per request and concurrent requests
+UPLOAD_BATCH_SIZE = int(os.getenv('QDRANT_UPLOAD_BATCH_SIZE', '128'))
+UPLOAD_WORKERS = int(os.getenv('QDRANT_UPLOAD_WORKERS', '4'))
+
+
+class UploadLedger:
+    """Append-only list of the batches of a bulk upload already acknowledged by Qdrant."""
+    
+    def __init__(self, path):
+        self.path = Path(path)
+        self.done = set()
+        self._lock = threading.Lock()
+        if self.path.exists():
+            with self.path.open('r', encoding='utf-8') as f:
+                self.done = {line.strip() for line in f if line.strip()}
+    
+    def record(self, key):
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open('a', encoding='utf-8') as f:
+                f.write(key + "\n")
+            self.done.add(key)
+    
+    def clear(self):
+        with self._lock:
+            self.done = set()
+            if self.path.exists():
+                self.path.unlink()
+
+
+def _batch_key(ids, documents, metadatas):
+    """Identity of an upload batch: the same plan re-run after a failure produces the same keys."""
+    return hashlib.sha1(json.dumps([ids, documents, metadatas], sort_keys=True).encode('utf-8')).hexdigest()
+
 
 class QdrantKnowledgeBase:
     """Qdrant Cloud knowledge base wrapper with ChromaDB-compatible interface."""
     
-    def __init__(self, url=None, api_key=None, collection_name="primlogix_docs"):
+    name = "Qdrant"
+    
+    def __init__(self, url=None, api_key=None, collection_name=None, client=None,
+                 embed_batch_size=None, embed_processes=None, chunk_layout=None):
         """
         Initialize Qdrant client.
         
         Args:
             url: Qdrant Cloud cluster URL (e.g., https://xxx.us-east-1-0.aws.cloud.qdrant.io)
             api_key: Qdrant Cloud API key
-            collection_name: Name of the collection
+            collection_name: Name of the collection (default: the live alias, pointed to
+                ``primlogix_docs`` if no blue/green reindex has switched it yet)
+            client: Optional ready ``QdrantClient`` (e.g. ``QdrantClient(":memory:")`` for benchmarks);
+                the credentials are not needed then
+            embed_batch_size: Texts per forward pass when ``add`` is called without vectors (default:
+                ``EMBED_BATCH_SIZE``; the ingestion pipeline embeds before writing, see its ``embed_batch_size``)
+            embed_processes: Worker processes for large ``add`` calls without vectors (default: ``EMBED_PROCESSES``)
+            chunk_layout: "text" or "offsets" if the collection has to be created (default:
+                ``CHUNK_LAYOUT``); an existing collection keeps its own
         """
         # Get credentials from environment or parameters
         self.url = url or os.getenv('QDRANT_URL')
         self.api_key = api_key or os.getenv('QDRANT_API_KEY')
-        self.collection_name = collection_name
+        self.embed_batch_size = embed_batch_size
+        self.embed_processes = embed_processes
+        self.chunk_layout = chunk_layout or CHUNK_LAYOUT
+        self._page_cache = OrderedDict()
+        self._page_cache_lock = threading.Lock()
         
-        if not self.url or not self.api_key:
+        if client is None and (not self.url or not self.api_key):
             raise ValueError(
                 "Qdrant credentials not found. Please set QDRANT_URL and QDRANT_API_KEY environment variables, "
                 "or provide them as parameters. Get them from: https://cloud.qdrant.io/"
             )
         
         # Initialize Qdrant client
-        self.client = QdrantClient(
+        self.client = client or QdrantClient(
             url=self.url,
             api_key=self.api_key,
         )
         
+        # Without an explicit name, queries go through the live alias so that a blue/green
+        # reindex moves them to the new collection, even in processes started before it
+        self.follows_live = collection_name is None
+        if self.follows_live:
+            self._ensure_live_alias()
+        self.collection_name = collection_name or LIVE_ALIAS
+        
         # Initialize collection if it doesn't exist
         self._ensure_collection()
         
-        logger.info(f"Connected to Qdrant Cloud: {self.url}")
+        logger.info(f"Connected to Qdrant Cloud: {self.url}" if self.url else "Using the provided Qdrant client")
     
     def _ensure_collection(self):
         """Create collection if it doesn't exist."""
         try:
             collections = self.client.get_collections()
-            collection_names = [col.name for col in collections.collections]
+            collection_names = [col.name for col in collections.collections] + list(self._aliases())
             
             if self.collection_name not in collection_names:
-                logger.info(f"Creating collection: {self.collection_name}")
+                logger.info(f"Creating collection: {self.collection_name} ({self.chunk_layout} layout)")
                 self.client.create_collection(
                     collection_name=self.collection_name,
                     vectors_config=VectorParams(
                         size=EMBEDDING_DIM,
                         distance=Distance.COSINE
-                    )
+                    ),
+                    metadata={"chunk_layout": self.chunk_layout}
                 )
                 logger.info(f"Collection '{self.collection_name}' created successfully")
             else:
-                logger.info(f"Collection '{self.collection_name}' already exists")
+                # Collections created before layouts copy the text into the chunks
+                metadata = self.client.get_collection(self.collection_name).config.metadata or {}
+                self.chunk_layout = metadata.get("chunk_layout", "text")
+                logger.info(f"Collection '{self.collection_name}' already exists ({self.chunk_layout} layout)")
+            if self.images_collection not in collection_names:
+                self._create_images_collection(self.images_collection)
+            if self.chunk_layout == "offsets" and self.pages_collection not in collection_names:
+                logger.info(f"Creating page table collection: {self.pages_collection}")
+                self.client.create_collection(collection_name=self.pages_collection, vectors_config={})
         except Exception as e:
             logger.error(f"Error ensuring collection: {e}")
             raise
+        
+        # Keyword indexes for the version/language filters (no-op if they already exist)
+        for field in ("versions", "languages"):
+            try:
+                self.client.create_payload_index(
+                    collection_name=self.collection_name,
+                    field_name=field,
+                    field_schema=PayloadSchemaType.KEYWORD
+                )
+            except Exception as e:
+                logger.warning(f"Could not create payload index on '{field}': {e}")
+    
+    def _ensure_live_alias(self):
+        """Point the live aliases to the unversioned collection (created if needed) unless they already exist."""
+        if LIVE_ALIAS in self._aliases():
+            return
+        self.collection_name = COLLECTION_NAME
+        self._ensure_collection()
+        try:
+            self._switch_alias(COLLECTION_NAME)
+        except Exception:
+            # Another process created the aliases first
+            if LIVE_ALIAS not in self._aliases():
+                raise
+    
+    def _create_images_collection(self, name):
+        logger.info(f"Creating image table collection: {name}")
+        self.client.create_collection(collection_name=name, vectors_config={})
+    
+    @property
+    def images_collection(self):
+        """Image table of the collection (an alias of the live one's when ``collection_name`` is the live alias)."""
+        return f"{self.collection_name}{IMAGES_SUFFIX}"
+    
+    @property
+    def pages_collection(self):
+        """Page table of a collection with the "offsets" layout."""
+        return f"{self.collection_name}{PAGES_SUFFIX}"
     
     def _embed_text(self, text):
         """Generate embedding for text."""
-        return EMBEDDING_MODEL.encode(text).tolist()
+        return embed_query(text)
+    
+    def _aliases(self):
+        """Alias name -> collection name."""
+        return {alias.alias_name: alias.collection_name for alias in self.client.get_aliases().aliases}
+    
+    @property
+    def physical_name(self):
+        """Collection behind ``collection_name`` (which may be an alias)."""
+        return self._aliases().get(self.collection_name, self.collection_name)
+    
+    @property
+    def manifest_path(self):
+        """Ingestion manifest of the collection (see ``ingest_manifest``); kept per physical collection."""
+        from ingest_manifest import MANIFEST_DIR
+        return Path(MANIFEST_DIR) / f"qdrant_{self.physical_name}.json"
+    
+    def bump_index_version(self):
+        """Record that the collection changed (stamp in its metadata, read by ``index_version``)."""
+        try:
+            self.client.update_collection(collection_name=self.physical_name, metadata={"index_version": str(time.time_ns())})
+        except Exception as e:
+            logger.warning(f"Could not update the index version of '{self.collection_name}': {e}")
+    
+    def index_version(self):
+        """Stamp changing whenever ingestion writes to the collection or the live alias is switched."""
+        physical_name = self.physical_name
+        metadata = self.client.get_collection(physical_name).config.metadata or {}
+        return f"{physical_name}:{metadata.get('index_version', '')}"
+    
+    def new_version(self, version):
+        """Knowledge base on a new, empty versioned collection (blue/green reindex target)."""
+        from blue_green import versioned_name
+        # Created with CHUNK_LAYOUT: a rebuild is how the layout of the live collection changes
+        return QdrantKnowledgeBase(url=self.url, api_key=self.api_key, client=self.client,
+                                   collection_name=versioned_name(COLLECTION_NAME, version),
+                                   embed_batch_size=self.embed_batch_size, embed_processes=self.embed_processes)
+    
+    def _switch_alias(self, collection_name):
+        """Point the live aliases (chunks and image table) to ``collection_name`` in one atomic request. Returns the previous target."""
+        aliases = self._aliases()
+        previous = aliases.get(LIVE_ALIAS)
+        if f"{collection_name}{IMAGES_SUFFIX}" not in [col.name for col in self.client.get_collections().collections]:
+            # Collection created before image tables
+            self._create_images_collection(f"{collection_name}{IMAGES_SUFFIX}")
+        names = [col.name for col in self.client.get_collections().collections]
+        operations = []
+        for suffix in ("", IMAGES_SUFFIX, PAGES_SUFFIX):
+            if f"{LIVE_ALIAS}{suffix}" in aliases:
+                operations.append(DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=f"{LIVE_ALIAS}{suffix}")))
+            if f"{collection_name}{suffix}" in names:
+                operations.append(CreateAliasOperation(create_alias=CreateAlias(
+                    collection_name=f"{collection_name}{suffix}", alias_name=f"{LIVE_ALIAS}{suffix}"
+                )))
+        self.client.update_collection_aliases(change_aliases_operations=operations)
+        logger.info(f"Qdrant alias '{LIVE_ALIAS}' now points to '{collection_name}' (was '{previous}')")
+        return previous
+    
+    def promote(self, keep=None):
+        """
+        Make this collection the live one and delete versions older than the ``keep`` most recent.
+        
+        Returns:
+            Name of the collection that was live before (kept for rollback)
+        """
+        from blue_green import BLUE_GREEN_KEEP, versions_to_prune
+        from ingest_manifest import MANIFEST_DIR
+        # Before the first switch the app queries the unversioned collection
+        previous = self._switch_alias(self.physical_name) or COLLECTION_NAME
+        names = [col.name for col in self.client.get_collections().collections]
+        # Collections other aliases still point to are in use
+        in_use = set(self._aliases().values())
+        for name in versions_to_prune(names, COLLECTION_NAME, self.physical_name, previous,
+                                      BLUE_GREEN_KEEP if keep is None else keep, in_use=in_use):
+            logger.info(f"Deleting old Qdrant collection '{name}'")
+            self.client.delete_collection(collection_name=name)
+            for suffix in (IMAGES_SUFFIX, PAGES_SUFFIX):
+                if f"{name}{suffix}" in names:
+                    self.client.delete_collection(collection_name=f"{name}{suffix}")
+            (Path(MANIFEST_DIR) / f"qdrant_{name}.json").unlink(missing_ok=True)
+        return previous
+    
+    def rollback(self):
+        """
+        Point the live alias back to the collection built before the current one.
+        
+        Returns:
+            Name of the collection now live
+        """
+        from blue_green import previous_version
+        names = [col.name for col in self.client.get_collections().collections]
+        current = self._aliases().get(LIVE_ALIAS)
+        previous = previous_version(names, COLLECTION_NAME, current) if current else None
+        if not previous:
+            raise ValueError("No previous Qdrant collection to roll back to")
+        self._switch_alias(previous)
+        return previous
     
     def count(self):
         """Get total number of documents in collection."""
@@ -96,7 +320,7 @@ class QdrantKnowledgeBase:
         namespace = uuid.UUID('6ba7b810-9dad-11d1-80b4-00c04fd430c8')  # DNS namespace
         return str(uuid.uuid5(namespace, str(original_id)))
     
-    def add(self, ids, documents, metadatas):
+    def add(self, ids, documents, metadatas, embeddings=None):
         """
         Add documents to Qdrant.
         
@@ -104,24 +328,48 @@ class QdrantKnowledgeBase:
             ids: List of document IDs (will be converted to UUIDs)
             documents: List of document texts
             metadatas: List of metadata dicts
+            embeddings: Optional precomputed vectors (computed in one batch otherwise)
         """
         if not ids or not documents:
             return
+        if embeddings is None:
+            # One batched encode for the whole call instead of a forward pass per document
+            started = time.perf_counter()
+            embeddings = embed(documents, batch_size=self.embed_batch_size, processes=self.embed_processes)
+            elapsed = time.perf_counter() - started
+            logger.info(f"Embedded {len(documents)} documents in {elapsed:.2f}s "
+                        f"({len(documents) / elapsed if elapsed else 0:.0f} chunks/s)")
+        
+        points = self._points(ids, documents, metadatas, embeddings)
         
+        # Upsert points in batches
+        try:
+            self.client.upsert(
+                collection_name=self.collection_name,
+                points=points
+            )
+            logger.info(f"Added {len(points)} documents to Qdrant")
+        except Exception as e:
+            logger.error(f"Error adding documents: {e}")
+            raise
+    
+    def _points(self, ids, documents, metadatas, embeddings):
+        """Build the Qdrant points of documents with their vectors."""
         points = []
-        for i, (doc_id, doc_text, metadata) in enumerate(zip(ids, documents, metadatas)):
-            # Generate embedding
-            embedding = self._embed_text(doc_text)
-            
+        for doc_id, doc_text, metadata, embedding in zip(ids, documents, metadatas, embeddings):
             # Convert ID to valid Qdrant format (UUID)
             qdrant_id = self._generate_point_id(doc_id)
             
             # Store original ID in metadata for reference
+            # None marks a key the chunk does not have (as in Chroma)
             metadata_with_original_id = {
-                **metadata,
+                **{key: value for key, value in metadata.items() if value is not None},
                 "original_id": doc_id,  # Keep original ID for reference
                 "text": doc_text  # Store text in payload for retrieval
             }
+            if self.chunk_layout == "offsets" and metadata.get("page_id"):
+                # Sliced from the page table at query time
+                del metadata_with_original_id["text"]
             
             # Prepare point
             point = PointStruct(
@@ -130,29 +378,236 @@ class QdrantKnowledgeBase:
                 payload=metadata_with_original_id
             )
             points.append(point)
+        return points
+    
+    @property
+    def bulk_flush_size(self):
+        """Chunks a streamed ingestion plan gathers before ``bulk_add``: one batch per upload worker."""
+        return UPLOAD_BATCH_SIZE * UPLOAD_WORKERS
+    
+    def bulk_add(self, ids, documents, metadatas, embeddings, batch_size=None, workers=None):
+        """
+        Upload many documents with parallel, non-blocking upserts.
         
-        # Upsert points in batches
-        try:
+        Batches are sent by ``workers`` threads with ``wait=False`` (acknowledged as soon as Qdrant
+        has accepted them, without waiting for indexing) and each acknowledged batch is recorded in
+        a ledger, so a call that fails midway does not re-send them when the same chunks are uploaded
+        again. The ledger covers the batches of one call (one ingestion plan): it is cleared once the
+        call succeeded. A final blocking request waits until all the updates have been applied.
+        
+        Args:
+            ids: List of document IDs
+            documents: List of document texts
+            metadatas: List of metadata dicts
+            embeddings: Precomputed vectors
+            batch_size: Points per request (default: ``QDRANT_UPLOAD_BATCH_SIZE``)
+            workers: Concurrent requests (default: ``QDRANT_UPLOAD_WORKERS``)
+        
+        Returns:
+            Dict with ``points`` uploaded, ``batches`` sent, ``skipped`` batches (found in the ledger),
+            ``seconds`` and ``points_per_sec``
+        """
+        batch_size = batch_size or UPLOAD_BATCH_SIZE
+        workers = workers or UPLOAD_WORKERS
+        started = time.perf_counter()
+        stats = {'points': 0, 'batches': 0, 'skipped': 0}
+        if len(ids) <= batch_size:
+            # Single request: a plain blocking upsert
+            self.add(ids, documents, metadatas, embeddings)
+            stats.update(points=len(ids), batches=1 if ids else 0)
+        else:
+            ledger = UploadLedger(self.manifest_path.with_name(f"qdrant_{self.collection_name}_uploads.log"))
+            batches = []
+            for start in range(0, len(ids), batch_size):
+                end = start + batch_size
+                key = _batch_key(ids[start:end], documents[start:end], metadatas[start:end])
+                if key in ledger.done:
+                    stats['skipped'] += 1
+                else:
+                    batches.append((start, end, key))
+            
+            def upload(batch):
+                start, end, key = batch
+                points = self._points(ids[start:end], documents[start:end], metadatas[start:end], embeddings[start:end])
+                self.client.upsert(collection_name=self.collection_name, points=points, wait=False)
+                ledger.record(key)
+                return len(points)
+            
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="qdrant-upload") as executor:
+                for count in executor.map(upload, batches):
+                    stats['points'] += count
+                    stats['batches'] += 1
+            # Updates are applied in order: once this blocking request returns, the non-blocking ones
+            # acknowledged before it have been applied too
             self.client.upsert(
                 collection_name=self.collection_name,
-                points=points
+                points=self._points(ids[-1:], documents[-1:], metadatas[-1:], embeddings[-1:]),
+                wait=True
             )
-            logger.info(f"Added {len(points)} documents to Qdrant")
+            ledger.clear()
+        
+        stats['seconds'] = time.perf_counter() - started
+        stats['points_per_sec'] = stats['points'] / stats['seconds'] if stats['seconds'] else 0.0
+        logger.info(
+            f"Uploaded {stats['points']} documents to Qdrant in {stats['batches']} batches "
+            f"({stats['points_per_sec']:.0f} points/s, {stats['skipped']} batches already uploaded)"
+        )
+        return stats
+    
+    def update_metadata(self, ids, metadatas):
+        """
+        Replace the metadata of existing documents without re-embedding them.
+        
+        Args:
+            ids: List of original document IDs
+            metadatas: List of metadata dicts (text and original ID are kept; keys set to None are removed)
+        """
+        if not ids:
+            return
+        operations = []
+        for doc_id, metadata in zip(ids, metadatas):
+            point_id = self._generate_point_id(doc_id)
+            operations.append(SetPayloadOperation(set_payload=SetPayload(
+                payload={key: value for key, value in metadata.items() if value is not None}, points=[point_id]
+            )))
+            removed = [key for key, value in metadata.items() if value is None]
+            if removed:
+                operations.append(DeletePayloadOperation(delete_payload=DeletePayload(keys=removed, points=[point_id])))
+        try:
+            self.client.batch_update_points(collection_name=self.collection_name, update_operations=operations)
+            logger.info(f"Updated metadata of {len(ids)} documents in Qdrant")
         except Exception as e:
-            logger.error(f"Error adding documents: {e}")
+            logger.error(f"Error updating metadata: {e}")
             raise
     
-    def query(self, query_texts, n_results=10, include=None):
+    def delete(self, ids):
+        """
+        Delete documents from Qdrant.
+        
+        Args:
+            ids: List of original document IDs
+        """
+        if not ids:
+            return
+        try:
+            self.client.delete(
+                collection_name=self.collection_name,
+                points_selector=PointIdsList(points=[self._generate_point_id(doc_id) for doc_id in ids])
+            )
+            logger.info(f"Deleted {len(ids)} documents from Qdrant")
+        except Exception as e:
+            logger.error(f"Error deleting documents: {e}")
+            raise
+    
+    def add_images(self, images):
+        """
+        Store entries of the image table.
+        
+        Args:
+            images: Dict image ID -> image dict (see ``ingest_manifest.image_id``)
+        """
+        points = [
+            PointStruct(id=self._generate_point_id(image_id), vector={}, payload={**image, "image_id": image_id})
+            for image_id, image in images.items()
+        ]
+        for start in range(0, len(points), UPLOAD_BATCH_SIZE):
+            self.client.upsert(collection_name=self.images_collection, points=points[start:start + UPLOAD_BATCH_SIZE])
+    
+    def delete_images(self, image_ids):
+        """Remove images no chunk refers to any more from the image table."""
+        self.client.delete(
+            collection_name=self.images_collection,
+            points_selector=PointIdsList(points=[self._generate_point_id(image_id) for image_id in image_ids])
+        )
+    
+    def add_pages(self, pages):
+        """
+        Store page texts the chunks point into (collections with the "offsets" layout only).
+        
+        Args:
+            pages: Dict page ID -> page text (see ``ingest_manifest.page_id``)
+        """
+        if self.chunk_layout != "offsets":
+            return
+        points = [
+            PointStruct(id=self._generate_point_id(page_id), vector={}, payload={
+                "page_id": page_id,
+                "text_z": base64.b64encode(zlib.compress(text.encode('utf-8'), 9)).decode('ascii')
+            })
+            for page_id, text in pages.items()
+        ]
+        for start in range(0, len(points), UPLOAD_BATCH_SIZE):
+            self.client.upsert(collection_name=self.pages_collection, points=points[start:start + UPLOAD_BATCH_SIZE])
+    
+    def delete_pages(self, page_ids):
+        if self.chunk_layout != "offsets":
+            return
+        self.client.delete(
+            collection_name=self.pages_collection,
+            points_selector=PointIdsList(points=[self._generate_point_id(page_id) for page_id in page_ids])
+        )
+    
+    def _page_texts(self, page_ids):
+        """Texts of pages of the page table, decompressed (and cached) on demand."""
+        with self._page_cache_lock:
+            texts = {page_id: self._page_cache[page_id] for page_id in page_ids if page_id in self._page_cache}
+        missing = [page_id for page_id in dict.fromkeys(page_ids) if page_id not in texts]
+        if missing:
+            records = self.client.retrieve(
+                collection_name=self.pages_collection,
+                ids=[self._generate_point_id(page_id) for page_id in missing],
+                with_payload=True
+            )
+            with self._page_cache_lock:
+                for record in records:
+                    page_id = record.payload["page_id"]
+                    texts[page_id] = zlib.decompress(base64.b64decode(record.payload["text_z"])).decode('utf-8')
+                    self._page_cache[page_id] = texts[page_id]
+                    self._page_cache.move_to_end(page_id)
+                while len(self._page_cache) > PAGE_CACHE_SIZE:
+                    self._page_cache.popitem(last=False)
+        return texts
+    
+    def get_images(self, image_ids):
+        """
+        Look up images of the image table.
+        
+        Args:
+            image_ids: List of image IDs
+        
+        Returns:
+            Dict image ID -> image dict (unknown IDs are left out)
+        """
+        if not image_ids:
+            return {}
+        records = self.client.retrieve(
+            collection_name=self.images_collection,
+            ids=[self._generate_point_id(image_id) for image_id in dict.fromkeys(image_ids)],
+            with_payload=True
+        )
+        images = {}
+        for record in records:
+            image = dict(record.payload or {})
+            images[image.pop("image_id", None)] = image
+        return images
+    
+    def query(self, query_texts, n_results=10, include=None, version=None, language=None):
         """
         Query Qdrant for similar documents.
         
+        Several query texts are embedded in one batch and searched in one ``query_batch_points``
+        request.
+        
         Args:
-            query_texts: List of query strings (only first one is used)
-            n_results: Number of results to return
+            query_texts: List of query strings
+            n_results: Number of results to return per query
             include: List of fields to include (for compatibility with ChromaDB)
+            version: Only return documents whose ``versions`` contain this help version
+            language: Only return documents whose ``languages`` contain this help language
         
         Returns:
-            Dictionary with 'documents', 'metadatas', 'distances', 'ids' (ChromaDB-compatible format)
+            Dictionary with 'documents', 'metadatas', 'distances', 'ids' (ChromaDB-compatible format,
+            one list per query text)
         """
         if not query_texts:
             return {
@@ -162,156 +617,129 @@ class QdrantKnowledgeBase:
                 'ids': [[]]
             }
         
-        query_text = query_texts[0]
-        query_embedding = self._embed_text(query_text)
+        query_embeddings = embed(list(query_texts))
+        conditions = []
+        if version:
+            conditions.append(FieldCondition(key="versions", match=MatchValue(value=version)))
+        if language:
+            conditions.append(FieldCondition(key="languages", match=MatchValue(value=language)))
+        query_filter = Filter(must=conditions) if conditions else None
         
         try:
-            # Search in Qdrant using query_points (correct API method)
-            # Use NamedSparseVector or just pass vector directly
-            search_results = self.client.query_points(
+            # One round-trip for every query text
+            batch_results = self.client.query_batch_points(
                 collection_name=self.collection_name,
-                query=query_embedding,  # Pass vector directly
-                limit=n_results,
-                with_payload=True
+                requests=[
+                    QueryRequest(query=query_embedding, filter=query_filter, limit=n_results, with_payload=True)
+                    for query_embedding in query_embeddings
+                ]
             )
             
             # Convert to ChromaDB-compatible format
-            documents = []
-            metadatas = []
-            distances = []
-            ids = []
-            
-            # Extract points from QueryResult object
-            points = search_results.points if hasattr(search_results, 'points') else []
-            
-            for result in points:
-                # Use original_id if available, otherwise use Qdrant ID
-                payload = result.payload if hasattr(result, 'payload') else {}
-                if not payload:
-                    payload = {}
-                
-                point_id = result.id if hasattr(result, 'id') else ''
-                original_id = payload.get('original_id', point_id) if isinstance(payload, dict) else point_id
-                ids.append(original_id)
+            results = {'documents': [], 'metadatas': [], 'distances': [], 'ids': []}
+            for search_results in batch_results:
+                documents = []
+                metadatas = []
+                distances = []
+                ids = []
                 
-                # Extract text from payload
-                text = payload.pop('text', '') if isinstance(payload, dict) else ''
-                documents.append(text)
+                # Extract points from QueryResult object
+                points = search_results.points if hasattr(search_results, 'points') else []
                 
-                # Remove original_id from metadata (it's not part of the original metadata)
-                if isinstance(payload, dict):
-                    payload.pop('original_id', None)
+                for result in points:
+                    # Use original_id if available, otherwise use Qdrant ID
+                    payload = result.payload if hasattr(result, 'payload') else {}
+                    if not payload:
+                        payload = {}
+                    
+                    point_id = result.id if hasattr(result, 'id') else ''
+                    original_id = payload.get('original_id', point_id) if isinstance(payload, dict) else point_id
+                    ids.append(original_id)
+                    
+                    # Extract text from payload
+                    text = payload.pop('text', '') if isinstance(payload, dict) else ''
+                    documents.append(text)
+                    
+                    # Remove original_id from metadata (it's not part of the original metadata)
+                    if isinstance(payload, dict):
+                        payload.pop('original_id', None)
+                    
+                    # Metadata is the rest of the payload
+                    metadatas.append(payload)
+                    
+                    # Convert distance to similarity score (1 - distance for cosine)
+                    score = result.score if hasattr(result, 'score') else 0
+                    distance = 1 - score if score <= 1 else score
+                    distances.append(distance)
                 
-                # Metadata is the rest of the payload
-                metadatas.append(payload)
-                
-                # Convert distance to similarity score (1 - distance for cosine)
-                score = result.score if hasattr(result, 'score') else 0
-                distance = 1 - score if score <= 1 else score
-                distances.append(distance)
+                results['documents'].append(documents)
+                results['metadatas'].append(metadatas)
+                results['distances'].append(distances)
+                results['ids'].append(ids)
             
-            return {
-                'documents': [documents],
-                'metadatas': [metadatas],
-                'distances': [distances],
-                'ids': [ids]
-            }
+            return self._fill_texts(results)
         except Exception as e:
             logger.error(f"Error querying Qdrant: {e}")
             return {
-                'documents': [[]],
-                'metadatas': [[]],
-                'distances': [[]],
-                'ids': [[]]
+                'documents': [[] for _ in query_texts],
+                'metadatas': [[] for _ in query_texts],
+                'distances': [[] for _ in query_texts],
+                'ids': [[] for _ in query_texts]
             }
+    
+    def _fill_texts(self, results):
+        """"offsets" layout: slice the text of the hits of every query from their pages (one lookup)."""
+        page_ids = [
+            metadata.get('page_id')
+            for documents, metadatas in zip(results['documents'], results['metadatas'])
+            for text, metadata in zip(documents, metadatas) if not text and metadata.get('page_id')
+        ]
+        if not page_ids:
+            return results
+        page_texts = self._page_texts(page_ids)
+        results['documents'] = [
+            [
+                text or page_texts.get(metadata.get('page_id'), '')[metadata.get('start', 0):metadata.get('end', 0)]
+                for text, metadata in zip(documents, metadatas)
+            ]
+            for documents, metadatas in zip(results['documents'], results['metadatas'])
+        ]
+        return results
 
-
-def chunk_text(text, chunk_size=1000, overlap=200):
-    """Simple text chunking with overlap."""
-    if not text:
-        return []
-    
-    chunks = []
-    start = 0
-    while start < len(text):
-        end = start + chunk_size
-        chunk = text[start:end]
-        chunks.append(chunk)
-        start += (chunk_size - overlap)
-    return chunks
-
-
-def add_documents(pages_data, qdrant_client):
-    """Add a list of page data dicts to Qdrant."""
-    ids = []
-    documents = []
-    metadatas = []
-
-    for page in pages_data:
-        url = page['url']
-        title = page['title']
-        content = page['content']
-        images = page.get('images', [])
-        
-        chunks = chunk_text(content)
-        
-        for i, chunk in enumerate(chunks):
-            if not chunk.strip():
-                continue
-            
-            chunk_id = f"{url}_{i}"
-            ids.append(chunk_id)
-            documents.append(chunk)
-            
-            # Store images as JSON string in metadata
-            images_json = ""
-            if images:
-                images_json = json.dumps(images)
-            
-            metadatas.append({
-                "url": url,
-                "title": title,
-                "chunk_index": i,
-                "images": images_json
-            })
-
-    if documents:
-        # Add to Qdrant in batches
-        batch_size = 100
-        total_batches = len(documents) // batch_size + (1 if len(documents) % batch_size > 0 else 0)
-        
-        for b in range(total_batches):
-            start_idx = b * batch_size
-            end_idx = start_idx + batch_size
-            
-            qdrant_client.add(
-                ids=ids[start_idx:end_idx],
-                documents=documents[start_idx:end_idx],
-                metadatas=metadatas[start_idx:end_idx]
-            )
-            print(f"Added batch {b+1}/{total_batches} to Qdrant")
+def add_documents(pages_data, qdrant_client, full_refresh=False):
+    """
+    Add a list of page data dicts to Qdrant.
     
+    Only new or changed pages are embedded (see ``ingest_manifest``);
+    chunks that disappeared from a page are deleted.
+    """
+    from ingest_pipeline import ingest, open_manifest
+    ingest(pages_data, [(qdrant_client, open_manifest(qdrant_client, full_refresh))], chunk_text)
     print(f"Total documents in Qdrant: {qdrant_client.count()}")
 
 
-def query_knowledge_base(query, n_results=10, qdrant_client=None):
+def query_knowledge_base(query, n_results=10, qdrant_client=None, version=None, language=None):
     """
     Query Qdrant for relevant chunks.
     
     Args:
-        query: Search query string
-        n_results: Number of results to return
+        query: Search query string, or list of query strings searched in one request
+        n_results: Number of results to return (per query)
         qdrant_client: QdrantKnowledgeBase instance
+        version: Only return chunks of this help version
+        language: Only return chunks of this help language
     
     Returns:
-        Dictionary with 'documents', 'metadatas', 'distances', and 'ids'
+        Dictionary with 'documents', 'metadatas', 'distances', and 'ids' (one list per query)
     """
     if not qdrant_client:
         raise ValueError("Qdrant client not provided")
     
     return qdrant_client.query(
-        query_texts=[query],
+        query_texts=[query] if isinstance(query, str) else query,
         n_results=n_results,
-        include=['documents', 'metadatas', 'distances']
+        include=['documents', 'metadatas', 'distances'],
+        version=version,
+        language=language
     )
 
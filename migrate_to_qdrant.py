@@ -1,19 +1,146 @@
 """
 Migration script to move data from ChromaDB local to Qdrant Cloud.
+
+The stored vectors are copied as they are: the Chroma collection is read page by page with
+``get(include=[embeddings, documents, metadatas])`` and each page is upserted to Qdrant by a
+pool of workers, under the original chunk IDs and metadata (nothing is re-chunked or
+re-embedded). The image table the chunks refer to (``<collection>_images``) is copied first,
+the same way. Completed pages are recorded in a checkpoint so an interrupted migration
+resumes where it stopped.
 """
 import os
 import sys
-from knowledge_base import collection as chroma_collection, chunk_text
-from knowledge_base_qdrant import QdrantKnowledgeBase, add_documents
 import json
+import shutil
+import argparse
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+
+import numpy as np
+
+from blue_green import chroma_manifest_path
+from knowledge_base_qdrant import IMAGES_SUFFIX, QdrantKnowledgeBase
+
+CHROMA_DIRECTORY = os.path.join(os.getcwd(), "chroma_db")
+COLLECTION_NAME = "primlogix_docs"
+DEFAULT_PAGE_SIZE = 256
+DEFAULT_WORKERS = 4
+
+
+def open_chroma_collection():
+    """The local Chroma collection (its embedding function is not needed to read stored vectors)."""
+    import chromadb
+    from blue_green import read_chroma_pointer
+    client = chromadb.PersistentClient(path=CHROMA_DIRECTORY)
+    # The collection made live by blue/green reindexing, if any
+    return client.get_collection(name=read_chroma_pointer(CHROMA_DIRECTORY, COLLECTION_NAME), embedding_function=None)
+
+
+def open_chroma_images(chroma_collection):
+    """Image table of a Chroma collection (None for collections ingested before image IDs)."""
+    import chromadb
+    client = chromadb.PersistentClient(path=CHROMA_DIRECTORY)
+    try:
+        # Same "<collection>_images" naming on both backends
+        return client.get_collection(name=f"{chroma_collection.name}{IMAGES_SUFFIX}", embedding_function=None)
+    except Exception:
+        return None
+
+
+class MigrationCheckpoint:
+    """Offsets of the Chroma pages (chunks and images) already upserted to Qdrant, kept in a JSON file."""
+
+    def __init__(self, path, source_count, page_size, image_count=0):
+        self.path = Path(path)
+        self.source_count = source_count
+        self.page_size = page_size
+        self.image_count = image_count
+        self.done = set()
+        self.images_done = set()
+        if self.path.exists():
+            try:
+                with self.path.open('r', encoding='utf-8') as f:
+                    state = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠️  Could not read checkpoint {self.path} ({e}), starting over")
+                return
+            if (state.get('source_count') == source_count and state.get('page_size') == page_size
+                    and state.get('image_count', 0) == image_count):
+                self.done = set(state.get('done', []))
+                self.images_done = set(state.get('images_done', []))
+            else:
+                print("⚠️  ChromaDB changed since the interrupted migration, starting over")
+
+    def mark_done(self, offset, images=False):
+        (self.images_done if images else self.done).add(offset)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        with tmp_path.open('w', encoding='utf-8') as f:
+            json.dump({'source_count': self.source_count, 'page_size': self.page_size, 'done': sorted(self.done),
+                       'image_count': self.image_count, 'images_done': sorted(self.images_done)}, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        self.done = set()
+        self.images_done = set()
+        if self.path.exists():
+            self.path.unlink()
+
+
+def upload_page(qdrant_client, page):
+    """Upsert one page read from Chroma, with its stored vectors. Returns the number of points."""
+    qdrant_client.add(
+        ids=page['ids'],
+        documents=page['documents'],
+        metadatas=page['metadatas'],
+        embeddings=np.asarray(page['embeddings'], dtype=np.float32).tolist()
+    )
+    return len(page['ids'])
+
+
+def upload_image_page(qdrant_client, page):
+    """Upsert one page of the Chroma image table (image dicts stored as JSON documents). Returns the number of images."""
+    qdrant_client.add_images({image_id: json.loads(document) for image_id, document in zip(page['ids'], page['documents'])})
+    return len(page['ids'])
+
+
+def copy_manifest(qdrant_client, chroma_collection):
+    """
+    Give Qdrant the ingestion manifest (and boilerplate state) of the Chroma collection.
+
+    Chunk IDs and metadata were copied unchanged, so the next ``ingest.py`` run on Qdrant only
+    embeds pages that changed since the Chroma ingestion.
+    """
+    source = Path(chroma_manifest_path(CHROMA_DIRECTORY, chroma_collection.name, COLLECTION_NAME))
+    if not source.exists():
+        return False
+    target = Path(qdrant_client.manifest_path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(source, target)
+    boilerplate = source.with_name(source.stem + "_boilerplate.json")
+    if boilerplate.exists():
+        shutil.copyfile(boilerplate, target.with_name(target.stem + "_boilerplate.json"))
+    return True
 
-def migrate_chromadb_to_qdrant():
+
+def _collect(done, pending, checkpoint):
+    """Record finished uploads (re-raising their errors). Returns the number of points upserted."""
+    count = 0
+    for future in done:
+        offset = pending.pop(future)
+        count += future.result()
+        checkpoint.mark_done(offset)
+        print(f"   {min(len(checkpoint.done) * checkpoint.page_size, checkpoint.source_count):>7}/{checkpoint.source_count} documents")
+    return count
+
+
+def migrate_chromadb_to_qdrant(page_size=DEFAULT_PAGE_SIZE, workers=DEFAULT_WORKERS, restart=False, assume_yes=False):
     """Migrate all documents from ChromaDB to Qdrant Cloud."""
-    
+
     # Check Qdrant credentials
     qdrant_url = os.getenv('QDRANT_URL')
     qdrant_api_key = os.getenv('QDRANT_API_KEY')
-    
+
     if not qdrant_url or not qdrant_api_key:
         print("❌ Error: QDRANT_URL and QDRANT_API_KEY environment variables must be set")
         print("\nTo get your credentials:")
@@ -24,12 +151,13 @@ def migrate_chromadb_to_qdrant():
         print("   export QDRANT_URL='https://xxx.us-east-1-0.aws.cloud.qdrant.io'")
         print("   export QDRANT_API_KEY='your-api-key'")
         sys.exit(1)
-    
+
     # Check if ChromaDB has data
     try:
+        chroma_collection = open_chroma_collection()
         chroma_count = chroma_collection.count()
         print(f"📊 ChromaDB contains {chroma_count} documents")
-        
+
         if chroma_count == 0:
             print("⚠️  ChromaDB is empty. Nothing to migrate.")
             print("   Run 'python ingest.py' first to populate the knowledge base.")
@@ -37,98 +165,79 @@ def migrate_chromadb_to_qdrant():
     except Exception as e:
         print(f"❌ Error accessing ChromaDB: {e}")
         sys.exit(1)
-    
+
     # Initialize Qdrant
     print("\n🔗 Connecting to Qdrant Cloud...")
     try:
-        qdrant_client = QdrantKnowledgeBase(url=qdrant_url, api_key=qdrant_api_key)
+        # Chroma only has the chunks, not the page texts the "offsets" layout needs
+        qdrant_client = QdrantKnowledgeBase(url=qdrant_url, api_key=qdrant_api_key, chunk_layout="text")
         print(f"✅ Connected to Qdrant Cloud")
     except Exception as e:
         print(f"❌ Error connecting to Qdrant: {e}")
         sys.exit(1)
-    
+    if qdrant_client.chunk_layout != "text":
+        print(f"❌ Qdrant collection '{qdrant_client.collection_name}' uses the {qdrant_client.chunk_layout} layout,")
+        print("   which needs the page texts: run 'python ingest.py --rebuild' instead of migrating.")
+        sys.exit(1)
+
+    chroma_images = open_chroma_images(chroma_collection)
+    image_count = chroma_images.count() if chroma_images is not None else 0
+    checkpoint = MigrationCheckpoint(
+        qdrant_client.manifest_path.with_name(f"migration_{qdrant_client.physical_name}.json"),
+        chroma_count, page_size, image_count
+    )
+    if restart:
+        checkpoint.clear()
+
     # Check existing data in Qdrant
     qdrant_count = qdrant_client.count()
-    if qdrant_count > 0:
+    if checkpoint.done or checkpoint.images_done:
+        print(f"\n↩️  Resuming: {len(checkpoint.done)} pages of {page_size} documents already migrated")
+    elif qdrant_count > 0 and not assume_yes:
         response = input(f"\n⚠️  Qdrant already contains {qdrant_count} documents. Overwrite? (y/N): ")
         if response.lower() != 'y':
             print("Migration cancelled.")
             sys.exit(0)
-    
-    # Fetch all documents from ChromaDB
-    print("\n📥 Fetching documents from ChromaDB...")
-    try:
-        # Get all documents (we'll query with a very broad query to get all)
-        # Note: ChromaDB doesn't have a direct "get all" method, so we'll need to query
-        # For now, we'll use a workaround: query with empty string and high n_results
-        results = chroma_collection.query(
-            query_texts=[""],
-            n_results=min(chroma_count, 10000),  # Get up to 10k documents
-            include=['documents', 'metadatas']
-        )
-        
-        docs = results.get('documents', [[]])[0]
-        metadatas = results.get('metadatas', [[]])[0]
-        ids = results.get('ids', [[]])[0]
-        
-        print(f"✅ Retrieved {len(docs)} documents from ChromaDB")
-        
-        if not docs:
-            print("⚠️  No documents found in ChromaDB")
-            sys.exit(0)
-        
-    except Exception as e:
-        print(f"❌ Error fetching from ChromaDB: {e}")
-        sys.exit(1)
-    
-    # Reconstruct pages_data format for add_documents
-    print("\n🔄 Reconstructing page structure...")
-    pages_dict = {}
-    
-    for doc_id, doc_text, metadata in zip(ids, docs, metadatas):
-        url = metadata.get('url', '')
-        if not url:
-            continue
-        
-        if url not in pages_dict:
-            pages_dict[url] = {
-                'url': url,
-                'title': metadata.get('title', 'Untitled'),
-                'content': '',
-                'images': []
-            }
-        
-        # Reconstruct content from chunks
-        chunk_index = metadata.get('chunk_index', 0)
-        pages_dict[url]['content'] += doc_text + "\n\n"
-        
-        # Parse images from metadata
-        images_json = metadata.get('images', '')
-        if images_json:
-            try:
-                images = json.loads(images_json)
-                # Add images if not already present
-                existing_urls = {img.get('url', '') for img in pages_dict[url]['images']}
-                for img in images:
-                    if img.get('url', '') not in existing_urls:
-                        pages_dict[url]['images'].append(img)
-            except json.JSONDecodeError:
-                pass
-    
-    pages_data = list(pages_dict.values())
-    print(f"✅ Reconstructed {len(pages_data)} pages")
-    
-    # Migrate to Qdrant
-    print("\n📤 Migrating to Qdrant Cloud...")
+
+    # Stream pages from ChromaDB and upsert them in parallel
+    print(f"\n📤 Migrating to Qdrant Cloud ({workers} workers, pages of {page_size})...")
+    offsets = [offset for offset in range(0, chroma_count, page_size) if offset not in checkpoint.done]
+    migrated = 0
     try:
-        add_documents(pages_data, qdrant_client)
-        print(f"\n✅ Migration completed successfully!")
-        print(f"   ChromaDB: {chroma_count} documents")
-        print(f"   Qdrant: {qdrant_client.count()} documents")
+        # Image table first: the chunks refer to its entries by ID
+        for offset in range(0, image_count, page_size):
+            if offset not in checkpoint.images_done:
+                upload_image_page(qdrant_client, chroma_images.get(limit=page_size, offset=offset, include=['documents']))
+                checkpoint.mark_done(offset, images=True)
+        if image_count:
+            print(f"   {image_count} images copied to {qdrant_client.images_collection}")
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = {}
+            for offset in offsets:
+                page = chroma_collection.get(
+                    limit=page_size, offset=offset, include=['embeddings', 'documents', 'metadatas']
+                )
+                pending[executor.submit(upload_page, qdrant_client, page)] = offset
+                # Bound the pages held in memory to the ones being uploaded
+                while len(pending) >= workers:
+                    migrated += _collect(wait(pending, return_when=FIRST_COMPLETED).done, pending, checkpoint)
+            while pending:
+                migrated += _collect(wait(pending, return_when=FIRST_COMPLETED).done, pending, checkpoint)
     except Exception as e:
         print(f"\n❌ Error during migration: {e}")
+        print("   Run the script again to resume from the last completed page.")
         sys.exit(1)
-    
+
+    checkpoint.clear()
+    qdrant_client.bump_index_version()  # Apps caching query results drop them
+    print(f"\n✅ Migration completed successfully!")
+    print(f"   ChromaDB: {chroma_count} documents")
+    print(f"   Qdrant: {qdrant_client.count()} documents ({migrated} upserted in this run)")
+    if image_count:
+        print(f"   Images: {image_count}")
+    if copy_manifest(qdrant_client, chroma_collection):
+        print("   Ingestion manifest copied: the next ingestion only embeds new or changed pages")
+
     print("\n🎉 Migration complete!")
     print("\nTo use Qdrant Cloud, set these environment variables:")
     print("  export USE_QDRANT=true")
@@ -136,6 +245,12 @@ def migrate_chromadb_to_qdrant():
     print("  export QDRANT_API_KEY='your-key'")
     print("\nOr add them to your .env file or Streamlit secrets.")
 
-if __name__ == "__main__":
-    migrate_chromadb_to_qdrant()
 
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Copy the ChromaDB knowledge base (vectors included) to Qdrant Cloud.")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE, help="Documents read from ChromaDB per page")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Parallel Qdrant upserts")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint of an interrupted migration")
+    parser.add_argument("--yes", action="store_true", help="Do not ask before writing to a non-empty Qdrant collection")
+    args = parser.parse_args()
+    migrate_chromadb_to_qdrant(args.page_size, args.workers, args.restart, args.yes)
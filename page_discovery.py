@@ -0,0 +1,215 @@
+"""
+Up-front page discovery for the PrimLogix help site.
+Builds the URL set from the sitemap and the help system's table of contents / index files,
+so the crawler can schedule every page concurrently instead of waiting on link-depth
+ordering. Unlinked pages of the ``dlgNNN.html`` naming scheme are found by crawling the
+numbers missing below the highest page seen (``probe_candidates``).
+"""
+import os
+import re
+import logging
+import xml.etree.ElementTree as ET
+from urllib.parse import urljoin, urlparse
+
+logger = logging.getLogger(__name__)
+
+REQUEST_TIMEOUT = 30  # seconds
+# Candidate table of contents / index files of common help authoring tools
+TOC_CANDIDATES = [
+    "index.html", "index.htm", "toc.html", "toc.htm", "contents.htm", "default.htm",
+    "hmcontent.htm", "hmkwindex.htm", "hmftsearch.htm",  # Help & Manual
+    "whxdata/toc.new.js", "toc.js",  # RoboHelp
+]
+SITEMAP_CANDIDATES = ["sitemap.xml"]
+# Highest dlgNNN.html page probed (SCRAPER_DLG_PROBE_MAX=0 disables probing)
+DLG_PROBE_MAX = int(os.getenv('SCRAPER_DLG_PROBE_MAX', '999'))
+# Numbers probed past the highest dlgNNN page seen
+DLG_PROBE_MARGIN = int(os.getenv('SCRAPER_DLG_PROBE_MARGIN', '20'))
+DLG_PAGE_PATTERN = "dlg{}.html"
+_DLG_NUMBER_RE = re.compile(r"^dlg(\d+)\.html$")
+
+# Page references inside HTML attributes or JavaScript strings of TOC/index files
+_PAGE_REF_RE = re.compile(r"""["']([^"'<>\s]+?\.html?)(?:#[^"'<>\s]*)?["']""", re.IGNORECASE)
+
+# Help sections live under /<language>/<version>/, e.g. /prim/fr/5-8/
+_HELP_SECTION_RE = re.compile(r"/([a-z]{2})/(\d+(?:[-.]\d+)*)/")
+
+ROUTE_SITEMAP = "sitemap"
+ROUTE_TOC = "toc"
+ROUTE_PROBE = "probe"
+
+
+def parse_help_section(url):
+    """
+    Language and product version of a help URL.
+
+    Returns:
+        ``(language, version)``, e.g. ``('fr', '5-8')``; empty strings if the URL does not follow
+        the ``/<language>/<version>/`` layout
+    """
+    match = _HELP_SECTION_RE.search(urlparse(url).path)
+    return (match.group(1), match.group(2)) if match else ("", "")
+
+
+class DiscoveryResult:
+    """URLs found by the discovery stage, with the routes that found each of them."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.routes = {}  # url -> set of route names
+
+    def add(self, url, route):
+        url = url.split('#')[0]
+        if url.startswith(self.base_url):
+            self.routes.setdefault(url, set()).add(route)
+
+    @property
+    def urls(self):
+        return sorted(self.routes)
+
+    def count(self, route):
+        return sum(1 for routes in self.routes.values() if route in routes)
+
+    def report(self, linked_urls, expected_urls=(), reachable_urls=None):
+        """
+        Compare the discovered URLs with the URLs found by following links.
+
+        Args:
+            linked_urls: URLs found in links of crawled pages
+            expected_urls: URLs that should exist (e.g. known pages, probe hits, previously ingested pages)
+            reachable_urls: Optional set of URLs that were fetched successfully; discovered or linked
+                URLs outside of it (stale sitemap entries, dead links) are ignored
+
+        Returns:
+            Dict with the sorted URL lists ``discovery_only``, ``links_only`` and ``neither``
+            (expected URLs of this section that were not found, or found but could not be fetched)
+        """
+        discovered = set(self.routes)
+        linked = {url for url in linked_urls if url.startswith(self.base_url)}
+        if reachable_urls is not None:
+            discovered &= reachable_urls
+            linked &= reachable_urls
+        expected_urls = {url for url in expected_urls if url.startswith(self.base_url)}
+        return {
+            'discovery_only': sorted(discovered - linked),
+            'links_only': sorted(linked - discovered),
+            'neither': sorted(expected_urls - discovered - linked),
+        }
+
+
+def _get(session, url, rate_limiter=None):
+    """GET a URL, returning the response or None on any error / non-200 answer."""
+    if rate_limiter:
+        rate_limiter.acquire(url)
+    try:
+        response = session.get(url, timeout=REQUEST_TIMEOUT)
+    except Exception as e:
+        logger.debug(f"Discovery request failed for {url}: {e}")
+        return None
+    return response if response.status_code == 200 else None
+
+
+def _sitemap_urls(session, base_url, on_document=None, rate_limiter=None):
+    """Page URLs listed by the sitemaps (robots.txt ``Sitemap:`` lines and sitemap.xml candidates)."""
+    origin = f"{urlparse(base_url).scheme}://{urlparse(base_url).netloc}/"
+    sitemaps = [urljoin(base_url, name) for name in SITEMAP_CANDIDATES] + [urljoin(origin, "sitemap.xml")]
+    robots = _get(session, urljoin(origin, "robots.txt"), rate_limiter)
+    if robots is not None:
+        for line in robots.text.splitlines():
+            if line.lower().startswith('sitemap:'):
+                sitemaps.append(line.split(':', 1)[1].strip())
+
+    urls = []
+    seen = set()
+    while sitemaps:
+        sitemap_url = sitemaps.pop(0)
+        if sitemap_url in seen:
+            continue
+        seen.add(sitemap_url)
+        response = _get(session, sitemap_url, rate_limiter)
+        if response is None:
+            continue
+        try:
+            root = ET.fromstring(response.content)
+        except ET.ParseError:
+            continue
+        if on_document:
+            on_document(sitemap_url, response)
+        for loc in root.iter():
+            if not loc.tag.endswith('loc') or not loc.text:
+                continue
+            # <sitemapindex> entries point to further sitemaps
+            if root.tag.endswith('sitemapindex'):
+                sitemaps.append(loc.text.strip())
+            else:
+                urls.append(loc.text.strip())
+    return urls
+
+
+def _toc_urls(session, base_url, on_document=None, rate_limiter=None):
+    """Page URLs referenced by the table of contents / index files of the help system."""
+    urls = []
+    for name in TOC_CANDIDATES:
+        toc_url = urljoin(base_url, name)
+        response = _get(session, toc_url, rate_limiter)
+        if response is None:
+            continue
+        if on_document:
+            on_document(toc_url, response)
+        urls.extend(urljoin(toc_url, ref) for ref in _PAGE_REF_RE.findall(response.text))
+    return urls
+
+
+def probe_candidates(base_url, known_urls, probe_max=DLG_PROBE_MAX, margin=DLG_PROBE_MARGIN):
+    """
+    ``dlgNNN.html`` URLs worth probing: the numbers missing below the highest known page, plus ``margin`` above it.
+
+    The candidates are meant to be crawled like any other page (a 404 answer only means there
+    is no such page), so there is no separate existence check.
+
+    Args:
+        base_url: Root of the help section
+        known_urls: URLs already found (discovery stage, links of crawled pages)
+        probe_max: Highest ``dlgNNN`` number probed (0 disables the probe)
+        margin: Numbers probed past the highest known page
+
+    Returns:
+        Sorted list of URLs not in ``known_urls``
+    """
+    if probe_max <= 0:
+        return []
+    numbers = [0]
+    for url in known_urls:
+        if url.startswith(base_url):
+            match = _DLG_NUMBER_RE.match(url[len(base_url):])
+            if match:
+                numbers.append(int(match.group(1)))
+    known = set(known_urls)
+    candidates = (urljoin(base_url, DLG_PAGE_PATTERN.format(n)) for n in range(1, min(probe_max, max(numbers) + margin) + 1))
+    return [url for url in candidates if url not in known]
+
+
+def discover_pages(base_url, session, on_document=None, rate_limiter=None):
+    """
+    Build the page URL set of the help section from its sitemap and table of contents, without following links.
+
+    Args:
+        base_url: Root of the help section
+        session: ``requests.Session`` used for the discovery requests
+        on_document: Optional callback ``(url, response)`` for every sitemap/TOC file fetched
+        rate_limiter: Optional ``rate_limit.HostRateLimiter`` shared with the crawler
+
+    Returns:
+        DiscoveryResult
+    """
+    result = DiscoveryResult(base_url)
+    for url in _sitemap_urls(session, base_url, on_document, rate_limiter):
+        result.add(url, ROUTE_SITEMAP)
+    for url in _toc_urls(session, base_url, on_document, rate_limiter):
+        result.add(url, ROUTE_TOC)
+
+    logger.info(
+        f"Discovered {len(result.routes)} pages up front "
+        f"(sitemap: {result.count(ROUTE_SITEMAP)}, table of contents/index: {result.count(ROUTE_TOC)})"
+    )
+    return result
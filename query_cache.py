@@ -0,0 +1,121 @@
+"""
+In-memory cache of knowledge base query results.
+The same support questions (and therefore the same query expansions) come back all day:
+their results are kept in an LRU with a time-to-live, keyed by the normalized query text,
+the number of results, the backend and the version/language filters. Ingestion bumps an
+index version stamp stored with the index; when the stamp read by the app changes, every
+cached result is dropped.
+"""
+import os
+import copy
+import time
+import threading
+import logging
+from collections import OrderedDict
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+QUERY_CACHE_SIZE = int(os.getenv('QUERY_CACHE_SIZE', '512'))  # 0 disables the cache
+QUERY_CACHE_TTL = float(os.getenv('QUERY_CACHE_TTL', '3600'))  # Seconds
+# Seconds between two reads of the index version stamp (a request to Qdrant Cloud)
+QUERY_CACHE_VERSION_CHECK = float(os.getenv('QUERY_CACHE_VERSION_CHECK', '30'))
+
+
+def normalize_query(query: str) -> str:
+    """Query text as the embedding model sees it: whitespace collapsed, lowercased for uncased tokenizers."""
+    from chunker import get_tokenizer
+    text = " ".join(query.split())
+    tokenizer = get_tokenizer()
+    if tokenizer is not None and getattr(tokenizer, 'do_lower_case', False):
+        text = text.lower()
+    return text
+
+
+class QueryCache:
+    """LRU + TTL cache of per-query results, invalidated by an index version stamp."""
+
+    def __init__(self, max_entries=QUERY_CACHE_SIZE, ttl=QUERY_CACHE_TTL, version_check=QUERY_CACHE_VERSION_CHECK):
+        """
+        Args:
+            max_entries: Results kept; least recently used ones are evicted beyond it
+            ttl: Seconds a result stays valid
+            version_check: Seconds between two calls of the index version function
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version_check = version_check
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()  # key -> (stored at, result)
+        self._version = None
+        self._version_checked = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def check_version(self, read_version):
+        """
+        Drop every entry if the index version changed since the last check.
+
+        Args:
+            read_version: Function returning the current index version stamp (called at
+                most every ``version_check`` seconds)
+        """
+        now = time.monotonic()
+        if self._version_checked is not None and now - self._version_checked < self.version_check:
+            return
+        try:
+            version = read_version()
+        except Exception as e:
+            logger.warning(f"Could not read the index version, keeping cached query results: {e}")
+            return
+        with self._lock:
+            if self._version_checked is not None and version != self._version:
+                logger.info(f"Index version changed ({self._version} -> {version}), clearing {len(self._entries)} cached queries")
+                self._entries.clear()
+                self.invalidations += 1
+            self._version = version
+            self._version_checked = now
+
+    def get(self, key) -> Optional[Dict]:
+        """Cached result for ``key`` (a copy), or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return copy.deepcopy(entry[1])
+
+    def put(self, key, result: Dict):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), copy.deepcopy(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Forget every result (e.g. after an ingestion in this process)."""
+        with self._lock:
+            self._entries.clear()
+            self._version_checked = None
+
+    def stats(self) -> Dict:
+        """Hit/miss counters of this process and the number of cached results."""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'invalidations': self.invalidations,
+        }
@@ -0,0 +1,153 @@
+"""
+Throttling primitives for the crawler.
+A per-host token bucket caps the request rate, exponential backoff with jitter spaces out
+retries of throttled/failed requests, and an AIMD controller adapts the number of concurrent
+fetches to the latency the server shows.
+"""
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+
+class TokenBucket:
+    """
+    Token bucket: ``rate`` tokens per second, at most ``burst`` stored.
+
+    ``pause()`` (called when the server throttles us) also halves the rate, which then
+    recovers linearly back to ``max_rate`` over ``RECOVERY_SECONDS``.
+    """
+
+    RECOVERY_SECONDS = 60.0
+    MIN_RATE = 0.5
+
+    def __init__(self, rate, burst=None):
+        self.max_rate = float(rate)
+        self.rate = self.max_rate
+        self.burst = float(burst if burst is not None else max(1.0, rate))
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        """Take a token if possible; otherwise return how long to wait before trying again."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self.paused_until:
+                return self.paused_until - now
+            elapsed = now - self.updated
+            self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+            self.rate = min(self.max_rate, self.rate + elapsed * self.max_rate / self.RECOVERY_SECONDS)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        """Block until a token is available."""
+        while True:
+            wait = self._reserve()
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Stop handing out tokens for ``seconds`` and halve the rate (e.g. after a 429 with Retry-After)."""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0.0
+            self.rate = max(self.MIN_RATE, self.rate / 2)
+
+
+class HostRateLimiter:
+    """One token bucket per host (a rate <= 0 disables the limit)."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(self.rate, self.burst)
+            return self._buckets[host]
+
+    def acquire(self, url):
+        """Block until a request to the host of ``url`` is allowed."""
+        if self.rate > 0:
+            self.bucket(url).acquire()
+
+    def pause(self, url, seconds):
+        """Hold back every request to the host of ``url`` for ``seconds``."""
+        if self.rate > 0:
+            self.bucket(url).pause(seconds)
+
+
+def backoff_delay(attempt, base=0.5, cap=30.0):
+    """Exponential backoff with full jitter for retry number ``attempt`` (0-based)."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def retry_after_seconds(response, default=None):
+    """Parse a numeric ``Retry-After`` header (HTTP dates are ignored)."""
+    value = response.headers.get('Retry-After') if response is not None else None
+    if value and value.strip().isdigit():
+        return float(value.strip())
+    return default
+
+
+class AdaptiveConcurrency:
+    """
+    Additive-increase / multiplicative-decrease concurrency limit driven by latency.
+
+    The limit grows by one after a full window of healthy responses and is cut by a quarter
+    when the smoothed latency exceeds ``latency_factor`` times the best latency seen, or
+    when the server throttles us (429/503).
+    """
+
+    def __init__(self, maximum, minimum=1, initial=None, latency_factor=2.0, min_latency_increase=0.05):
+        self.maximum = max(1, maximum)
+        self.minimum = max(1, min(minimum, self.maximum))
+        self.limit = initial if initial is not None else max(self.minimum, self.maximum // 2)
+        self.latency_factor = latency_factor
+        # Ignore slowdowns smaller than this (seconds), e.g. on a very fast local server
+        self.min_latency_increase = min_latency_increase
+        self.latency = None  # Smoothed (EWMA) latency
+        self.baseline = None  # Best smoothed latency seen
+        self.decreases = 0
+        self._healthy = 0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def _decrease(self, now):
+        # Responses already in flight reflect the old limit: cut at most once per latency period
+        if now - self._last_decrease < max(self.latency or 0.0, 0.5):
+            return
+        self.limit = max(self.minimum, (self.limit * 3) // 4)
+        self.decreases += 1
+        self._healthy = 0
+        self._last_decrease = now
+
+    def record(self, latency, throttled=False):
+        """Feed the latency (seconds) of a finished request."""
+        with self._lock:
+            now = time.monotonic()
+            if throttled:
+                self._decrease(now)
+                return
+            self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+            # The baseline slowly relaxes so one unusually fast response does not pin it forever
+            self.baseline = self.latency if self.baseline is None else min(self.latency, self.baseline * 1.01)
+            if (self.latency > self.baseline * self.latency_factor
+                    and self.latency - self.baseline > self.min_latency_increase):
+                self._decrease(now)
+                return
+            self._healthy += 1
+            if self._healthy >= self.limit and self.limit < self.maximum:
+                self.limit += 1
+                self._healthy = 0
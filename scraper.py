@@ -1,18 +1,60 @@
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup, FeatureNotFound
+import os
+import re
+import gzip
+import json
 import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
 from urllib.parse import urljoin, urlparse
 import logging
 import html2text
+from http_cache import HttpCache
+from page_discovery import ROUTE_PROBE, discover_pages, parse_help_section, probe_candidates
+from rate_limit import AdaptiveConcurrency, HostRateLimiter, backoff_delay, retry_after_seconds
+from image_classifier import is_screenshot, parse_dimension
+from image_probe import ImageMetadataCache, ImageProber
+from snapshot import append_snapshot, iter_snapshot
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-BASE_URL = "https://aide.primlogix.com/prim/fr/5-8/"
-visited_urls = set()
-pages_content = []
+# Root of the help section to crawl (override with SCRAPER_BASE_URL, e.g. to crawl an offline mirror)
+BASE_URL = os.getenv('SCRAPER_BASE_URL', "https://aide.primlogix.com/prim/fr/5-8/")
+# Help sections (product versions / languages) crawled together, comma-separated
+# (e.g. ".../prim/fr/5-8/,.../prim/fr/5-9/"); pages are tagged with the version and language of their root
+BASE_URLS = [url.strip() for url in os.getenv('SCRAPER_BASE_URLS', BASE_URL).split(',') if url.strip()]
+
+# Number of pages fetched concurrently by the crawler
+DEFAULT_MAX_WORKERS = int(os.getenv('SCRAPER_MAX_WORKERS', '8'))
+REQUEST_TIMEOUT = 30  # seconds
+# Politeness: requests per second allowed per host (token bucket, 0 = unlimited)
+# and retries of throttled/failed requests
+RATE_LIMIT = float(os.getenv('SCRAPER_RATE_LIMIT', '20'))
+MAX_RETRIES = int(os.getenv('SCRAPER_MAX_RETRIES', '4'))
+# Responses worth retrying with exponential backoff (throttling and server errors)
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+# Conditional-GET response cache (set SCRAPER_HTTP_CACHE=false to disable)
+USE_HTTP_CACHE = os.getenv('SCRAPER_HTTP_CACHE', 'true').lower() == 'true'
+# Crawl state is checkpointed here so an interrupted crawl can be resumed
+CHECKPOINT_PATH = Path(os.getenv('SCRAPER_CHECKPOINT', Path.home() / ".primbot" / "crawl_checkpoint.json.gz"))
+CHECKPOINT_EVERY_PAGES = 25
+CHECKPOINT_EVERY_SECONDS = 30
+# Read the real size of images without width/height attributes (range request + Pillow, cached)
+PROBE_IMAGES = os.getenv('SCRAPER_PROBE_IMAGES', 'true').lower() == 'true'
+# Build the page list up front (sitemap, table of contents, dlgNNN probe) instead of only following links
+USE_DISCOVERY = os.getenv('SCRAPER_DISCOVERY', 'true').lower() == 'true'
+# Tags collected by the single-pass extraction
+_FIRST_TAGS = ('main', 'article', 'body', 'title')
+_CONTEXT_TAGS = frozenset(['div', 'section', 'article', 'figure', 'p'])
 
 _MOJIBAKE_MARKERS = ["Ã", "Â", "�", "â€™", "â€œ", "â€", "â€“", "â€”"]
+# Matches iff _mojibake_score(text) > 0 (every multi-char marker starts with "â€")
+_MOJIBAKE_RE = re.compile("[ÃÂ�]|â€")
 
 def _mojibake_score(text):
     return sum(text.count(marker) for marker in _MOJIBAKE_MARKERS)
@@ -21,7 +63,7 @@ def fix_mojibake(text):
     """Best-effort fix for UTF-8 decoded as latin1/cp1252 (common mojibake)."""
     if not text or not isinstance(text, str):
         return text
-    if _mojibake_score(text) == 0:
+    if not _MOJIBAKE_RE.search(text):
         return text
     try:
         fixed = text.encode('latin1', errors='ignore').decode('utf-8', errors='ignore')
@@ -31,381 +73,680 @@ def fix_mojibake(text):
         return fixed
     return text
 
-def is_valid_url(url):
+def is_valid_url(url, base_url=BASE_URL):
     """Check if URL is valid and belongs to the target section."""
     parsed = urlparse(url)
-    return url.startswith(BASE_URL) and "aide.primlogix.com" in parsed.netloc
+    return url.startswith(base_url) and parsed.netloc == urlparse(base_url).netloc
 
-def scrape_page(url):
-    """Scrape a single page and extract text."""
-    if url in visited_urls:
-        return
-    visited_urls.add(url)
-    
-    logger.info(f"Scraping: {url}")
+def create_session(pool_size=DEFAULT_MAX_WORKERS):
+    """Create an HTTP session whose connection pool matches the crawler concurrency."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+def _html_parser(name):
+    """Return the BeautifulSoup parser to use, falling back to the built-in one if ``name`` is unavailable."""
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        # Ensure proper encoding
-        response.encoding = response.apparent_encoding or response.encoding or 'utf-8'
-        soup = BeautifulSoup(response.text, 'html.parser')
+        BeautifulSoup("", name)
+        return name
+    except FeatureNotFound:
+        logger.warning(f"HTML parser '{name}' is not available (pip install lxml), using 'html.parser'")
+        return 'html.parser'
+
+# BeautifulSoup parser: SCRAPER_HTML_PARSER=lxml parses several times faster (requires lxml)
+HTML_PARSER = _html_parser(os.getenv('SCRAPER_HTML_PARSER', 'html.parser'))
+
+def _scan(soup):
+    """
+    Collect everything the extraction needs in a single traversal of the document.
+    
+    Returns:
+        Tuple ``(first, images, anchors)``: the first ``main``/``article``/``body``/``title``
+        tags, the ``<img>`` tags with a source and the ``<a>`` tags with an href, in document order.
+    """
+    first = dict.fromkeys(_FIRST_TAGS)
+    images = []
+    anchors = []
+    for element in soup.descendants:
+        name = element.name
+        if name is None:
+            continue  # Text, comments, doctype
+        if name == 'img':
+            if element.get('src') is not None:
+                images.append(element)
+        elif name == 'a':
+            if element.get('href') is not None:
+                anchors.append(element)
+        elif name in first and first[name] is None:
+            first[name] = element
+    return first, images, anchors
+
+def _image_context(img, context_cache):
+    """Return ``(context_text, figure_caption)`` for an image from a single walk up its ancestors."""
+    parent = None
+    figure = None
+    for ancestor in img.parents:
+        if parent is None and ancestor.name in _CONTEXT_TAGS:
+            parent = ancestor
+        if ancestor.name == 'figure':
+            figure = ancestor
+            break
+    
+    context_text = ""
+    if parent is not None:
+        # Images sharing a block share its text: compute it once per block
+        key = id(parent)
+        if key not in context_cache:
+            # Get text before and after the image
+            parent_text = parent.get_text(separator=' ', strip=True)
+            # Limit context to 200 chars
+            context_cache[key] = fix_mojibake(parent_text[:200] if parent_text else "")
+        context_text = context_cache[key]
+    
+    # Get figure caption if exists
+    figure_caption = ""
+    if figure is not None:
+        figcaption = figure.find('figcaption')
+        if figcaption:
+            figure_caption = fix_mojibake(figcaption.get_text(strip=True))
+    return context_text, figure_caption
+
+def _image_positions(markdown, img_tags):
+    """
+    Offset of each image's ``![alt](src)`` reference in the page markdown, by ``id()`` of its tag.
+    
+    html2text emits the images in document order, so each one is searched after the previous
+    match. Images outside the converted content element are left out.
+    """
+    positions = {}
+    cursor = 0
+    for img in img_tags:
+        found = markdown.find(f"]({img.get('src')}", cursor)
+        if found == -1:
+            continue
+        positions[id(img)] = max(markdown.rfind("![", cursor, found), cursor)
+        cursor = found + 1
+    return positions
+
+def extract_page(url, html, parser=None, image_prober=None):
+    """
+    Extract markdown content, screenshots and outgoing links from a page.
+    
+    The document is parsed once and walked once (see ``_scan``) to collect the content
+    element, title, images and links. Each image records the ``position`` of its reference
+    in the markdown (None when it is not part of the content) so that ingestion attaches it
+    only to the chunks around it.
+    
+    Args:
+        url: Page URL (base for relative links and images)
+        html: Page HTML
+        parser: BeautifulSoup parser (default: ``HTML_PARSER``, e.g. 'lxml' for faster parsing)
+        image_prober: Optional ``image_probe.ImageProber`` reading the real size of images whose
+            tag has no width/height attributes
+    
+    Returns:
+        Tuple ``(page, links)`` where ``page`` is the page dict (None if no content was found)
+        and ``links`` the list of absolute URLs found on the page.
+    """
+    soup = BeautifulSoup(html, parser or HTML_PARSER)
+    first, img_tags, anchors = _scan(soup)
+    
+    # Extract main content - adjusting selector based on common documentation structures
+    # If strict selector fails, fallback to body
+    content_div = first['main'] or first['article'] or first['body']
+    
+    if not content_div:
+        logger.warning(f"No content found for {url}")
+        return None, []
+    
+    # Convert HTML to Markdown for better readability for the LLM
+    # (HTML2Text keeps parser state between calls, so a fresh converter is used per page)
+    h = html2text.HTML2Text()
+    h.ignore_links = False
+    h.unicode_snob = True  # Preserve Unicode characters
+    text_content = h.handle(str(content_div))
+    # Ensure UTF-8 encoding
+    if isinstance(text_content, bytes):
+        text_content = text_content.decode('utf-8', errors='ignore')
+    text_content = fix_mojibake(text_content)
+    
+    # Extract image URLs from the page with enhanced context
+    candidates = []
+    page_host = urlparse(url).netloc
+    for img in img_tags:
+        img_src = img.get('src', '')
+        if not img_src:
+            continue
         
-        # Extract main content - adjusting selector based on common documentation structures
-        # If strict selector fails, fallback to body
-        content_div = soup.find('main') or soup.find('article') or soup.find('body')
+        # Resolve relative URLs to absolute
+        img_url = urljoin(url, img_src)
         
-        if content_div:
-            # Convert HTML to Markdown for better readability for the LLM
-            h = html2text.HTML2Text()
-            h.ignore_links = False
-            h.unicode_snob = True  # Preserve Unicode characters
-            text_content = h.handle(str(content_div))
-            # Ensure UTF-8 encoding
-            if isinstance(text_content, bytes):
-                text_content = text_content.decode('utf-8', errors='ignore')
-            text_content = fix_mojibake(text_content)
-            
-            # Extract image URLs from the page with enhanced context
-            images = []
-            for img in soup.find_all('img', src=True):
-                img_src = img.get('src', '')
-                if not img_src:
-                    continue
-                
-                # Resolve relative URLs to absolute
+        # Clean URL - remove fragments and query params that might cause issues
+        img_url = img_url.split('#')[0]
+        
+        # Only include images from the same domain or relative paths
+        if ('aide.primlogix.com' in img_url or urlparse(img_url).netloc == page_host
+                or img_src.startswith('/') or img_src.startswith('./')):
+            # Ensure absolute URL - always convert to full URL
+            if not img_url.startswith('http'):
+                # If still relative, use the page URL as base
                 img_url = urljoin(url, img_src)
-                
-                # Clean URL - remove fragments and query params that might cause issues
-                img_url = img_url.split('#')[0]
-                
-                # Only include images from the same domain or relative paths
-                if 'aide.primlogix.com' in img_url or img_src.startswith('/') or img_src.startswith('./'):
-                    # Ensure absolute URL - always convert to full URL
-                    if not img_url.startswith('http'):
-                        # If still relative, use the page URL as base
-                        img_url = urljoin(url, img_src)
-                        if not img_url.startswith('http'):
-                            # Final fallback to BASE_URL
-                            img_url = urljoin(BASE_URL, img_src)
-                    
-                    # Final check - ensure it's absolute
-                    if not img_url.startswith('http'):
-                        continue  # Skip if we can't make it absolute
-                    
-                    # Extract context around the image for better understanding
-                    # Get parent element and nearby text
-                    parent = img.find_parent(['div', 'section', 'article', 'figure', 'p'])
-                    context_text = ""
-                    if parent:
-                        # Get text before and after the image
-                        parent_text = parent.get_text(separator=' ', strip=True)
-                        # Limit context to 200 chars
-                        context_text = parent_text[:200] if parent_text else ""
-                    context_text = fix_mojibake(context_text)
-                    
-                    # Get figure caption if exists
-                    figure_caption = ""
-                    figure = img.find_parent('figure')
-                    if figure:
-                        figcaption = figure.find('figcaption')
-                        if figcaption:
-                            figure_caption = figcaption.get_text(strip=True)
-                    figure_caption = fix_mojibake(figure_caption)
-                    
-                    # FILTER OUT ICONS AND SMALL LOGOS - Only keep real screenshots
-                    # Check image dimensions from HTML attributes
-                    img_width = img.get('width', '')
-                    img_height = img.get('height', '')
-                    
-                    # Convert to integers if they're numeric strings
-                    width_val = None
-                    height_val = None
-                    try:
-                        if img_width and str(img_width).isdigit():
-                            width_val = int(img_width)
-                        if img_height and str(img_height).isdigit():
-                            height_val = int(img_height)
-                    except (ValueError, AttributeError):
-                        pass
-                    
-                    # Filter criteria: exclude small icons/logos and square icon formats
-                    # Icons are typically < 100px in either dimension
-                    # Also exclude square formats like 63x63, 64x64, etc. (common icon sizes)
-                    is_small_icon = False
-                    is_square_icon = False
-                    
-                    if width_val and width_val < 100:
-                        is_small_icon = True
-                    if height_val and height_val < 100:
-                        is_small_icon = True
-                    
-                    # Exclude square icon formats (63x63, 64x64, 48x48, 32x32, etc.)
-                    # Icons are often perfect squares and small
-                    if width_val and height_val:
-                        # Check if it's a square (width == height) and small (common icon sizes)
-                        if width_val == height_val:
-                            # Common icon square sizes to exclude
-                            common_icon_sizes = [16, 20, 24, 32, 40, 48, 50, 56, 60, 63, 64, 72, 80, 96, 100, 128]
-                            if width_val in common_icon_sizes:
-                                is_square_icon = True
-                            # Also exclude any square smaller than 150px (likely an icon)
-                            elif width_val < 150:
-                                is_square_icon = True
-                    
-                    # Filter by filename - exclude common icon/logo/arrow/emoji patterns
-                    img_filename = img_url.lower()
-                    icon_patterns = [
-                        'icon', 'logo', 'button', 'arrow', 'chevron', 'fleche', 'flèche',
-                        'nav', 'menu', 'bullet', 'dot', 'star', 'check', 'emoji',
-                        'close', 'delete', 'edit', 'add', 'remove', 'plus', 'minus',
-                        '40x40', '32x32', '24x24', '16x16', '20x20', '30x30', '48x48',
-                        '50x50', '56x56', '60x60', '63x63', '64x64', '72x72', '80x80',
-                        '96x96', '100x100', '128x128',
-                        'favicon', 'sprite', 'glyph', 'svg', 'ico',
-                        'up', 'down', 'left', 'right', 'next', 'prev', 'previous',
-                        'haut', 'bas', 'gauche', 'droite', 'suivant', 'precedent',
-                        # Specific icon types
-                        'lightbulb', 'ampoule', 'bulb', 'lamp', 'lampe',
-                        'placeholder', 'place-holder', 'generic', 'generique',
-                        # Person/people icons
-                        'person', 'people', 'user', 'utilisateur', 'profil', 'profile',
-                        'head', 'shoulder', 'silhouette', 'avatar', 'tête', 'épaules',
-                        # Checkmark/verification icons
-                        'checkmark', 'check', 'verification', 'vérification', 'tick', 'coche',
-                        'check-icon', 'icone-check', 'icone-verification',
-                        # Remuneration/payment icons
-                        'remuneration', 'rémunération', 'payment', 'paiement', 'money', 'argent',
-                        'cash', 'hand-money', 'main-argent', 'salary', 'salaire',
-                        # Feedback icons (thumbs up/down)
-                        'thumbs', 'thumbs-up', 'thumbs-down', 'thumbsup', 'thumbsdown',
-                        'thumb-up', 'thumb-down', 'like', 'dislike', 'feedback',
-                        'pouce', 'pouce-haut', 'pouce-bas',
-                        # Document/folder icons (NOT screenshots)
-                        'document', 'doc', 'file', 'folder', 'dossier', 'cv', 'resume',
-                        'pdf-icon', 'word-icon', 'excel-icon', 'file-icon', 'folder-icon',
-                        'document-icon', 'icone-document', 'icone-dossier', 'icone-fichier',
-                        # Warning/stop sign icons
-                        'stop', 'stop-sign', 'stop-signal', 'arret', 'arrêt', 'warning',
-                        'avertissement', 'alert', 'alerte', 'danger', 'attention',
-                        'octagon', 'octogone', 'stop-icon', 'icone-arret', 'icone-stop'
-                    ]
-                    
-                    # Check if filename suggests it's an icon/logo/arrow/emoji
-                    is_icon_filename = any(pattern in img_filename for pattern in icon_patterns)
-                    
-                    # Filter by alt/title text - exclude generic icon/arrow/emoji descriptions
-                    alt_text = img.get('alt', '') or img.get('title', '') or ''
-                    title_text = img.get('title', '')
-                    alt_text = fix_mojibake(alt_text)
-                    title_text = fix_mojibake(title_text)
-                    combined_text = (alt_text + ' ' + title_text).lower()
-                    icon_text_patterns = [
-                        'icon', 'logo', 'button', 'arrow', 'chevron', 'fleche', 'flèche',
-                        'nav', 'menu', 'emoji', 'icone', 'icône', 'bouton',
-                        'haut', 'bas', 'gauche', 'droite', 'suivant', 'precedent',
-                        'cercle', 'circle', 'round', 'rond', 'symbole', 'symbol',
-                        # Specific icon types
-                        'lightbulb', 'ampoule', 'bulb', 'lamp', 'lampe', 'ampoule',
-                        'placeholder', 'place-holder', 'generic', 'generique',
-                        'plus sign', 'signe plus', 'add icon', 'icone ajout',
-                        'magnifying glass', 'loupe', 'search icon', 'icone recherche',
-                        'thumbs up', 'thumbs down', 'pouce', 'camera icon', 'icone camera',
-                        'speech bubble', 'bulle de dialogue', 'double arrow', 'resize',
-                        # Person/people icons
-                        'person icon', 'icone personne', 'icone utilisateur', 'icone profil',
-                        'silhouette', 'avatar', 'tête', 'épaules', 'head icon', 'shoulder icon',
-                        # Checkmark/verification icons
-                        'checkmark', 'check icon', 'icone check', 'icone vérification',
-                        'tick', 'coche', 'verification icon', 'icone verification',
-                        # Remuneration/payment icons
-                        'remuneration', 'rémunération', 'payment icon', 'icone paiement',
-                        'money icon', 'icone argent', 'hand money', 'main argent',
-                        'salary icon', 'icone salaire',
-                        # Feedback icons (thumbs up/down) - STRICT FILTERING
-                        'thumbs up', 'thumbs down', 'thumbs-up', 'thumbs-down',
-                        'thumbsup', 'thumbsdown', 'thumb up', 'thumb down',
-                        'like button', 'dislike button', 'feedback button',
-                        'pouce', 'pouce-haut', 'pouce-bas', 'pouce vers le haut', 'pouce vers le bas',
-                        'like icon', 'dislike icon', 'feedback icon', 'icone feedback',
-                        'icone pouce', 'icone like', 'icone dislike',
-                        # Document/folder icons (NOT screenshots) - STRICT FILTERING
-                        'document icon', 'folder icon', 'file icon', 'dossier icon',
-                        'cv icon', 'resume icon', 'document with', 'folder with',
-                        'document cv', 'icone document', 'icone dossier', 'icone fichier',
-                        'icone cv', 'document avec loupe', 'dossier avec loupe',
-                        'document with magnifying', 'folder with magnifying',
-                        # Warning/stop sign icons - STRICT FILTERING
-                        'stop sign', 'stop signal', 'panneau arret', 'panneau arrêt',
-                        'panneau stop', 'stop icon', 'icone stop', 'icone arret', 'icone arrêt',
-                        'warning sign', 'panneau avertissement', 'warning icon', 'icone warning',
-                        'icone avertissement', 'alert sign', 'panneau alerte', 'alert icon',
-                        'icone alerte', 'danger sign', 'panneau danger', 'danger icon',
-                        'icone danger', 'attention sign', 'panneau attention', 'attention icon',
-                        'icone attention', 'octagon', 'octogone', 'red stop', 'arret rouge',
-                        'arrêt rouge', 'hand stop', 'main stop', 'stop hand'
-                    ]
-                    is_icon_text = any(pattern in combined_text for pattern in icon_text_patterns)
-                    
-                    # Detect simple icon patterns (circle with symbol, lightbulb, plus sign, etc.)
-                    # These are often described as "cercle vert", "green circle", "ampoule", etc.
-                    simple_icon_patterns = [
-                        'cercle', 'circle', 'rond', 'round',
-                        'symbole', 'symbol', 'signe', 'sign',
-                        'icone', 'icon', 'bouton', 'button',
-                        'lightbulb', 'ampoule', 'bulb', 'lamp', 'lampe',
-                        'plus sign', 'signe plus', 'add icon', 'icone ajout',
-                        'placeholder', 'place-holder', 'generic', 'generique',
-                        # Person/people icons
-                        'person', 'people', 'user', 'utilisateur', 'profil', 'profile',
-                        'head', 'shoulder', 'silhouette', 'avatar', 'tête', 'épaules',
-                        # Checkmark/verification icons
-                        'checkmark', 'check', 'verification', 'vérification', 'tick', 'coche',
-                        # Remuneration/payment icons
-                        'remuneration', 'rémunération', 'payment', 'paiement', 'money', 'argent',
-                        'cash', 'hand', 'main', 'salary', 'salaire'
-                    ]
-                    # If the description is very short and contains icon patterns, it's likely an icon
-                    is_simple_icon = False
-                    if len(combined_text) < 80:  # Short description (increased from 50 to 80)
-                        if any(pattern in combined_text for pattern in simple_icon_patterns):
-                            # Check if it's NOT explicitly a screenshot
-                            if not any(x in combined_text for x in ['screenshot', 'capture', 'interface', 'fenetre', 'ecran', 'affichage', 'window', 'dialog', 'application', 'logiciel']):
-                                is_simple_icon = True
-                    
-                    # Additional check: Exclude images that are too square (icons are often square or near-square)
-                    # Real screenshots have a width/height ratio significantly different from 1.0
-                    is_near_square = False
-                    if width_val and height_val and width_val > 0 and height_val > 0:
-                        ratio = max(width_val, height_val) / min(width_val, height_val)
-                        # If ratio is close to 1.0 (square or near-square) and image is not very large, likely an icon
-                        if 0.9 <= ratio <= 1.1:  # Within 10% of square
-                            if width_val < 300:  # And not very large
-                                is_near_square = True
-                    
-                    # STRICT FILTERING: Skip if it's clearly an icon/logo/arrow/emoji
-                    # Only allow if it's explicitly a screenshot/interface image
-                    if is_small_icon or is_square_icon or is_simple_icon or is_near_square:
-                        # Small images, square icons, simple icons, or near-square images are almost always icons, unless explicitly marked as screenshot
-                        if not any(x in img_filename or x in combined_text for x in ['screenshot', 'capture', 'interface', 'fenetre', 'ecran', 'affichage', 'window', 'dialog', 'application', 'logiciel']):
-                            continue
-                    
-                    if is_icon_filename:
-                        # Filename suggests icon/arrow - only allow if explicitly a screenshot
-                        if not any(x in img_filename for x in ['screenshot', 'capture', 'interface', 'fenetre', 'ecran', 'affichage', 'window', 'dialog', 'images/']):
-                            continue
-                    
-                    if is_icon_text:
-                        # Alt/title suggests icon/arrow - only allow if explicitly a screenshot
-                        if not any(x in combined_text for x in ['screenshot', 'capture', 'interface', 'fenetre', 'ecran', 'affichage', 'window', 'dialog']):
-                            continue
-                    
-                    # STRICT REQUIREMENT: Only include images that are EXPLICITLY screenshots:
-                    # - Must be in /images/ directory (where screenshots are typically stored)
-                    # - AND must NOT be square/near-square (screenshots are rectangular)
-                    # - AND must have explicit screenshot keywords in filename/description
-                    # - OR have screenshot keywords in context/caption
-                    is_likely_screenshot = False
-                    
-                    # Priority 1: Images in /images/ directory (most reliable indicator)
-                    # BUT exclude if they're square/near-square (likely icons even in /images/)
-                    if '/images/' in img_url.lower() and not is_icon_filename:
-                        # Additional check: exclude square/near-square images even from /images/
-                        if width_val and height_val and width_val > 0 and height_val > 0:
-                            ratio = max(width_val, height_val) / min(width_val, height_val)
-                            # Only accept if it's NOT square/near-square (ratio > 1.2 means significantly rectangular)
-                            if ratio > 1.2 or width_val >= 400:  # Rectangular OR very large (likely a real screenshot)
-                                is_likely_screenshot = True
-                        else:
-                            # No dimensions available, trust /images/ directory
-                            is_likely_screenshot = True
-                    
-                    # Priority 2: Explicit screenshot keywords in filename
-                    screenshot_filename_keywords = ['screenshot', 'capture', 'interface', 'fenetre', 'ecran', 'affichage', 'window', 'dialog', 'ecran']
-                    if any(keyword in img_filename for keyword in screenshot_filename_keywords):
-                        is_likely_screenshot = True
-                    
-                    # Priority 3: Screenshot keywords in alt/title
-                    if any(keyword in combined_text for keyword in screenshot_filename_keywords):
-                        is_likely_screenshot = True
-                    
-                    # Priority 4: Screenshot keywords in context
-                    if context_text and any(keyword in context_text.lower() for keyword in ['capture', 'screenshot', 'interface', 'fenetre', 'ecran', 'affichage', 'window', 'dialog']):
-                        is_likely_screenshot = True
-                    
-                    # Priority 5: Screenshot keywords in figure caption
-                    if figure_caption and any(keyword in figure_caption.lower() for keyword in ['capture', 'screenshot', 'interface', 'fenetre', 'ecran', 'affichage', 'window', 'dialog']):
-                        is_likely_screenshot = True
-                    
-                    # STRICT: Skip if it doesn't look like a screenshot
-                    if not is_likely_screenshot:
-                        continue
-                    
-                    # Additional check: Exclude SVG files (almost always icons/vectors)
-                    if img_url.lower().endswith('.svg'):
-                        continue
-                    
-                    # Build enhanced description
-                    description_parts = []
-                    if alt_text:
-                        description_parts.append(alt_text)
-                    if title_text and title_text != alt_text:
-                        description_parts.append(title_text)
-                    if figure_caption:
-                        description_parts.append(f"Légende: {figure_caption}")
-                    if context_text:
-                        # Add context as description
-                        description_parts.append(f"Contexte: {context_text}")
-                    
-                    enhanced_description = " | ".join(description_parts) if description_parts else 'Capture d\'écran de l\'interface PrimLogix'
-                    
-                    # Only include real image files (exclude SVG which are often icons)
-                    # Only PNG, JPG, JPEG, WEBP - exclude GIF (often animated icons/emojis)
-                    if any(img_url.lower().endswith(ext) for ext in ['.png', '.jpg', '.jpeg', '.webp']):
-                        images.append({
-                            "url": img_url,
-                            "alt": alt_text or 'Screenshot',
-                            "title": title_text or '',
-                            "description": enhanced_description,  # Enhanced description with context
-                            "context": context_text,  # Context around the image
-                            "caption": figure_caption,  # Figure caption if available
-                            "width": width_val,  # Store dimensions for later filtering
-                            "height": height_val,
-                            "source_url": url  # Store the page URL where this image was found
-                        })
+                if not img_url.startswith('http'):
+                    # Final fallback to BASE_URL
+                    img_url = urljoin(BASE_URL, img_src)
             
-            title = soup.title.string if soup.title else url
-            # Ensure title is properly encoded
-            if isinstance(title, bytes):
-                title = title.decode('utf-8', errors='ignore')
-            elif title:
-                title = str(title).encode('utf-8', errors='ignore').decode('utf-8')
-            title = fix_mojibake(title)
+            # Final check - ensure it's absolute
+            if not img_url.startswith('http'):
+                continue  # Skip if we can't make it absolute
             
-            pages_content.append({
-                "url": url,
-                "title": title,
-                "content": text_content,
-                "images": images  # Store images for this page
-            })
-            
-            # Find all links
-            for link in soup.find_all('a', href=True):
-                full_url = urljoin(url, link['href'])
-                # Remove fragment
-                full_url = full_url.split('#')[0]
-                
-                if is_valid_url(full_url) and full_url not in visited_urls:
-                    scrape_page(full_url)
-        else:
-            logger.warning(f"No content found for {url}")
-
-    except Exception as e:
-        logger.error(f"Failed to scrape {url}: {e}")
-
-def run_scraper():
-    """Main function to run the scraper."""
-    # Start from base URL
-    scrape_page(BASE_URL)
+            # Check image dimensions from HTML attributes
+            candidates.append((img, img_url, parse_dimension(img.get('width', '')), parse_dimension(img.get('height', ''))))
+    
+    # Real dimensions of the images whose tag does not give them (header-only probe, cached)
+    probed = {}
+    if image_prober is not None:
+        probed = image_prober.probe_many(
+            img_url for _, img_url, width_val, height_val in candidates if width_val is None or height_val is None
+        )
+    
+    positions = _image_positions(text_content, img_tags)
+    images = []
+    context_cache = {}
+    for img, img_url, width_val, height_val in candidates:
+        info = probed.get(img_url)
+        if info:
+            width_val = width_val if width_val is not None else info.width
+            height_val = height_val if height_val is not None else info.height
+        
+        # Extract context around the image for better understanding
+        context_text, figure_caption = _image_context(img, context_cache)
+        
+        # FILTER OUT ICONS AND SMALL LOGOS - Only keep real screenshots
+        alt_text = img.get('alt', '') or img.get('title', '') or ''
+        title_text = img.get('title', '')
+        alt_text = fix_mojibake(alt_text)
+        title_text = fix_mojibake(title_text)
+        
+        # Rectangular PNG/JPG/WEBP interface captures only (no icons, logos, arrows, emojis)
+        if not is_screenshot(img_url, alt_text, title_text, context_text, figure_caption, width_val, height_val):
+            continue
+        
+        # Build enhanced description
+        description_parts = []
+        if alt_text:
+            description_parts.append(alt_text)
+        if title_text and title_text != alt_text:
+            description_parts.append(title_text)
+        if figure_caption:
+            description_parts.append(f"Légende: {figure_caption}")
+        if context_text:
+            # Add context as description
+            description_parts.append(f"Contexte: {context_text}")
+        
+        enhanced_description = " | ".join(description_parts) if description_parts else 'Capture d\'écran de l\'interface PrimLogix'
+        
+        images.append({
+            "url": img_url,
+            "alt": alt_text or 'Screenshot',
+            "title": title_text or '',
+            "description": enhanced_description,  # Enhanced description with context
+            "context": context_text,  # Context around the image
+            "caption": figure_caption,  # Figure caption if available
+            "width": width_val,  # Store dimensions for later filtering
+            "height": height_val,
+            "format": info.format if info else None,  # Known when the image header was probed
+            "source_url": url,  # Store the page URL where this image was found
+            "position": positions.get(id(img))  # Offset of the image in the page content
+        })
+    
+    title_tag = first['title']
+    title = title_tag.string if title_tag else url
+    # Ensure title is properly encoded
+    if isinstance(title, bytes):
+        title = title.decode('utf-8', errors='ignore')
+    elif title:
+        title = str(title).encode('utf-8', errors='ignore').decode('utf-8')
+    title = fix_mojibake(title)
+
+    page = {
+        "url": url,
+        "title": title,
+        "content": text_content,
+        "images": images  # Store images for this page
+    }
+    
+    # Find all links
+    links = []
+    for link in anchors:
+        full_url = urljoin(url, link['href'])
+        # Remove fragment
+        full_url = full_url.split('#')[0]
+        links.append(full_url)
+    
+    return page, links
+
+class Crawler:
+    """
+    Concurrent crawler for the PrimLogix help site.
+
+    Pages are pulled from a work queue (the frontier) and fetched by a pool of worker
+    threads sharing a pooled HTTP session. Each run starts from a fresh state, so the
+    crawler can be re-run safely in the same process (e.g. a Streamlit session).
+
+    With ``keep_pages=False`` extracted pages are only yielded by ``iter_crawl`` and not
+    retained, so a streaming consumer keeps memory flat. The consumer then calls
+    ``acknowledge`` once pages are safely stored; unacknowledged pages are put back in
+    the frontier of the checkpoint so a resumed crawl fetches them again.
+    """
+
+    def __init__(self, base_url=BASE_URL, max_workers=DEFAULT_MAX_WORKERS, session=None,
+                 cache=None, force_refresh=False, checkpoint_path=None, keep_pages=True,
+                 rate_limit=RATE_LIMIT, max_retries=MAX_RETRIES, base_urls=None, probe_images=False,
+                 image_cache=None):
+        """
+        Args:
+            base_url: Root of the help section to crawl (only URLs below it are followed)
+            max_workers: Maximum number of pages fetched concurrently (the actual concurrency
+                adapts to the server latency between 1 and this value)
+            session: Optional ``requests.Session`` to reuse (a pooled one is created otherwise)
+            cache: Optional ``HttpCache`` used for conditional requests
+            force_refresh: Ignore cached validators and download every page again
+            checkpoint_path: Where to periodically persist the crawl state (None disables checkpoints)
+            keep_pages: Retain extracted pages in ``pages_content`` (disable when streaming)
+            rate_limit: Maximum requests per second per host (0 = unlimited)
+            max_retries: Retries (with exponential backoff) of a request answered 429/5xx or that failed
+            base_urls: Several help section roots (e.g. one per product version) crawled in a single run,
+                replacing ``base_url``
+            probe_images: Probe the header of images whose tag has no width/height attributes
+            image_cache: Optional ``ImageMetadataCache`` so images are only probed once across crawls
+        """
+        self.base_urls = list(base_urls) if base_urls else [base_url]
+        self.base_url = self.base_urls[0]
+        # root -> (language, version) the pages below it are tagged with
+        self.sections = {root: parse_help_section(root) for root in self.base_urls}
+        self.max_workers = max(1, max_workers)
+        self.session = session or create_session(self.max_workers)
+        self.rate_limiter = HostRateLimiter(rate_limit)
+        self.concurrency = AdaptiveConcurrency(self.max_workers)
+        self.max_retries = max_retries
+        self.cache = cache
+        self.force_refresh = force_refresh
+        self.checkpoint_path = Path(checkpoint_path) if checkpoint_path else None
+        self.keep_pages = keep_pages
+        # Pages already appended to the checkpoint's pages file, and that file's size
+        self._pages_saved = 0
+        self._pages_bytes = 0
+        self.image_prober = ImageProber(
+            request=self._probe_request, cache=image_cache, max_workers=self.max_workers, revalidate=force_refresh
+        ) if probe_images else None
+        self.frontier = deque()
+        self.visited_urls = set()
+        self.linked_urls = set()  # URLs found by following links (compared with the discovery stage)
+        self.failed_urls = {}  # url -> error of the pages that could not be fetched
+        self.probe_urls = set()  # Guessed dlgNNN URLs: a 404 only means there is no such page
+        self.probe_misses = set()
+        self.pages_content = []
+        self.pages_extracted = 0  # Pages extracted by this run (excludes pages restored from a checkpoint)
+        self.resumed = False  # Pages restored from a checkpoint are not yielded again
+        self.elapsed = 0.0
+        # Streaming mode: pages yielded but not yet acknowledged by the consumer
+        self.unacknowledged = set()
+        self._ack_lock = threading.Lock()
+        # Fetch statistics, updated from worker threads
+        self.stats = {'downloaded': 0, 'not_modified': 0, 'bytes_downloaded': 0, 'retries': 0, 'throttled': 0}
+        self._stats_lock = threading.Lock()
+
+    @property
+    def pages_per_second(self):
+        """Crawl throughput of the current run."""
+        return self.pages_extracted / self.elapsed if self.elapsed > 0 else 0.0
+
+    def enqueue(self, url):
+        """Add a URL to the frontier unless it was already scheduled."""
+        if url in self.visited_urls:
+            return
+        self.visited_urls.add(url)
+        self.frontier.append(url)
+
+    def root_of(self, url):
+        """Help section root a URL belongs to (None if it is outside every root)."""
+        roots = [root for root in self.base_urls if is_valid_url(url, root)]
+        return max(roots, key=len) if roots else None
+
+    @property
+    def complete(self):
+        """
+        True if every page the crawl reached was yielded by this run: not resumed from a checkpoint
+        and no page failed, except with a 404 (a dead link, or a page removed from the site).
+        """
+        return not self.resumed and all(failure['status'] == 404 for failure in self.failed_urls.values())
+
+    def acknowledge(self, urls):
+        """Mark streamed pages as safely consumed so checkpoints no longer need to refetch them."""
+        with self._ack_lock:
+            self.unacknowledged.difference_update(urls)
+
+    def _count(self, **increments):
+        with self._stats_lock:
+            for key, value in increments.items():
+                self.stats[key] += value
+
+    def request(self, url, method='GET', headers=None, stream=False):
+        """
+        Send a rate-limited request, retrying 429/5xx answers and network errors with backoff.
+
+        Returns the final response (the caller checks its status); raises the last network
+        error if every attempt failed. With ``stream=True`` the body is read (and the
+        response closed) by the caller.
+        """
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire(url)
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, headers=headers, timeout=REQUEST_TIMEOUT, stream=stream)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.concurrency.record(time.perf_counter() - started, throttled=True)
+                if attempt == self.max_retries:
+                    raise
+                delay = backoff_delay(attempt)
+                logger.warning(f"{e.__class__.__name__} for {url}, retrying in {delay:.1f}s")
+            else:
+                throttled = response.status_code in RETRY_STATUSES
+                self.concurrency.record(time.perf_counter() - started, throttled=throttled)
+                if not throttled or attempt == self.max_retries:
+                    return response
+                delay = backoff_delay(attempt)
+                if response.status_code in (429, 503):
+                    self._count(throttled=1)
+                    # Honour Retry-After and hold back every worker hitting this host
+                    delay = retry_after_seconds(response, delay)
+                    self.rate_limiter.pause(url, delay)
+                logger.warning(f"HTTP {response.status_code} for {url}, retrying in {delay:.1f}s")
+                # A streamed response holds its pooled connection until closed
+                response.close()
+            self._count(retries=1)
+            time.sleep(delay)
+
+    def fetch(self, url):
+        """
+        Download a page and return its decoded HTML.
+
+        When a cache is configured, a conditional request is sent and a 304 Not Modified
+        answer is served from the cached body.
+        """
+        cached = None
+        if self.cache is not None and not self.force_refresh:
+            cached = self.cache.get(url)
+
+        response = self.request(url, headers=HttpCache.conditional_headers(cached))
+        if response.status_code == 304 and cached:
+            self.cache.touch(url)
+            self._count(not_modified=1)
+            return cached['content'].decode(cached['encoding'] or 'utf-8', errors='replace')
+
+        response.raise_for_status()
+        # Ensure proper encoding
+        response.encoding = response.apparent_encoding or response.encoding or 'utf-8'
+        self._count(downloaded=1, bytes_downloaded=len(response.content))
+
+        if self.cache is not None:
+            self.cache.store(
+                url,
+                response.content,
+                encoding=response.encoding,
+                etag=response.headers.get('ETag'),
+                last_modified=response.headers.get('Last-Modified')
+            )
+        return response.text
+
+    def _probe_request(self, url, headers):
+        """Image header probes share the rate limit, retries and adaptive concurrency of page fetches."""
+        return self.request(url, headers=headers, stream=True)
+
+    def retryable_failures(self):
+        """URLs of the pages that failed with a transient error (network error, 429 or 5xx)."""
+        return [url for url, failure in self.failed_urls.items()
+                if failure['status'] is None or failure['status'] in RETRY_STATUSES]
+
+    def retry_failed(self):
+        """Crawl the pages that failed with a transient error once more, yielding the recovered pages."""
+        urls = self.retryable_failures()
+        for url in urls:
+            del self.failed_urls[url]
+            self.visited_urls.discard(url)
+        if urls:
+            logger.info(f"Retrying {len(urls)} pages that failed with a transient error")
+            yield from self.iter_crawl(urls)
+
+    @property
+    def pages_path(self):
+        """Gzip JSON lines file next to the checkpoint holding the extracted pages (snapshot format)."""
+        return self.checkpoint_path.with_name(self.checkpoint_path.name.split('.')[0] + "_pages.jsonl.gz")
+
+    def save_checkpoint(self, pending_urls=()):
+        """
+        Persist the frontier and visited set (gzip-compressed JSON).
+
+        Extracted pages are not rewritten: the ones added since the last checkpoint are
+        appended to ``pages_path``, whose size is recorded in the checkpoint, so saving
+        costs the same at the end of a large crawl as at its start.
+
+        Args:
+            pending_urls: URLs currently being fetched; they are put back at the head of the frontier
+        """
+        if not self.checkpoint_path:
+            return
+        with self._ack_lock:
+            # Pages that failed transiently are fetched again by a resumed crawl
+            pending_urls = list(pending_urls) + sorted(self.unacknowledged) + self.retryable_failures()
+        self.checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        if self.keep_pages:
+            # Appending also drops pages written after the previous checkpoint by a crashed run
+            self._pages_bytes = append_snapshot(self.pages_content[self._pages_saved:], self.pages_path, size=self._pages_bytes)
+            self._pages_saved = len(self.pages_content)
+        state = {
+            "base_urls": self.base_urls,
+            "frontier": pending_urls + list(self.frontier),
+            "visited": sorted(self.visited_urls),
+            "pages_saved": self._pages_saved,
+            "pages_bytes": self._pages_bytes
+        }
+        tmp_path = self.checkpoint_path.with_name(self.checkpoint_path.name + ".tmp")
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False)
+        # Atomic replace so a crash while writing never corrupts the previous checkpoint
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def load_checkpoint(self):
+        """Restore the crawl state from the checkpoint file. Returns True if a checkpoint was loaded."""
+        if not self.checkpoint_path or not self.checkpoint_path.exists():
+            return False
+        try:
+            with gzip.open(self.checkpoint_path, "rt", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable crawl checkpoint {self.checkpoint_path}: {e}")
+            return False
+        roots = state.get("base_urls") or [state.get("base_url")]
+        if roots != self.base_urls:
+            logger.warning(f"Ignoring crawl checkpoint for other site sections: {', '.join(map(str, roots))}")
+            return False
+
+        pages = state.get("pages", [])  # Checkpoints written before the pages file existed
+        pages_bytes = state.get("pages_bytes", 0)
+        if self.keep_pages and pages_bytes:
+            try:
+                if self.pages_path.stat().st_size < pages_bytes:
+                    raise OSError("pages file is shorter than recorded")
+                # Pages appended after this checkpoint are fetched again: drop them
+                append_snapshot([], self.pages_path, size=pages_bytes)
+                pages = list(iter_snapshot(self.pages_path))
+            except (OSError, EOFError) as e:
+                logger.warning(f"Ignoring crawl checkpoint with unreadable pages file {self.pages_path}: {e}")
+                return False
+            self._pages_bytes = pages_bytes
+            self._pages_saved = len(pages)
+
+        self.frontier = deque(state.get("frontier", []))
+        self.visited_urls = set(state.get("visited", []))
+        self.pages_content = pages if self.keep_pages else []
+        self.resumed = True
+        logger.info(
+            f"Resuming crawl from checkpoint: {len(self.visited_urls) - len(self.frontier)} pages already done, "
+            f"{len(self.frontier)} URLs left in the frontier."
+        )
+        return True
+
+    def clear_checkpoint(self):
+        """Delete the checkpoint (and its pages file) once the crawl completed."""
+        if not self.checkpoint_path:
+            return
+        self.checkpoint_path.unlink(missing_ok=True)
+        self.pages_path.unlink(missing_ok=True)
+        self._pages_saved = self._pages_bytes = 0
+
+    def discover(self):
+        """
+        Enumerate the pages of every help section up front (see ``page_discovery``).
+
+        Returns:
+            List with one ``DiscoveryResult`` per root
+        """
+        return [discover_pages(root, self.session, on_document=self._on_discovery_document,
+                               rate_limiter=self.rate_limiter)
+                for root in self.base_urls]
+
+    def _on_discovery_document(self, url, response):
+        """Hook called for every sitemap/table of contents file fetched by ``discover``."""
+
+    def _scrape(self, url):
+        """Fetch and extract a single page (runs in a worker thread)."""
+        logger.info(f"Scraping: {url}")
+        return extract_page(url, self.fetch(url), image_prober=self.image_prober)
+
+    def iter_crawl(self, start_urls):
+        """
+        Crawl from the given URLs until the frontier is exhausted, yielding pages as they are extracted.
+
+        The frontier and visited set are only touched from the consuming thread;
+        worker threads only fetch and parse.
+        """
+        for url in start_urls:
+            self.enqueue(url)
+
+        started = time.perf_counter()
+        last_checkpoint = started
+        pages_at_checkpoint = self.pages_extracted
+        in_flight = {}
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                while self.frontier or in_flight:
+                    # Keep every worker busy without materializing the whole frontier as futures
+                    while self.frontier and len(in_flight) < self.concurrency.limit:
+                        url = self.frontier.popleft()
+                        in_flight[executor.submit(self._scrape, url)] = url
+
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    extracted = []
+                    for future in done:
+                        url = in_flight.pop(future)
+                        try:
+                            page, links = future.result()
+                        except Exception as e:
+                            status = getattr(getattr(e, 'response', None), 'status_code', None)
+                            if status == 404 and url in self.probe_urls:
+                                self.probe_misses.add(url)
+                                continue
+                            logger.error(f"Failed to scrape {url}: {e}")
+                            self.failed_urls[url] = {'error': str(e), 'status': status}
+                            continue
+
+                        for link in links:
+                            if self.root_of(link):
+                                self.linked_urls.add(link)
+                                self.enqueue(link)
+                        if page:
+                            page['language'], page['version'] = self.sections[self.root_of(url) or self.base_url]
+                            self.pages_extracted += 1
+                            if self.keep_pages:
+                                self.pages_content.append(page)
+                            else:
+                                with self._ack_lock:
+                                    self.unacknowledged.add(url)
+                            extracted.append(page)
+
+                    now = time.perf_counter()
+                    if (self.pages_extracted - pages_at_checkpoint >= CHECKPOINT_EVERY_PAGES
+                            or now - last_checkpoint >= CHECKPOINT_EVERY_SECONDS):
+                        self.save_checkpoint(in_flight.values())
+                        last_checkpoint = now
+                        pages_at_checkpoint = self.pages_extracted
+
+                    # Yield after the frontier was extended so workers stay busy while the consumer runs
+                    yield from extracted
+        finally:
+            self.elapsed += time.perf_counter() - started
+
+    def crawl(self, start_urls):
+        """Crawl from the given URLs until the frontier is exhausted and return the extracted pages."""
+        for _ in self.iter_crawl(start_urls):
+            pass
+        return self.pages_content
+
+def create_crawler(max_workers=DEFAULT_MAX_WORKERS, use_cache=USE_HTTP_CACHE, force_refresh=False,
+                   resume=False, checkpoint_path=CHECKPOINT_PATH, keep_pages=True, base_url=None,
+                   rate_limit=RATE_LIMIT, base_urls=None, probe_images=PROBE_IMAGES):
+    """
+    Build a crawler for the PrimLogix help site.
+    
+    Args:
+        max_workers: Number of pages fetched concurrently
+        use_cache: Use the on-disk conditional-GET cache so unchanged pages are not downloaded again
+        force_refresh: Download every page even if a cached copy is still valid
+        resume: Continue from the last checkpoint of an interrupted crawl instead of starting over
+        checkpoint_path: Crawl checkpoint file (None disables checkpointing)
+        keep_pages: Retain extracted pages in memory (disable for streaming ingestion)
+        base_url: Root of the help section to crawl (e.g. an offline mirror served by ``site_mirror``)
+        rate_limit: Maximum requests per second per host (0 = unlimited)
+        base_urls: Several help section roots to crawl together (defaults to ``BASE_URLS``
+            unless ``base_url`` is given)
+        probe_images: Read the real size of images without width/height attributes (cached on disk
+            with ``use_cache``)
+    """
+    if not base_urls:
+        base_urls = [base_url] if base_url else BASE_URLS
+    cache = HttpCache() if use_cache else None
+    crawler = Crawler(base_urls=base_urls, max_workers=max_workers, cache=cache, force_refresh=force_refresh,
+                      checkpoint_path=checkpoint_path, keep_pages=keep_pages, rate_limit=rate_limit,
+                      probe_images=probe_images, image_cache=ImageMetadataCache() if use_cache and probe_images else None)
+    if resume:
+        crawler.load_checkpoint()
+    return crawler
+
+def iter_scraper(crawler=None, discover=USE_DISCOVERY, expected_urls=(), **crawler_options):
+    """
+    Run the scraper as a generator yielding each page as soon as it is extracted.
+    
+    Args:
+        crawler: Crawler to use (built with ``create_crawler(**crawler_options)`` if omitted)
+        discover: Enumerate the pages up front (sitemap, table of contents) so they are all scheduled
+            concurrently, then probe the dlgNNN numbers missing below the highest page seen;
+            links found on the pages are still followed
+        expected_urls: Pages that should exist, e.g. those ingested by a previous run
+            (``knowledge_base.stored_urls()``); with ``discover``, the final report lists the ones
+            that vanished or could not be fetched, along with the known pages and probe hits
+    """
+    if crawler is None:
+        crawler = create_crawler(**crawler_options)
+    
+    # Start from the base URLs (and every page the discovery stage found)
+    discoveries = crawler.discover() if discover else []
+    start_urls = list(crawler.base_urls)
+    for discovery in discoveries:
+        start_urls.extend(discovery.urls)
+    yield from crawler.iter_crawl(start_urls)
     
     # Also try to access known important pages directly
     # Some pages might not be linked from the main page
@@ -414,18 +755,119 @@ def run_scraper():
         "dlg104.html",  # Other common dialogs
     ]
     
-    for page in known_pages:
-        full_url = urljoin(BASE_URL, page)
-        if full_url not in visited_urls:
-            logger.info(f"Trying to access known page: {full_url}")
-            scrape_page(full_url)
+    missing_pages = []
+    for root in crawler.base_urls:
+        for page in known_pages:
+            full_url = urljoin(root, page)
+            if full_url not in crawler.visited_urls:
+                logger.info(f"Trying to access known page: {full_url}")
+                missing_pages.append(full_url)
+    if missing_pages:
+        yield from crawler.iter_crawl(missing_pages)
+    
+    expected_urls = set(expected_urls)
+    expected_urls.update(urljoin(root, page) for root in crawler.base_urls for page in known_pages)
+    if discover:
+        # dlgNNN pages nothing links to: crawl the numbers missing below the highest page seen
+        probes = [url for root in crawler.base_urls for url in probe_candidates(root, crawler.visited_urls)]
+        if probes:
+            logger.info(f"Probing {len(probes)} dlgNNN page numbers not found so far")
+            crawler.probe_urls.update(probes)
+            yield from crawler.iter_crawl(probes)
+            found = [url for url in probes if url not in crawler.probe_misses and url not in crawler.failed_urls]
+            for discovery in discoveries:
+                for url in found:
+                    discovery.add(url, ROUTE_PROBE)
+            expected_urls.update(found)
     
-    logger.info(f"Scraping complete. Found {len(pages_content)} pages.")
-    return pages_content
+    # Second chance for pages lost to timeouts, throttling or server errors
+    yield from crawler.retry_failed()
+    
+    for discovery in discoveries:
+        # Only compare pages that could actually be fetched (dead links are not pages)
+        reachable = crawler.visited_urls.difference(crawler.failed_urls, crawler.probe_misses)
+        report = discovery.report(crawler.linked_urls, expected_urls=expected_urls, reachable_urls=reachable)
+        logger.info(
+            f"Page discovery of {discovery.base_url}: "
+            f"{len(report['discovery_only'])} pages found only by discovery (not linked), "
+            f"{len(report['links_only'])} only by following links, "
+            f"{len(report['neither'])} expected pages (known, probed or previously ingested) not reachable."
+        )
+        for url in report['links_only']:
+            logger.debug(f"Not listed by the discovery stage: {url}")
+        for url in report['neither'][:20]:
+            failure = crawler.failed_urls.get(url)
+            logger.warning(f"Expected page not reachable: {url}" + (f" ({failure['error']})" if failure else ""))
+    
+    logger.info(
+        f"Scraping complete. Extracted {crawler.pages_extracted} pages "
+        f"in {crawler.elapsed:.1f}s ({crawler.pages_per_second:.2f} pages/sec)."
+    )
+    logger.info(
+        f"Downloaded {crawler.stats['downloaded']} pages ({crawler.stats['bytes_downloaded']} bytes), "
+        f"{crawler.stats['not_modified']} unchanged pages served from cache, "
+        f"{crawler.stats['retries']} retries ({crawler.stats['throttled']} throttled), "
+        f"final concurrency {crawler.concurrency.limit}/{crawler.max_workers}."
+    )
+    if crawler.image_prober:
+        probe_stats = crawler.image_prober.stats
+        logger.info(
+            f"Image probe: {probe_stats['probed']} images probed ({probe_stats['bytes_read']} bytes read), "
+            f"{probe_stats['cache_hits']} from cache, {probe_stats['not_modified']} not modified, "
+            f"{probe_stats['failed']} unreadable."
+        )
+    if crawler.failed_urls:
+        # Every failure stays available in crawler.failed_urls
+        logger.warning(f"{len(crawler.failed_urls)} pages could not be fetched (first 20 below):")
+        for url, failure in sorted(crawler.failed_urls.items())[:20]:
+            logger.warning(f"  {url}: {failure['error']}")
+
+def run_scraper(max_workers=DEFAULT_MAX_WORKERS, use_cache=USE_HTTP_CACHE, force_refresh=False,
+                resume=False, checkpoint_path=CHECKPOINT_PATH, base_url=None, crawler=None,
+                discover=USE_DISCOVERY, base_urls=None):
+    """
+    Main function to run the scraper.
+    
+    Args:
+        max_workers: Number of pages fetched concurrently
+        use_cache: Use the on-disk conditional-GET cache so unchanged pages are not downloaded again
+        force_refresh: Download every page even if a cached copy is still valid
+        resume: Continue from the last checkpoint of an interrupted crawl instead of starting over
+        checkpoint_path: Crawl checkpoint file (None disables checkpointing)
+        base_url: Root of the help section to crawl
+        base_urls: Several help section roots to crawl together (defaults to ``BASE_URLS``)
+        crawler: Crawler to use instead of building one from the options above
+            (lets the caller read its statistics afterwards)
+        discover: Enumerate the pages up front instead of relying only on link discovery
+    
+    Returns:
+        List of page dicts (url, title, content, images, language, version)
+    """
+    if crawler is None:
+        crawler = create_crawler(max_workers=max_workers, use_cache=use_cache, force_refresh=force_refresh,
+                                 resume=resume, checkpoint_path=checkpoint_path, base_url=base_url,
+                                 base_urls=base_urls)
+    for _ in iter_scraper(crawler, discover=discover):
+        pass
+    crawler.clear_checkpoint()
+    return crawler.pages_content
 
 if __name__ == "__main__":
-    data = run_scraper()
-    # Save for inspection
-    import json
-    with open("scraped_data.json", "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    import argparse
+    from snapshot import DEFAULT_SNAPSHOT_PATH, SnapshotWriter
+    parser = argparse.ArgumentParser(description="Scrape the PrimLogix online help.")
+    parser.add_argument("--refresh", action="store_true", help="Ignore the HTTP cache and download every page again")
+    parser.add_argument("--resume", action="store_true", help="Resume an interrupted crawl from its checkpoint")
+    parser.add_argument("--output", default=DEFAULT_SNAPSHOT_PATH, help="Snapshot file (gzip JSON lines, one page per line)")
+    args = parser.parse_args()
+    
+    # Save for inspection / re-ingestion with `python ingest.py --from-snapshot`
+    crawler = create_crawler(force_refresh=args.refresh, resume=args.resume)
+    with SnapshotWriter(args.output) as writer:
+        if args.resume:
+            # Pages restored from the checkpoint are not yielded again
+            for page in crawler.pages_content:
+                writer.write(page)
+        for page in iter_scraper(crawler):
+            writer.write(page)
+    crawler.clear_checkpoint()
@@ -29,7 +29,7 @@ setup(
         "Issues": "https://github.com/carlcgb/bot-prim/issues",
     },
     packages=find_packages(),
-    py_modules=["agent", "app", "scraper", "knowledge_base", "ingest"],
+    py_modules=["agent", "app", "scraper", "knowledge_base", "ingest", "http_cache", "storage_local", "knowledge_base_qdrant", "ingest_manifest", "ingest_pipeline", "image_classifier", "page_discovery", "snapshot", "rate_limit", "dedup", "image_probe", "chunker", "embeddings", "embedding_cache", "blue_green", "query_cache"],
     classifiers=[
         "Development Status :: 4 - Beta",
         "Intended Audience :: Developers",
@@ -0,0 +1,273 @@
+"""
+Offline mirror of the PrimLogix help site.
+Records the crawled HTML pages and their images into a directory and serves them
+from a local HTTP server, so the scraper can be tested and benchmarked without
+hitting aide.primlogix.com.
+
+Usage:
+    python site_mirror.py record path/to/mirror
+    python site_mirror.py serve path/to/mirror --port 8765
+    SCRAPER_BASE_URL=http://127.0.0.1:8765/prim/fr/5-8/ python scraper.py
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urljoin, urlparse, unquote
+
+from bs4 import BeautifulSoup
+
+from scraper import BASE_URL, DEFAULT_MAX_WORKERS, HTML_PARSER, Crawler, _scan, extract_page, iter_scraper
+
+logger = logging.getLogger(__name__)
+
+MIRROR_INDEX = "mirror.json"  # base URL and request path -> file/content type map
+INDEX_FILE_NAME = "__index__.html"  # File used for directory URLs ("/prim/fr/5-8/")
+
+
+def _request_key(url):
+    """Key of a URL in the mirror index: its path and query string."""
+    parsed = urlparse(url)
+    return parsed.path + ('?' + parsed.query if parsed.query else '')
+
+
+def _file_name(url):
+    """Relative file path storing a mirrored URL (query strings are hashed into the name)."""
+    parsed = urlparse(url)
+    path = unquote(parsed.path).lstrip('/')
+    if not path or path.endswith('/'):
+        path += INDEX_FILE_NAME
+    if parsed.query:
+        stem, ext = os.path.splitext(path)
+        path = f"{stem}.{hashlib.sha1(parsed.query.encode('utf-8')).hexdigest()[:12]}{ext}"
+    return path
+
+
+class MirrorRecorder(Crawler):
+    """Crawler that also writes every fetched page (and optionally its images) to a mirror directory."""
+
+    def __init__(self, mirror_dir, base_url=BASE_URL, max_workers=DEFAULT_MAX_WORKERS, record_images=True):
+        super().__init__(base_url=base_url, max_workers=max_workers, keep_pages=False)
+        self.mirror_dir = Path(mirror_dir)
+        self.record_images = record_images
+        self.files = {}
+        self.image_urls = set()
+        self.bytes_recorded = 0
+        self._files_lock = threading.Lock()
+
+    def _save(self, url, content, content_type):
+        relative = _file_name(url)
+        path = self.mirror_dir / "site" / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+        with self._files_lock:
+            self.files[_request_key(url)] = {'file': relative, 'content_type': content_type}
+            self.bytes_recorded += len(content)
+
+    def fetch(self, url):
+        """Download a page, store its raw body in the mirror and return its decoded HTML."""
+        response = self.request(url)
+        response.raise_for_status()
+        # Ensure proper encoding
+        response.encoding = response.apparent_encoding or response.encoding or 'utf-8'
+        self._count(downloaded=1, bytes_downloaded=len(response.content))
+        self._save(url, response.content, response.headers.get('Content-Type', 'text/html'))
+        return response.text
+
+    def _on_discovery_document(self, url, response):
+        # Sitemaps and table of contents files let the discovery stage work on the mirror too
+        self._save(url, response.content, response.headers.get('Content-Type', 'text/html'))
+
+    def _scrape(self, url):
+        html = self.fetch(url)
+        if self.record_images:
+            # All same-host images, not only the screenshots kept by extract_page
+            _, img_tags, _ = _scan(BeautifulSoup(html, HTML_PARSER))
+            host = urlparse(url).netloc
+            with self._files_lock:
+                for img in img_tags:
+                    img_url = urljoin(url, img['src']).split('#')[0]
+                    if urlparse(img_url).netloc == host:
+                        self.image_urls.add(img_url)
+        return extract_page(url, html)
+
+    def download_images(self):
+        """Download the images referenced by the recorded pages. Returns the number of images stored."""
+        def download(img_url):
+            try:
+                response = self.request(img_url)
+                response.raise_for_status()
+            except Exception as e:
+                logger.warning(f"Could not record image {img_url}: {e}")
+                return False
+            self._save(img_url, response.content, response.headers.get('Content-Type', 'application/octet-stream'))
+            return True
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return sum(executor.map(download, sorted(self.image_urls)))
+
+    def write_index(self):
+        """Write the mirror index (base URL and file map)."""
+        index = {
+            'base_url': self.base_url,
+            'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'files': self.files
+        }
+        self.mirror_dir.mkdir(parents=True, exist_ok=True)
+        with (self.mirror_dir / MIRROR_INDEX).open('w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False, indent=1)
+
+
+def record_mirror(mirror_dir, base_url=BASE_URL, max_workers=DEFAULT_MAX_WORKERS, record_images=True):
+    """
+    Crawl the help site and record a snapshot of its pages and images.
+
+    Args:
+        mirror_dir: Output directory (``mirror.json`` + ``site/`` tree)
+        base_url: Root of the help section to crawl
+        max_workers: Number of concurrent downloads
+        record_images: Also download the images referenced by the pages
+
+    Returns:
+        Dict with the number of pages, images and bytes recorded
+    """
+    recorder = MirrorRecorder(mirror_dir, base_url=base_url, max_workers=max_workers, record_images=record_images)
+    pages = sum(1 for _ in iter_scraper(recorder))
+    images = recorder.download_images() if record_images else 0
+    recorder.write_index()
+    stats = {'pages': pages, 'images': images, 'files': len(recorder.files), 'bytes': recorder.bytes_recorded}
+    logger.info(f"Mirror recorded in {mirror_dir}: {stats}")
+    return stats
+
+
+def saved_pages(directory):
+    """
+    ``(url, html)`` pairs of the HTML pages saved in a directory (benchmark corpus).
+
+    Args:
+        directory: A recorded mirror (``mirror.json`` + ``site/``, pages keep their recorded URL)
+            or any directory of ``*.html`` / ``*.htm`` files, searched recursively (URLs relative to ``BASE_URL``)
+    """
+    directory = Path(directory)
+    pages = []
+    if (directory / MIRROR_INDEX).exists():
+        with (directory / MIRROR_INDEX).open('r', encoding='utf-8') as f:
+            index = json.load(f)
+        recorded = urlparse(index['base_url'])
+        for key, entry in sorted(index['files'].items()):
+            if entry['content_type'].startswith('text/html'):
+                path = directory / "site" / entry['file']
+                pages.append((f"{recorded.scheme}://{recorded.netloc}{key}",
+                              path.read_text(encoding='utf-8', errors='replace')))
+        return pages
+    for path in sorted(directory.rglob('*.htm*')):
+        url = BASE_URL + path.relative_to(directory).as_posix()
+        pages.append((url, path.read_text(encoding='utf-8', errors='replace')))
+    return pages
+
+
+class MirrorServer(ThreadingHTTPServer):
+    """Local HTTP stand-in serving a recorded mirror (supports conditional GET)."""
+
+    daemon_threads = True
+
+    def __init__(self, mirror_dir, host='127.0.0.1', port=0):
+        self.mirror_dir = Path(mirror_dir)
+        with (self.mirror_dir / MIRROR_INDEX).open('r', encoding='utf-8') as f:
+            index = json.load(f)
+        self.files = index['files']
+        self.recorded_base = urlparse(index['base_url'])
+        super().__init__((host, port), _MirrorHandler)
+        self.origin = f"http://{host}:{self.server_address[1]}"
+        self.bytes_served = 0
+        self.requests_served = 0
+        self._stats_lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        """``BASE_URL`` of the mirrored help section on this server."""
+        return self.origin + self.recorded_base.path
+
+    def start(self):
+        """Serve in a background thread. Returns the server."""
+        threading.Thread(target=self.serve_forever, name="mirror-server", daemon=True).start()
+        return self
+
+
+class _MirrorHandler(BaseHTTPRequestHandler):
+    def do_HEAD(self):
+        self._respond(send_body=False)
+
+    def do_GET(self):
+        self._respond(send_body=True)
+
+    def _respond(self, send_body):
+        server = self.server
+        entry = server.files.get(self.path)
+        if entry is None:
+            self.send_error(404)
+            return
+        path = server.mirror_dir / "site" / entry['file']
+        stat = path.stat()
+        etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        body = path.read_bytes()
+        if entry['content_type'].startswith('text/html'):
+            # Absolute links to the recorded site point back to this server
+            recorded_origin = f"{server.recorded_base.scheme}://{server.recorded_base.netloc}"
+            body = body.replace(recorded_origin.encode('ascii'), server.origin.encode('ascii'))
+        self.send_response(200)
+        self.send_header('Content-Type', entry['content_type'])
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', formatdate(stat.st_mtime, usegmt=True))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+            with server._stats_lock:
+                server.bytes_served += len(body)
+                server.requests_served += 1
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Record or serve an offline mirror of the PrimLogix help site.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    record_parser = subparsers.add_parser("record", help="Crawl the help site and record its pages and images")
+    record_parser.add_argument("mirror_dir")
+    record_parser.add_argument("--base-url", default=BASE_URL, help="Root of the help section to record")
+    record_parser.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS, help="Concurrent downloads")
+    record_parser.add_argument("--no-images", action="store_true", help="Only record HTML pages")
+    serve_parser = subparsers.add_parser("serve", help="Serve a recorded mirror over HTTP")
+    serve_parser.add_argument("mirror_dir")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8765, help="Port (0 picks a free one)")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        print(record_mirror(args.mirror_dir, base_url=args.base_url, max_workers=args.workers,
+                            record_images=not args.no_images))
+    else:
+        server = MirrorServer(args.mirror_dir, host=args.host, port=args.port)
+        # First line is parsed by benchmarks/bench_crawl.py
+        print(f"BASE_URL={server.base_url}", flush=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
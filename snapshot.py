@@ -0,0 +1,136 @@
+"""
+Compact scrape snapshots.
+Pages are stored as gzip-compressed JSON lines (one page per line), so a snapshot
+can be written while scraping and re-ingested page by page in constant memory.
+"""
+import os
+import gzip
+import json
+import logging
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SNAPSHOT_PATH = "scraped_data.jsonl.gz"
+
+
+class SnapshotWriter:
+    """Write pages to a snapshot file; the file only appears once ``close()`` succeeded."""
+
+    def __init__(self, path=DEFAULT_SNAPSHOT_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._tmp_path = self.path.with_name(self.path.name + ".tmp")
+        self._file = gzip.open(self._tmp_path, "wt", encoding="utf-8")
+        self.pages = 0
+
+    def write(self, page):
+        self._file.write(json.dumps(page, ensure_ascii=False, separators=(',', ':')))
+        self._file.write("\n")
+        self.pages += 1
+
+    def close(self):
+        """Finish the snapshot and atomically replace any previous one at ``path``."""
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        os.replace(self._tmp_path, self.path)
+        logger.info(f"Snapshot written to {self.path}: {self.pages} pages")
+
+    def abort(self):
+        """Discard a partially written snapshot (the previous snapshot, if any, is kept)."""
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        self._tmp_path.unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write_snapshot(pages, path=DEFAULT_SNAPSHOT_PATH):
+    """
+    Write an iterable of page dicts to a snapshot.
+
+    Returns:
+        Number of pages written
+    """
+    with SnapshotWriter(path) as writer:
+        for page in pages:
+            writer.write(page)
+    return writer.pages
+
+
+def append_snapshot(pages, path, size=None):
+    """
+    Append pages to a snapshot file as a new gzip member (read back by ``iter_snapshot``).
+
+    Args:
+        pages: Page dicts to append
+        path: Snapshot file (created if missing)
+        size: Truncate the file to this many bytes first, dropping whatever was appended after it
+
+    Returns:
+        Size of the file afterwards, to pass as ``size`` on the next call
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("ab") as raw:
+        if size is not None:
+            raw.truncate(size)
+        if pages:
+            with gzip.GzipFile(fileobj=raw, mode="wb") as f:
+                for page in pages:
+                    f.write(json.dumps(page, ensure_ascii=False, separators=(',', ':')).encode("utf-8"))
+                    f.write(b"\n")
+        return raw.tell()
+
+
+def tee_snapshot(pages, path=DEFAULT_SNAPSHOT_PATH):
+    """
+    Yield pages unchanged while saving them to a snapshot.
+
+    The snapshot is only kept if the iterable is consumed to the end.
+    """
+    writer = SnapshotWriter(path)
+    try:
+        for page in pages:
+            writer.write(page)
+            yield page
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
+
+
+def iter_snapshot(path=DEFAULT_SNAPSHOT_PATH):
+    """
+    Stream the pages of a snapshot one at a time.
+
+    Plain ``.jsonl`` files and the legacy ``scraped_data.json`` list format are also accepted
+    (the latter is loaded in one go).
+    """
+    path = Path(path)
+    if path.suffix == ".json":
+        with path.open("r", encoding="utf-8") as f:
+            yield from json.load(f)
+        return
+
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                logger.warning(f"Skipping unreadable record at {path}:{line_number}: {e}")
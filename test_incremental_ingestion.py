@@ -0,0 +1,109 @@
+"""
+Test de l'ingestion incrémentale : une page retirée du site entre deux ingestions
+est supprimée du store (chunks, images, texte de page) et du manifeste.
+"""
+import tempfile
+from pathlib import Path
+
+from ingest_manifest import IngestManifest
+from ingest_pipeline import remove_missing, stream_ingest
+
+
+class MemoryStore:
+    """Store en mémoire avec l'interface d'écriture de ``ingest_pipeline``."""
+
+    name = "Memory"
+
+    def __init__(self, manifest_path):
+        self.manifest_path = manifest_path
+        self.chunks = {}
+        self.images = {}
+        self.pages = {}
+
+    def count(self):
+        return len(self.chunks)
+
+    def add(self, ids, documents, metadatas, embeddings=None):
+        for chunk_id, document, metadata in zip(ids, documents, metadatas):
+            self.chunks[chunk_id] = (document, metadata)
+
+    def update_metadata(self, ids, metadatas):
+        for chunk_id, metadata in zip(ids, metadatas):
+            self.chunks[chunk_id] = (self.chunks[chunk_id][0], metadata)
+
+    def delete(self, ids):
+        for chunk_id in ids:
+            self.chunks.pop(chunk_id, None)
+
+    def add_images(self, images):
+        self.images.update(images)
+
+    def delete_images(self, image_ids):
+        for image_id in image_ids:
+            self.images.pop(image_id, None)
+
+    def add_pages(self, pages):
+        self.pages.update(pages)
+
+    def delete_pages(self, page_ids):
+        for page_id in page_ids:
+            self.pages.pop(page_id, None)
+
+
+def _chunk(text):
+    return [paragraph for paragraph in text.split("\n\n") if paragraph.strip()]
+
+
+def _embed(texts):
+    return [[float(len(text))] for text in texts]
+
+
+def _page(url, content, image=None):
+    return {
+        'url': url, 'title': url.rsplit('/', 1)[-1], 'content': content,
+        'images': [{'url': image, 'alt': "", 'position': 0}] if image else [],
+        'language': "fr", 'version': "5-8",
+    }
+
+
+def _ingest(store, pages):
+    manifest = IngestManifest(store.manifest_path)
+    stats = stream_ingest(iter(pages), [(store, manifest)], _chunk, embed=_embed)
+    return manifest, stats
+
+
+def test_removed_page_is_deleted():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = MemoryStore(Path(tmp) / "manifest.json")
+        root = "https://example.com/help/fr/5-8/"
+        kept = _page(root + "dlg1.html", "Créer un utilisateur.\n\nMenu commun.", image="a.png")
+        removed = _page(root + "dlg2.html", "Supprimer un groupe.\n\nMenu commun.", image="b.png")
+        other_section = _page("https://example.com/help/en/5-8/dlg3.html", "Other section.")
+        _ingest(store, [removed, kept, other_section])
+        assert len(store.chunks) == 4
+        assert len(store.images) == 2
+
+        # Second crawl of the fr section: dlg2 is gone from the site
+        manifest, stats = _ingest(store, [kept])
+        assert remove_missing([(store, manifest)], stats['urls'],
+                              in_scope=lambda url: url.startswith(root)) == 1
+
+        documents = {document for document, _ in store.chunks.values()}
+        assert documents == {"Créer un utilisateur.", "Menu commun.", "Other section."}
+        # The chunk shared with the removed page now only lists the remaining one
+        shared = next(metadata for document, metadata in store.chunks.values() if document == "Menu commun.")
+        assert shared['url'] == kept['url']
+        assert len(store.images) == 1
+        assert len(store.pages) == 2
+        assert set(IngestManifest(store.manifest_path).pages) == {kept['url'], other_section['url']}
+
+        # Nothing left to remove on the next run
+        manifest, stats = _ingest(store, [kept])
+        assert remove_missing([(store, manifest)], stats['urls'],
+                              in_scope=lambda url: url.startswith(root)) == 0
+        assert len(store.chunks) == 3
+
+
+if __name__ == "__main__":
+    test_removed_page_is_deleted()
+    print("✅ Test terminé!")